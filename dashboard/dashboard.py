@@ -1,14 +1,28 @@
 # dashboard.py
 import os
-import math
+import sys
+import time
+import threading
 from pathlib import Path
-from datetime import timedelta
+from datetime import datetime
 
+import numpy as np
 import pandas as pd
 import streamlit as st
-import yfinance as yf
 import altair as alt
-from math import sqrt
+
+# Pipeline modules (ticker profiles, alert store, ...) live in source/MAIN
+MAIN_DIR = Path(__file__).resolve().parent.parent / "source" / "MAIN"
+if str(MAIN_DIR) not in sys.path:
+    sys.path.insert(0, str(MAIN_DIR))
+import alert_metrics
+import alert_store
+import bar_cache
+import downsample
+import price_prefetch
+import pump_scoring
+import run_metrics
+import ticker_profiles
 
 # ----------------------------
 # Streamlit config
@@ -16,11 +30,6 @@ from math import sqrt
 st.set_page_config(page_title="Pump-and-Dump Detector — Live Alerts", layout="wide")
 st.title("Pump-and-Dump Detector — Live Alerts Dashboard")
 
-# Sidebar utility: clear cache while iterating
-if st.sidebar.button("Clear cache & rerun"):
-    st.cache_data.clear()
-    st.rerun()
-
 # ----------------------------
 # Runs root discovery
 # ----------------------------
@@ -73,14 +82,7 @@ def list_run_dirs(root: Path):
 def alerts_path(run_dir: Path):
     return run_dir / "data" / "alerts" / "alerts_history.csv"
 
-@st.cache_data(show_spinner=False)
-def try_load_alerts(run_dir: Path):
-    path = alerts_path(run_dir)
-    if not path.exists():
-        return None, str(path)
-
-    df = pd.read_csv(path)
-
+def _normalize_alerts(df: pd.DataFrame) -> pd.DataFrame:
     # Normalize likely date columns
     for c in [c for c in ["alert_date", "date"] if c in df.columns]:
         df[c] = pd.to_datetime(df[c], errors="coerce")
@@ -89,66 +91,353 @@ def try_load_alerts(run_dir: Path):
     for c in ["ticker", "tier", "outcome", "status"]:
         if c in df.columns:
             df[c] = df[c].astype(str)
+    return df
+
+@st.cache_data(show_spinner=False)
+def read_alerts_csv(run_dir: Path, mtime_ns: int, size: int):
+    """alerts_history.csv for runs without a store; (mtime_ns, size) keys the cache to the file version."""
+    return _normalize_alerts(pd.read_csv(alerts_path(run_dir)))
+
+@st.cache_resource(show_spinner=False)
+def alerts_state(run_dir: Path):
+    """A run's alerts frame and the store version it reflects, shared by every session."""
+    return {"lock": threading.Lock(), "version": None, "day": None, "df": None}
+
+def _merge_alerts(df: pd.DataFrame, delta: pd.DataFrame) -> pd.DataFrame:
+    """Replace re-written rows and add new ones; a plain append when all are new and latest."""
+    keys = alert_store.KEY_COLUMNS
+    rewritten = pd.MultiIndex.from_frame(df[keys]).isin(pd.MultiIndex.from_frame(delta[keys]))
+    if not rewritten.any() and (df.empty or delta["alert_date"].min() >= df["alert_date"].max()):
+        return pd.concat([df, delta.sort_values(["alert_date", "ticker"])], ignore_index=True)
+    return pd.concat([df[~rewritten], delta], ignore_index=True).sort_values(
+        ["alert_date", "ticker"], kind="stable", ignore_index=True)
+
+def alerts_token(run_dir: Path):
+    """
+    Identity of the run's alert data: ("store", alerts_version) when the run
+    has an alert store, else ("csv", mtime_ns, size), or None without either.
+    """
+    alerts_dir = run_dir / "data" / "alerts"
+    if Path(alert_store.store_path(str(alerts_dir))).exists():
+        conn = alert_store.connect(str(alerts_dir))
+        try:
+            return ("store", alert_store.alerts_version(conn))
+        finally:
+            conn.close()
+    path = alerts_path(run_dir)
+    if path.exists():
+        stat = path.stat()
+        return ("csv", stat.st_mtime_ns, stat.st_size)
+    return None
 
-    return df, str(path)
+def try_load_alerts(run_dir: Path):
+    """
+    The run's alerts (alerts_history.csv columns), reloading only what changed:
+    from the store, just the rows written since the version already held;
+    without a store, the CSV again whenever its mtime or size moves.
+    """
+    path = alerts_path(run_dir)
+    alerts_dir = run_dir / "data" / "alerts"
+    if not Path(alert_store.store_path(str(alerts_dir))).exists():
+        if not path.exists():
+            return None, str(path)
+        stat = path.stat()
+        return read_alerts_csv(run_dir, stat.st_mtime_ns, stat.st_size), str(path)
+
+    state = alerts_state(run_dir)
+    with state["lock"]:
+        conn = alert_store.connect(str(alerts_dir))
+        try:
+            version = alert_store.alerts_version(conn)
+            if state["df"] is None:
+                state["df"] = _normalize_alerts(alert_store.load_alerts(conn)[alert_store.ALERT_COLUMNS])
+            elif version != state["version"]:
+                delta = alert_store.alerts_written_since(conn, state["version"])
+                state["df"] = _merge_alerts(state["df"], _normalize_alerts(delta[alert_store.ALERT_COLUMNS]))
+        finally:
+            conn.close()
+        state["version"] = version
+        # days_since_alert is derived; refresh it once per day
+        today = pd.Timestamp.today().normalize()
+        if state["day"] != today:
+            state["df"] = state["df"].assign(
+                days_since_alert=(today - state["df"]["alert_date"]).dt.days.clip(lower=0))
+            state["day"] = today
+        return state["df"], alert_store.store_path(str(alerts_dir))
+
+POLL_SECONDS = 5   # Auto-refresh polling interval
+CHART_POINTS = 800  # About the chart's width in pixels; longer series are LTTB-downsampled
+
+CHART_DAYS_BEFORE = 90   # Chart window: 90 days before a ticker's first alert ...
+CHART_DAYS_AFTER = 120   # ... through 120 days after its last
+
+@st.cache_resource(show_spinner=False)
+def get_prefetcher(run_dir: Path):
+    """One price prefetcher (thread pool + scored-bar cache) per run, shared by every session."""
+    return price_prefetch.PricePrefetcher(bar_cache.cache_dir_for(str(run_dir)))
+
+def chart_windows(alerts_df: pd.DataFrame) -> dict:
+    """ticker -> (start, end) chart window, most recently alerted ticker first."""
+    dated = alerts_df.dropna(subset=["alert_date"])
+    if dated.empty:
+        return {}
+    span = dated.groupby("ticker")["alert_date"].agg(["min", "max"])
+    span = span.loc[price_prefetch.rank_by_recency(dated)]
+    starts = (span["min"] - pd.Timedelta(days=CHART_DAYS_BEFORE)).dt.date
+    ends = (span["max"] + pd.Timedelta(days=CHART_DAYS_AFTER)).dt.date
+    return {t: (s, e) for t, s, e in zip(span.index, starts, ends)}
 
 @st.cache_data(show_spinner=False)
-def load_price(ticker: str, start, end):
+def load_profiles(run_dir: Path, mtime: float):
+    """Scanner's ticker profiles for the run; mtime keys the cache to the file version."""
+    return ticker_profiles.read_profiles(run_dir)
+
+def get_profiles(run_dir: Path):
+    path = Path(ticker_profiles.profile_path(run_dir))
+    return load_profiles(run_dir, path.stat().st_mtime if path.exists() else 0.0)
+
+OUTCOME_COLORS = {
+    "confirmed_pump": "#22c55e",   # green
+    "likely_pump":    "#86efac",   # light green
+    "false_positive": "#ef4444",   # red
+    "uncertain":      "#f59e0b",   # amber
+    "pending":        "#cbd5e1",   # slate
+}
+
+def style_outcome(df_show: pd.DataFrame) -> "pd.io.formats.style.Styler":
+    """Row background by outcome, as one CSS frame built from column masks."""
+    def css(frame):
+        if "outcome" not in frame.columns:
+            return pd.DataFrame("", index=frame.index, columns=frame.columns)
+        colors = frame["outcome"].astype(str).map(OUTCOME_COLORS)
+        row_css = ("background-color: " + colors + "; color: black").fillna("").to_numpy()
+        return pd.DataFrame(np.repeat(row_css[:, None], frame.shape[1], axis=1),
+                            index=frame.index, columns=frame.columns)
+    return df_show.style.apply(css, axis=None)
+
+def paginate(total: int, key: str, sizes=(25, 50, 100, 250)):
+    """Rows-per-page and page controls; returns (limit, offset)."""
+    c1, c2, c3 = st.columns([1, 1, 2])
+    size = c1.selectbox("Rows per page", sizes, index=1, key=f"{key}_size")
+    pages = max(1, -(-total // size))
+    # Filters can shrink the result under the current page
+    if st.session_state.get(f"{key}_page", 1) > pages:
+        st.session_state[f"{key}_page"] = pages
+    page = int(c2.number_input("Page", min_value=1, max_value=pages, value=1, step=1, key=f"{key}_page"))
+    c3.caption(f"{total} rows · page {page} of {pages}")
+    return size, (page - 1) * size
+
+def has_store(run_dir: Path) -> bool:
+    return Path(alert_store.store_path(str(run_dir / "data" / "alerts"))).exists()
+
+@st.cache_data(show_spinner=False)
+def alerts_page(run_dir: Path, token: tuple, tiers: tuple, outcomes: tuple,
+                sort_by: str, descending: bool, limit: int, offset: int):
+    """
+    One page of the filtered alerts, sorted and sliced in SQL from the
+    store; from the CSV frame for runs without one. token keys the cache
+    to the alerts version.
     """
-    Robust price loader:
-    1) try yf.download(ticker, start, end)
-    2) fallback to yf.Ticker(ticker).history(period="max") then slice
-    Returns df with columns: ['date','close'] or empty DataFrame.
+    if has_store(run_dir):
+        conn = alert_store.connect(str(run_dir / "data" / "alerts"))
+        try:
+            page = alert_store.page_alerts(conn, tiers, outcomes, sort_by=sort_by, descending=descending,
+                                           limit=limit, offset=offset)
+        finally:
+            conn.close()
+        return _normalize_alerts(page[alert_store.ALERT_COLUMNS])
+
+    df, _ = try_load_alerts(run_dir)
+    if tiers:
+        df = df[df["tier"].isin(tiers)]
+    if outcomes:
+        df = df[df["outcome"].isin(outcomes)]
+    if sort_by in df.columns:
+        df = df.sort_values(sort_by, ascending=not descending, kind="stable")
+    return df.iloc[offset:offset + limit]
+
+def export_filtered_csv(run_dir: Path, tiers: tuple, outcomes: tuple, fallback: pd.DataFrame) -> Path:
     """
+    Write the full filtered result to <run>/exports/, streamed from the store
+    in batches (never one frame); runs without a store write `fallback`.
+    """
+    out_dir = run_dir / "exports"
+    out_dir.mkdir(parents=True, exist_ok=True)
+    path = out_dir / f"filtered_alerts_{datetime.now():%Y%m%d_%H%M%S}.csv"
+    if not has_store(run_dir):
+        fallback.to_csv(path, index=False)
+        return path
+    conn = alert_store.connect(str(run_dir / "data" / "alerts"))
     try:
-        # First attempt: bounded download
-        df1 = yf.download(ticker, start=start, end=end, interval="1d", progress=False)
-        if df1 is not None and not df1.empty:
-            out = df1.rename_axis("date").reset_index()[["date","Close"]].rename(columns={"Close":"close"})
-            return out
-
-        # Fallback: full history then slice
-        tk = yf.Ticker(ticker)
-        df2 = tk.history(period="max", interval="1d", auto_adjust=False)
-        if df2 is not None and not df2.empty:
-            df2 = df2.rename_axis("date").reset_index()
-            df2 = df2[(df2["date"].dt.date >= start) & (df2["date"].dt.date <= end)]
-            if not df2.empty:
-                return df2[["date","Close"]].rename(columns={"Close":"close"})
-    except Exception as e:
-        # Surface error to caller for diagnostics
-        return pd.DataFrame({"__error__":[str(e)]})
-
-    # Nothing worked
-    return pd.DataFrame()
-
-def is_pump_series(s: pd.Series) -> pd.Series:
-    return s.astype(str).isin(["confirmed_pump", "likely_pump"])
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            f.write(",".join(alert_store.ALERT_COLUMNS) + "\n")
+            for batch in alert_store.iter_alerts(conn, tiers, outcomes):
+                batch.to_csv(f, header=False, index=False)
+    finally:
+        conn.close()
+    return path
 
-def style_outcome(df_show: pd.DataFrame) -> "pd.io.formats.style.Styler":
-    colors = {
-        "confirmed_pump": "#22c55e",   # green
-        "likely_pump":    "#86efac",   # light green
-        "false_positive": "#ef4444",   # red
-        "uncertain":      "#f59e0b",   # amber
-        "pending":        "#cbd5e1",   # slate
+@st.cache_data(show_spinner=False)
+def load_materialized_metrics(alerts_dir: Path, mtime: float):
+    """alert_metrics.json as written by the tracker; mtime keys the cache to the file version."""
+    return alert_metrics.load_metrics(str(alerts_dir))
+
+@st.cache_data(show_spinner=False)
+def load_cube(alerts_dir: Path, version: float):
+    """The tracker's materialized alert cube; version keys the cache to the store's last write."""
+    conn = alert_store.connect(str(alerts_dir))
+    try:
+        return alert_store.load_cube(conn)
+    finally:
+        conn.close()
+
+@st.cache_data(show_spinner=False)
+def compute_filtered_metrics(run_dir: Path, token: tuple, version: float, tiers: tuple, outcomes: tuple):
+    """
+    Metrics for a filtered view, computed once per (alerts version, filter)
+    combination. Summed from a slice of the materialized cube when it covers
+    every alert in the CSV; otherwise the cube is rebuilt from the CSV.
+    """
+    df, _ = try_load_alerts(run_dir)
+    cube = load_cube(run_dir / "data" / "alerts", version) if version else None
+    if cube is None or int(cube["alerts"].sum()) != len(df):
+        cube = alert_metrics.build_cube(df)
+    return alert_metrics.metrics_from_cube(alert_metrics.slice_cube(cube, tiers, outcomes))
+
+@st.cache_data(show_spinner=False)
+def load_snapshot_history(alerts_dir: Path, version: float, start, end):
+    """Snapshot history rows in [start, end]; version keys the cache to the store's last write."""
+    conn = alert_store.connect(str(alerts_dir))
+    try:
+        return alert_store.load_snapshots(conn, start, end)
+    finally:
+        conn.close()
+
+def store_version(alerts_dir: Path) -> float:
+    """Latest mtime of alerts.db and its WAL (0.0 when there is no store)."""
+    db = Path(alert_store.store_path(str(alerts_dir)))
+    files = [db, db.with_name(db.name + "-wal")]
+    return max((f.stat().st_mtime for f in files if f.exists()), default=0.0)
+
+def get_metrics(run_dir: Path, sel_tiers, sel_outcomes, all_tiers, all_outcomes):
+    """
+    The tracker's materialized metrics when no filter narrows the view and they
+    were computed at the store's current alerts version (or, for a run without
+    a store, are at least as new as alerts_history.csv); otherwise summed from
+    the matching slice of the materialized cube.
+    """
+    alerts_dir = run_dir / "data" / "alerts"
+    json_path = Path(alert_metrics.metrics_path(str(alerts_dir)))
+    token = alerts_token(run_dir)
+    unfiltered = set(sel_tiers or all_tiers) >= set(all_tiers) and set(sel_outcomes or all_outcomes) >= set(all_outcomes)
+    if unfiltered and json_path.exists():
+        metrics = load_materialized_metrics(json_path.parent, json_path.stat().st_mtime)
+        if token is not None and token[0] == "store":
+            # Scanner inserts bump the version without touching the JSON
+            fresh = metrics is not None and metrics.alerts_version == token[1]
+        else:
+            csv_path = alerts_path(run_dir)
+            fresh = metrics is not None and (
+                not csv_path.exists() or json_path.stat().st_mtime >= csv_path.stat().st_mtime)
+        if fresh:
+            return metrics, "materialized"
+    return compute_filtered_metrics(run_dir, token, store_version(alerts_dir),
+                                    tuple(sel_tiers), tuple(sel_outcomes)), "cube"
+
+# ----------------------------
+# Per-section data (memoized per view: run, alerts version, metrics date, filters)
+# ----------------------------
+SECTIONS = ["Overview", "Scores & Outcomes", "Tickers", "Ticker Detail", "Performance"]
+
+@st.cache_data(show_spinner=False)
+def trend_frames(alerts_dir: Path, version: float, lookback: int, as_of: str):
+    """Precision and count series plus the week-over-week table (None with < 2 snapshots)."""
+    end = pd.Timestamp(as_of)
+    history = load_snapshot_history(alerts_dir, version, end - pd.Timedelta(days=lookback), end)
+    if len(history) < 2:
+        return None
+    window = min(20, len(history) - 1)
+    wow = alert_metrics.period_diff(history, days=7).iloc[::-5].head(8)
+    wow = wow.dropna(subset=["date_before"])
+    return {
+        "precision": pd.DataFrame({
+            "Precision (%)": history["precision"],
+            f"Rolling {window}-session precision (%)": alert_metrics.rolling_precision(history, window),
+        }),
+        "counts": history[["total_alerts", "classified", "pending"]],
+        "wow": pd.DataFrame({
+            "vs": wow["date_before"].dt.date,
+            "Total Alerts": wow["total_alerts"],
+            "Δ Alerts": wow["total_alerts_change"],
+            "Classified": wow["classified"],
+            "Δ Classified": wow["classified_change"],
+            "Precision (%)": wow["precision"].round(1),
+            "Δ Precision (pts)": wow["precision_change"].round(1),
+        }, index=wow.index.date),
     }
-    def highlight(row):
-        c = colors.get(str(row.get("outcome", "")), None)
-        return [f"background-color: {c}; color: black" if c else "" for _ in row]
-    return df_show.style.apply(highlight, axis=1)
-
-def wilson_ci(successes: int, n: int, z: float = 1.96):
-    """Return (low%, high%) Wilson CI for a binomial proportion, or (None, None) if n==0."""
-    if n == 0:
-        return (None, None)
-    p = successes / n
-    denom = 1 + z*z/n
-    centre = p + z*z/(2*n)
-    margin = z * math.sqrt((p*(1-p) + z*z/(4*n)) / n)
-    low = (centre - margin) / denom
-    high = (centre + margin) / denom
-    return low*100, high*100
+
+def _ticker_stats(metrics) -> pd.DataFrame:
+    return pd.DataFrame([
+        {"ticker": t.key, "alerts": t.alerts, "avg_score": t.avg_score,
+         "pumps": t.pumps, "precision_%": t.pump_rate}
+        for t in metrics.ticker_stats
+    ], columns=["ticker", "alerts", "avg_score", "pumps", "precision_%"])
+
+@st.cache_data(show_spinner=False)
+def score_frames(view: tuple, _metrics):
+    """Score bins, alerts per day, outcome counts and the top-15 average scores."""
+    bins = pd.DataFrame([
+        {
+            "Score Range": b.key,
+            "Count": b.classified,
+            "False Positives": b.false_positives,
+            "FP Rate (%)": round(b.fp_rate, 1),
+            "Precision (%)": round(b.precision, 1),
+        }
+        for b in _metrics.bin_stats if b.classified > 0
+    ])
+    by_day = pd.Series(list(_metrics.daily_alerts.values()),
+                       index=pd.to_datetime(list(_metrics.daily_alerts)), name="alerts", dtype="int64")
+    outcome_counts = pd.DataFrame([{"Outcome": o.outcome, "Count": o.count} for o in _metrics.outcomes])
+    stats = _ticker_stats(_metrics)
+    top_scores = (stats.dropna(subset=["avg_score"])
+                  .sort_values("avg_score", ascending=False)
+                  .head(15))
+    return {"bins": bins, "by_day": by_day, "outcomes": outcome_counts, "top_scores": top_scores}
+
+@st.cache_data(show_spinner=False)
+def ticker_frame(view: tuple, _metrics):
+    """Alert summary by ticker, indexed by ticker."""
+    grp = _ticker_stats(_metrics).set_index("ticker")
+    grp["avg_score"] = grp["avg_score"].round(2)
+    grp["precision_%"] = grp["precision_%"].round(2)
+    return grp
+
+@st.cache_data(show_spinner=False)
+def performance_frames(view: tuple, _metrics):
+    """Precision by tier (best first) and weekly precision."""
+    by_tier = pd.DataFrame([{"tier": t.key, "precision_pct": t.pump_rate} for t in _metrics.tier_stats],
+                           columns=["tier", "precision_pct"])
+    weekly = pd.DataFrame([{"week": pd.Timestamp(w.key), "precision_pct": w.pump_rate} for w in _metrics.weekly],
+                          columns=["week", "precision_pct"])
+    return {"by_tier": by_tier.sort_values("precision_pct", ascending=False), "weekly": weekly}
+
+@st.cache_data(show_spinner=False)
+def run_timing_frames(run_dir: Path, mtime: float):
+    """Stage seconds per recorded script run and the latest run of each script, from metrics.json."""
+    records = run_metrics.load(run_dir)
+    stages = pd.DataFrame([
+        {"finished": pd.Timestamp(r["finished"]), "script": r["script"], "stage": name, "seconds": s["seconds"]}
+        for r in records for name, s in r.get("stages", {}).items() if name != run_metrics.TICKER_STAGE
+    ], columns=["finished", "script", "stage", "seconds"])
+    latest = {}
+    for r in records:
+        latest[r["script"]] = r
+    return {"stages": stages, "latest": latest}
+
+def metrics_mtime(run_dir: Path) -> float:
+    path = run_dir / run_metrics.METRICS_FILE
+    return path.stat().st_mtime if path.exists() else 0.0
 
 # ----------------------------
 # Load run
@@ -165,6 +454,15 @@ sel_run = st.sidebar.selectbox(
     format_func=lambda p: str(p.relative_to(RUNS_ROOT))
 )
 
+with st.sidebar:
+    # Caches are keyed on file/store versions; this only drops the held alerts frames
+    if st.button("Reload alerts"):
+        alerts_state.clear()
+        st.rerun()
+    auto_refresh = st.toggle("Auto-refresh", value=False,
+                             help="Poll for new alert writes and rerun when they land")
+
+alerts_seen = alerts_token(sel_run)
 df, csv_path = try_load_alerts(sel_run)
 st.caption(f"Using latest run: {csv_path.replace('/', os.sep)}")
 
@@ -204,206 +502,163 @@ if fdf.empty:
     st.warning("No rows after filters. Clear or change filters to see data.")
     st.stop()
 
-# ----------------------------
-# KPIs (computed on filtered set)
-# ----------------------------
-st.subheader("Overview")
-
-total_alerts = len(fdf)
-classified_mask = fdf["outcome"].astype(str).isin(
-    ["confirmed_pump", "likely_pump", "false_positive", "uncertain"]
-) if "outcome" in fdf.columns else pd.Series(False, index=fdf.index)
-classified = fdf[classified_mask]
-pending = fdf[fdf["outcome"].astype(str).eq("pending")] if "outcome" in fdf.columns else fdf.iloc[0:0]
-
-precision = None
-ci_low, ci_high = (None, None)
-if not classified.empty and "outcome" in classified.columns:
-    pumps = is_pump_series(classified["outcome"]).sum()
-    precision = 100.0 * pumps / len(classified) if len(classified) > 0 else None
-    ci_low, ci_high = wilson_ci(pumps, len(classified)) if len(classified) > 0 else (None, None)
-
-# --- Coverage & FP rate ---
-classified_count = len(classified)
-coverage = (classified_count / total_alerts * 100.0) if total_alerts > 0 else 0.0
-
-false_positives = classified[classified["outcome"].astype(str) == "false_positive"] if not classified.empty else classified
-fp_rate = (len(false_positives) / classified_count * 100.0) if classified_count > 0 else 0.0
-
-if precision is not None:
-    pumps = is_pump_series(classified["outcome"]).sum()
-    ci_low, ci_high = wilson_ci(pumps, classified_count)
-else:
-    ci_low, ci_high = None, None
-
-# --- Avg score (if available) ---
-avg_score = fdf["pump_score"].mean() if "pump_score" in fdf.columns and not fdf.empty else None
-
-# --- KPI tiles ---
-c1, c2, c3, c4, c5 = st.columns(5)
-c1.metric("Total Alerts", f"{total_alerts}")
-c2.metric("Coverage", f"{coverage:.1f}%")
-c3.metric("Precision", f"{precision:.1f}%" if precision is not None else "N/A")
-if (ci_low is not None) and (ci_high is not None):
-    c3.caption(f"95% CI: {ci_low:.1f}—{ci_high:.1f}%")
-c4.metric("FP Rate", f"{fp_rate:.1f}%")
-c5.metric("Avg Score", f"{avg_score:.1f}" if avg_score is not None else "—")
+# Warm prices for every filtered ticker in the background, most recently alerted first
+windows = chart_windows(fdf)
+prefetcher = get_prefetcher(sel_run)
+prefetcher.prefetch(windows)
 
+metrics, metrics_source = get_metrics(sel_run, sel_tiers, sel_outcomes, tiers, outcomes)
+# Memo key for per-section data: run, alerts version, metrics date and the active filters
+view = (str(sel_run), alerts_seen, metrics.as_of, tuple(sel_tiers), tuple(sel_outcomes))
 
 # ----------------------------
-# Score Distribution Analysis
+# Section navigation: only the selected section runs
 # ----------------------------
-st.subheader("Score Distribution Analysis")
-
-if "pump_score" in classified.columns and "outcome" in classified.columns and len(classified) > 5:
-    # Work on a copy to avoid SettingWithCopy warnings
-    classified_bins = classified.copy()
-
-    # Create bins
-    bins = [0, 55, 60, 70, 120]
-    labels = ["50-55", "55-60", "60-70", "70+"]
-    classified_bins["score_bin"] = pd.cut(classified_bins["pump_score"], bins=bins, labels=labels, include_lowest=True)
-    
-    # Calculate metrics per bin
-    bin_analysis = []
-    for bin_label in labels:
-        bin_data = classified_bins[classified_bins["score_bin"] == bin_label]
-        if len(bin_data) > 0:
-            fps = len(bin_data[bin_data["outcome"] == "false_positive"])
-            pumps = len(bin_data[bin_data["outcome"].isin(["confirmed_pump", "likely_pump"])])
-            bin_analysis.append({
-                "Score Range": bin_label,
-                "Count": len(bin_data),
-                "False Positives": fps,
-                "FP Rate (%)": round(fps / len(bin_data) * 100, 1),
-                "Precision (%)": round(pumps / len(bin_data) * 100, 1)
-            })
-    
-    if bin_analysis:
-        bin_df = pd.DataFrame(bin_analysis)
-        st.dataframe(bin_df, use_container_width=True)
-        
-        # Interpretation based on lowest bin
-        bottom_bin = bin_df.iloc[0]
-        if bottom_bin["FP Rate (%)"] > 50:
-            st.warning(
-                f"Scores {bottom_bin['Score Range']} have a {bottom_bin['FP Rate (%)']}% false positive rate. "
-                f"Consider raising the threshold to {bins[1]}."
-            )
-        else:
-            st.success("Score distribution looks healthy. Current threshold (50) is appropriate.")
-else:
-    st.info("Need at least 5 classified alerts to show score analysis.")
+section = st.radio("Section", SECTIONS, horizontal=True, key="section", label_visibility="collapsed")
 
 # ----------------------------
-# Alerts Over Time (line)
+# Overview: KPIs + Snapshot Trends
 # ----------------------------
-if DATE_COL:
-    tmp_count = fdf[[DATE_COL]].dropna().copy()
-    tmp_count["d"] = tmp_count[DATE_COL].dt.to_period("D").dt.start_time
-    by_day = tmp_count.groupby("d").size().reset_index(name="alerts")
-    st.subheader("Alerts Over Time")
-    if not by_day.empty:
-        st.line_chart(by_day.set_index("d")["alerts"])
-    else:
-        st.caption("No dates available to plot.")
+if section == "Overview":
+    st.subheader("Overview")
+    st.caption(f"Metrics as of {metrics.as_of} ({metrics_source})")
+
+    c1, c2, c3, c4, c5 = st.columns(5)
+    c1.metric("Total Alerts", f"{metrics.total}")
+    c2.metric("Coverage", f"{metrics.coverage:.1f}%")
+    c3.metric("Precision", f"{metrics.precision:.1f}%" if metrics.precision is not None else "N/A")
+    if (metrics.ci_low is not None) and (metrics.ci_high is not None):
+        c3.caption(f"95% CI: {metrics.ci_low:.1f}—{metrics.ci_high:.1f}%")
+    c4.metric("FP Rate", f"{metrics.fp_rate:.1f}%")
+    c5.metric("Avg Score", f"{metrics.avg_score:.1f}" if metrics.avg_score is not None else "—")
+
+    # Snapshot Trends (daily snapshot history in alerts.db)
+    alerts_dir = sel_run / "data" / "alerts"
+    version = store_version(alerts_dir)
+    if version:
+        st.subheader("Snapshot Trends")
+        lookback = st.select_slider("History window", options=[30, 90, 180, 365], value=90,
+                                    format_func=lambda d: f"{d} days")
+        trends = trend_frames(alerts_dir, version, lookback, metrics.as_of)
+        if trends is None:
+            st.info("Not enough daily snapshots yet. Run the tracker daily or report_backfill.py.")
+        else:
+            t1, t2 = st.columns(2)
+            t1.line_chart(trends["precision"], height=220)
+            t2.line_chart(trends["counts"], height=220)
+            if not trends["wow"].empty:
+                st.caption("Week-over-week change")
+                st.dataframe(trends["wow"], use_container_width=True)
 
 # ----------------------------
-# Outcome Distribution (bar)
+# Scores & Outcomes: score bins, alerts over time, outcomes, avg score by ticker
 # ----------------------------
-st.subheader("Outcome Distribution")
-if "outcome" in fdf.columns and not fdf.empty:
-    out_counts = fdf["outcome"].value_counts().reset_index()
-    out_counts.columns = ["Outcome", "Count"]
-    chart_out = alt.Chart(out_counts).mark_bar().encode(
-        x=alt.X("Outcome:N", sort="-y"),
-        y=alt.Y("Count:Q")
-    ).properties(height=280)
-    st.altair_chart(chart_out, use_container_width=True)
-else:
-    st.caption("No outcome column to chart yet.")
+elif section == "Scores & Outcomes":
+    frames = score_frames(view, metrics)
+
+    st.subheader("Score Distribution Analysis")
+    if metrics.classified > 5:
+        bin_df = frames["bins"]
+        if not bin_df.empty:
+            st.dataframe(bin_df, use_container_width=True)
+
+            # Interpretation based on lowest bin
+            bottom_bin = bin_df.iloc[0]
+            if bottom_bin["FP Rate (%)"] > 50:
+                st.warning(
+                    f"Scores {bottom_bin['Score Range']} have a {bottom_bin['FP Rate (%)']}% false positive rate. "
+                    f"Consider raising the threshold to {alert_metrics.SCORE_BINS[1]}."
+                )
+            else:
+                st.success("Score distribution looks healthy. Current threshold (50) is appropriate.")
+    else:
+        st.info("Need at least 5 classified alerts to show score analysis.")
+
+    if not frames["by_day"].empty:
+        st.subheader("Alerts Over Time")
+        st.line_chart(frames["by_day"])
+
+    st.subheader("Outcome Distribution")
+    if not frames["outcomes"].empty:
+        chart_out = alt.Chart(frames["outcomes"]).mark_bar().encode(
+            x=alt.X("Outcome:N", sort="-y"),
+            y=alt.Y("Count:Q")
+        ).properties(height=280)
+        st.altair_chart(chart_out, use_container_width=True)
+    else:
+        st.caption("No outcome column to chart yet.")
 
-# ----------------------------
-# Average Score by Ticker (Top 15)
-# ----------------------------
-st.subheader("Average Score by Ticker (Top 15)")
-if "pump_score" in fdf.columns and "ticker" in fdf.columns and not fdf.empty:
-    avg_by_ticker = (
-        fdf.groupby("ticker")["pump_score"]
-        .mean()
-        .reset_index(name="avg_score")
-        .sort_values("avg_score", ascending=False)
-        .head(15)
-    )
-    if not avg_by_ticker.empty:
-        chart_score = alt.Chart(avg_by_ticker).mark_bar().encode(
+    st.subheader("Average Score by Ticker (Top 15)")
+    if not frames["top_scores"].empty:
+        chart_score = alt.Chart(frames["top_scores"]).mark_bar().encode(
             x=alt.X("avg_score:Q", title="Avg Pump Score"),
             y=alt.Y("ticker:N", sort="-x", title="Ticker")
         ).properties(height=320)
         st.altair_chart(chart_score, use_container_width=True)
     else:
-        st.caption("No scores to chart.")
-else:
-    st.caption("Need columns: ticker, pump_score.")
+        st.caption("Need columns: ticker, pump_score.")
 
 # ----------------------------
-# Summary by ticker
+# Tickers: summary by ticker + recent alerts (paged table + export)
 # ----------------------------
-st.subheader("Alert Summary by Ticker")
-if not fdf.empty and "ticker" in fdf.columns:
-    agg = {"ticker": ("ticker", "count")}
-    if "pump_score" in fdf.columns:
-        agg["avg_score"] = ("pump_score", "mean")
-    if "outcome" in fdf.columns:
-        agg["pumps"] = ("outcome", lambda s: is_pump_series(s).sum())
-
-    grp = fdf.groupby("ticker").agg(**agg).rename(columns={"ticker": "alerts"})
-    if "avg_score" in grp.columns:
-        grp["avg_score"] = grp["avg_score"].round(2)
-    if "pumps" in grp.columns:
-        grp["precision_%"] = (100.0 * grp["pumps"] / grp["alerts"]).round(2)
-
-    st.dataframe(grp.sort_values("alerts", ascending=False), use_container_width=True)
-else:
-    st.info("No rows after filters.")
+elif section == "Tickers":
+    st.subheader("Alert Summary by Ticker")
+    grp = ticker_frame(view, metrics)
+    if not grp.empty:
+        s1, s2 = st.columns([1, 3])
+        summary_sort = s1.selectbox("Sort by", list(grp.columns), index=0, key="summary_sort")
+        limit, offset = paginate(len(grp), "summary")
+        grp = grp.sort_values(summary_sort, ascending=False, kind="stable")
+        st.dataframe(grp.iloc[offset:offset + limit], use_container_width=True)
+    else:
+        st.info("No rows after filters.")
 
-# ----------------------------
-# Recent Alerts (table + download)
-# ----------------------------
-st.subheader("Recent Alerts")
-candidate_cols = [
-    "alert_date", "date", "ticker", "tier", "pump_score",
-    "status", "outcome", "alert_price", "vol_z", "daily_return"
-]
-show_cols = [c for c in candidate_cols if c in fdf.columns]
-fdf_sorted = fdf.sort_values(DATE_COL, ascending=False) if DATE_COL else fdf.copy()
-table_recent = fdf_sorted[show_cols].head(300)
-
-try:
-    st.dataframe(style_outcome(table_recent), use_container_width=True)
-except Exception:
-    st.dataframe(table_recent, use_container_width=True)
-
-st.download_button(
-    label="Download filtered alerts (CSV)",
-    data=table_recent.to_csv(index=False).encode("utf-8"),
-    file_name="filtered_alerts.csv",
-    mime="text/csv",
-)
+    st.subheader("Recent Alerts")
+    candidate_cols = [
+        "alert_date", "date", "ticker", "tier", "pump_score",
+        "status", "outcome", "alert_price", "vol_z", "daily_return"
+    ]
+    show_cols = [c for c in candidate_cols if c in fdf.columns]
+    r1, r2 = st.columns([1, 1])
+    sort_cols = [c for c in show_cols if c != "date"]
+    recent_sort = r1.selectbox("Sort by", sort_cols, index=0, key="recent_sort")
+    recent_desc = r2.checkbox("Descending", value=True, key="recent_desc")
+    limit, offset = paginate(len(fdf), "recent")
+    table_recent = alerts_page(sel_run, alerts_seen, tuple(sel_tiers), tuple(sel_outcomes),
+                               recent_sort, recent_desc, limit, offset)
+    table_recent = table_recent[[c for c in show_cols if c in table_recent.columns]]
+
+    try:
+        st.dataframe(style_outcome(table_recent), use_container_width=True)
+    except Exception:
+        st.dataframe(table_recent, use_container_width=True)
+
+    if st.button("Export filtered alerts (CSV)"):
+        st.session_state["export_path"] = str(export_filtered_csv(sel_run, tuple(sel_tiers), tuple(sel_outcomes), fdf))
+    export_path = st.session_state.get("export_path")
+    if export_path and Path(export_path).exists():
+        st.caption(f"Exported to {export_path}")
+        with open(export_path, "rb") as f:
+            st.download_button(
+                label="Download filtered alerts (CSV)",
+                data=f,
+                file_name="filtered_alerts.csv",
+                mime="text/csv",
+            )
 
 # ----------------------------
 # Ticker Detail (robust)
 # ----------------------------
-# Sidebar selector (auto-picks first ticker so something shows)
-tickers = sorted(fdf["ticker"].dropna().unique()) if "ticker" in fdf.columns else []
-default_idx = 1 if tickers else 0  # 0="(none)", 1=first ticker
-sel_ticker = st.sidebar.selectbox("Ticker detail", options=["(none)"] + tickers, index=default_idx)
-
-st.subheader("Ticker Detail")
-if sel_ticker and sel_ticker != "(none)":
-    if "ticker" not in fdf.columns:
-        st.info("No ticker column available.")
-    else:
+elif section == "Ticker Detail":
+    st.subheader("Ticker Detail")
+    # Auto-picks the first ticker so something shows; remembers the pick across sections
+    tickers = sorted(fdf["ticker"].dropna().unique()) if "ticker" in fdf.columns else []
+    last = st.session_state.get("detail_ticker_last")
+    default_idx = tickers.index(last) + 1 if last in tickers else (1 if tickers else 0)
+    sel_ticker = st.selectbox("Ticker", options=["(none)"] + tickers, index=default_idx)
+    st.session_state["detail_ticker_last"] = sel_ticker
+
+    if sel_ticker and sel_ticker != "(none)":
         tdf = fdf[fdf["ticker"] == sel_ticker].copy()
         DATE_COL_T = "alert_date" if "alert_date" in tdf.columns else ("date" if "date" in tdf.columns else None)
 
@@ -418,53 +673,81 @@ if sel_ticker and sel_ticker != "(none)":
                 st.dataframe(table_ticker, use_container_width=True)
 
         with right:
-            if "outcome" in tdf.columns and len(tdf) > 0:
-                pumps_t = tdf["outcome"].astype(str).isin(["confirmed_pump","likely_pump"]).sum()
-                prec_t = 100.0 * pumps_t / len(tdf) if len(tdf) else 0.0
-                st.metric("Precision (this ticker)", f"{prec_t:.1f}%")
-            if "pump_score" in tdf.columns and len(tdf) > 0:
-                st.metric("Avg pump_score", f"{tdf['pump_score'].mean():.1f}")
-
-        # --- Choose a wide window so Yahoo is more likely to return data
-        if DATE_COL_T and not tdf[DATE_COL_T].isna().all():
-            dmin = pd.to_datetime(tdf[DATE_COL_T].min())
-            dmax = pd.to_datetime(tdf[DATE_COL_T].max())
-            start = (dmin - timedelta(days=90)).date()
-            end   = (dmax + timedelta(days=120)).date()
+            t_stats = next((t for t in metrics.ticker_stats if t.key == sel_ticker), None)
+            if t_stats is not None:
+                st.metric("Precision (this ticker)", f"{t_stats.pump_rate or 0.0:.1f}%")
+                if t_stats.avg_score is not None:
+                    st.metric("Avg pump_score", f"{t_stats.avg_score:.1f}")
+            profile = get_profiles(sel_run).get(sel_ticker)
+            if profile is not None:
+                st.caption(
+                    f"Profile: {profile.tier}, {profile.num_episodes} episodes, "
+                    f"~{profile.avg_gap_days:.0f}d gap (CV {profile.coefficient_variation:.2f}), "
+                    f"last pump {profile.last_pump_date or '—'}, "
+                    f"last scanned {profile.last_scanned_date or '—'} ({profile.health})"
+                )
+
+        # --- Chart window: CHART_DAYS_BEFORE the first alert through CHART_DAYS_AFTER the last
+        if sel_ticker in windows:
+            start, end = windows[sel_ticker]
         else:
             end = pd.Timestamp.today().date()
             start = (pd.Timestamp.today() - pd.Timedelta(days=240)).date()
 
-        # --- Load price with diagnostics
-        price = load_price(sel_ticker, start=start, end=end)
+        # --- Load price (usually already prefetched) with diagnostics
+        try:
+            price = prefetcher.get(sel_ticker, (start, end))
+            price = price[(price["date"].dt.date >= start) & (price["date"].dt.date <= end)]
+        except Exception as e:
+            price = pd.DataFrame({"__error__": [str(e)]})
 
         st.markdown("**Price chart (with alert markers)**")
+        show_score = st.checkbox("Overlay pump_score", value=False)
         # Diagnostic panel (collapsible) to help if chart doesn't appear
-        with st.expander("Debug (price fetch details)"):
+        with st.expander("Diagnostics (price prefetch)"):
             st.write({"ticker": sel_ticker, "start": str(start), "end": str(end)})
             if isinstance(price, pd.DataFrame) and "__error__" in price.columns:
-                st.error(f"yfinance error: {price['__error__'].iloc[0]}")
+                st.error(f"Price load error: {price['__error__'].iloc[0]}")
             else:
                 st.write("price rows:", 0 if price is None else len(price))
+            ps = prefetcher.stats()
+            d1, d2, d3, d4 = st.columns(4)
+            d1.metric("Cache hit rate", f"{ps['hit_rate']:.0f}%" if ps["hit_rate"] is not None else "—")
+            d2.metric("Fetch latency (mean)", f"{ps['latency_mean_ms']:.0f} ms" if ps["latency_mean_ms"] is not None else "—")
+            d3.metric("Fetch latency (p95)", f"{ps['latency_p95_ms']:.0f} ms" if ps["latency_p95_ms"] is not None else "—")
+            d4.metric("Warm / queued", f"{ps['cached']} / {ps['queued']}")
+            st.caption(
+                f"{ps['reads']} reads: {ps['hits']} hits, {ps['waits']} waited on a prefetch, "
+                f"{ps['misses']} misses · {ps['loaded']} loads, {ps['fetched']} Yahoo requests, "
+                f"{ps['failed']} failed · {len(windows)} tickers in the filtered set"
+            )
 
         # --- Plot logic
         if price is None or (isinstance(price, pd.DataFrame) and price.empty) or ("close" not in price.columns):
             # Fallback: show alert-day returns if available
             alt_df = tdf.copy()
             if DATE_COL_T and "daily_return" in alt_df.columns and not alt_df["daily_return"].isna().all():
-                st.caption("No Yahoo price data — showing alert-day returns instead.")
+                st.caption("No price data — showing alert-day returns instead.")
                 tmp = alt_df[[DATE_COL_T,"daily_return"]].dropna().rename(columns={DATE_COL_T:"date"})
                 tmp = tmp.sort_values("date")
                 st.line_chart(tmp.set_index("date")["daily_return"])
             else:
                 st.info("No price data available.")
         else:
-            # Ensure 'date' is datetime for Altair
-            price_reset = price.copy()
-            price_reset["date"] = pd.to_datetime(price_reset["date"])
+            rule_df = pd.DataFrame({"date": []})
+            if DATE_COL_T:
+                rule_df = pd.DataFrame({
+                    "date": sorted(pd.to_datetime(tdf[DATE_COL_T].dropna()).dt.normalize().unique())
+                })
+
+            # Alert-date bars always survive downsampling
+            price_reset = price.assign(alert=price["date"].isin(rule_df["date"]))
+            price_plot = downsample.downsample(price_reset, "date", "close", CHART_POINTS, keep="alert")
+            if len(price_plot) < len(price_reset):
+                st.caption(f"{len(price_reset)} bars downsampled to {len(price_plot)} points (LTTB).")
 
             line = (
-                alt.Chart(price_reset)
+                alt.Chart(price_plot)
                 .mark_line()
                 .encode(
                     x=alt.X("date:T", title="Date"),
@@ -472,13 +755,18 @@ if sel_ticker and sel_ticker != "(none)":
                 )
                 .properties(height=260, width="container")
             )
-            rule_df = pd.DataFrame({"date": []})
-            if DATE_COL_T:
-                rule_df = pd.DataFrame({
-                    "date": sorted(pd.to_datetime(tdf[DATE_COL_T].dropna()).dt.normalize().unique())
-                })
             rules = alt.Chart(rule_df).mark_rule(color="red", opacity=0.5).encode(x="date:T")
-            st.altair_chart(line + rules, use_container_width=True)
+            chart = line + rules
+            if show_score:
+                score_plot = downsample.downsample(price_reset, "date", "pump_score", CHART_POINTS, keep="alert")
+                score_line = alt.Chart(score_plot).mark_line(color="orange", opacity=0.6).encode(
+                    x="date:T",
+                    y=alt.Y("pump_score:Q", title="pump_score", scale=alt.Scale(domain=[0, 150])),
+                )
+                threshold = alt.Chart(pd.DataFrame({"pump_score": [pump_scoring.PUMP_THRESHOLD]})).mark_rule(
+                    color="orange", strokeDash=[4, 4]).encode(y="pump_score:Q")
+                chart = alt.layer(line + rules, score_line + threshold).resolve_scale(y="independent")
+            st.altair_chart(chart, use_container_width=True)
 
             if DATE_COL_T and not rule_df.empty:
                 alert_dates = sorted(pd.to_datetime(tdf[DATE_COL_T].dropna()).dt.date.unique())
@@ -487,37 +775,61 @@ if sel_ticker and sel_ticker != "(none)":
 # ----------------------------
 # Performance Visuals: Precision by Tier + Weekly Precision
 # ----------------------------
-st.subheader("Performance Visuals")
-
-# Precision by tier (bar)
-if "tier" in fdf.columns and "outcome" in fdf.columns and not fdf.empty:
-    by_tier = (
-        fdf.groupby("tier")["outcome"]
-        .apply(lambda s: (is_pump_series(s).mean()) * 100.0)
-        .reset_index(name="precision_pct")
-        .sort_values("precision_pct", ascending=False)
-    )
-    if not by_tier.empty:
-        chart_tier = alt.Chart(by_tier).mark_bar().encode(
+elif section == "Performance":
+    st.subheader("Performance Visuals")
+    frames = performance_frames(view, metrics)
+
+    # Precision by tier (bar)
+    if not frames["by_tier"].empty:
+        chart_tier = alt.Chart(frames["by_tier"]).mark_bar().encode(
             x=alt.X("tier:N", title="Tier"),
             y=alt.Y("precision_pct:Q", title="Precision (%)")
         ).properties(height=300)
         st.altair_chart(chart_tier, use_container_width=True)
 
-# Weekly precision over time (line)
-if DATE_COL and "outcome" in fdf.columns:
-    tmp = fdf[[DATE_COL, "outcome"]].dropna().copy()
-    if not tmp.empty:
-        tmp["week"] = tmp[DATE_COL].dt.to_period("W").dt.start_time
-        weekly = (
-            tmp.groupby("week")["outcome"]
-            .apply(lambda s: (is_pump_series(s).mean()) * 100.0)
-            .reset_index(name="precision_pct")
-            .sort_values("week")
-        )
-        if not weekly.empty:
-            chart_week = alt.Chart(weekly).mark_line().encode(
-                x=alt.X("week:T", title="Week"),
-                y=alt.Y("precision_pct:Q", title="Precision (%)")
-            ).properties(height=300)
-            st.altair_chart(chart_week, use_container_width=True)
+    # Weekly precision over time (line)
+    if not frames["weekly"].empty:
+        chart_week = alt.Chart(frames["weekly"]).mark_line().encode(
+            x=alt.X("week:T", title="Week"),
+            y=alt.Y("precision_pct:Q", title="Precision (%)")
+        ).properties(height=300)
+        st.altair_chart(chart_week, use_container_width=True)
+
+    # Pipeline stage timings recorded by each script run (metrics.json)
+    st.subheader("Pipeline Run Timings")
+    timing = run_timing_frames(sel_run, metrics_mtime(sel_run))
+    if timing["stages"].empty:
+        st.caption(f"No {run_metrics.METRICS_FILE} in this run yet; it is written at the end of each script run.")
+    else:
+        scripts = sorted(timing["latest"])
+        script = st.selectbox("Script", scripts, index=scripts.index("alert_tracker") if "alert_tracker" in scripts else 0)
+        stage_df = timing["stages"][timing["stages"]["script"] == script]
+        chart_runs = alt.Chart(stage_df).mark_bar().encode(
+            x=alt.X("finished:T", title="Run"),
+            y=alt.Y("seconds:Q", title="Seconds", stack=True),
+            color=alt.Color("stage:N", title="Stage"),
+            tooltip=["finished:T", "stage:N", alt.Tooltip("seconds:Q", format=".2f")],
+        ).properties(height=300)
+        st.altair_chart(chart_runs, use_container_width=True)
+
+        last = timing["latest"][script]
+        latency = pd.DataFrame([
+            {"stage": name, "calls": s["calls"], "seconds": s["seconds"], "tickers": s.get("tickers"),
+             "p50_ms": s.get("latency_ms", {}).get("p50"), "p95_ms": s.get("latency_ms", {}).get("p95"),
+             "max_ms": s.get("latency_ms", {}).get("max")}
+            for name, s in last["stages"].items()
+        ]).sort_values("seconds", ascending=False)
+        st.caption(f"Last {script} run: {last['finished']}, {last['seconds']:.1f}s total · "
+                   + ", ".join(f"{k}: {v:,}" for k, v in last.get("counters", {}).items()))
+        st.dataframe(latency.set_index("stage"), use_container_width=True)
+
+# ----------------------------
+# Auto-refresh: poll the alerts version, rerun only when it moves
+# ----------------------------
+if auto_refresh:
+    status = st.sidebar.empty()
+    while alerts_token(sel_run) == alerts_seen:
+        # Each status update is also where Streamlit can interrupt for user input
+        status.caption(f"Watching for new alerts — last checked {datetime.now():%H:%M:%S}")
+        time.sleep(POLL_SECONDS)
+    st.rerun()
@@ -0,0 +1,397 @@
+import os
+import json
+from math import sqrt
+from datetime import datetime
+from dataclasses import dataclass, field, asdict
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+import trading_calendar
+
+# ============================================================================
+# ALERT METRICS ENGINE
+# ============================================================================
+#
+# Every aggregate the tracker console, the Markdown reports, the JSON
+# snapshots and the dashboard show comes from one AlertMetrics object.
+# build_cube makes a single grouped pass over the alerts, keyed on
+# (tier, ticker, outcome, score_bin, day) with the week alongside, holding
+# counts and the sums behind every mean. metrics_from_cube derives the
+# splits, precision, Wilson CI, score bins and tier, ticker and weekly stats
+# as sums over that cube, so any tier/outcome slice of it yields the metrics
+# for that filter without going back to the alerts.
+#
+# The tracker materializes the result to <run>/data/alerts/alert_metrics.json
+# and the cube to the store (alert_store.replace_cube), so the dashboard can
+# render and filter without re-aggregating the history.
+
+METRICS_FILE = "alert_metrics.json"
+
+SCORE_BINS = [0, 55, 60, 70, 200]
+SCORE_LABELS = ["≤55", "55–60", "60–70", "70+"]
+CLASSIFIED_OUTCOMES = ["confirmed_pump", "likely_pump", "false_positive", "uncertain"]
+PUMP_OUTCOMES = ["confirmed_pump", "likely_pump"]
+PENDING_CLASSIFY_DAYS = 5  # Sessions until a pending alert's 5d return exists
+
+# Summed per cube cell: column -> source value
+_SUMS = {
+    'score_sum': 'pump_score',
+    'return_5d_sum': 'return_5d',
+    'return_10d_sum': 'return_10d',
+}
+CUBE_KEYS = ['tier', 'ticker', 'outcome', 'score_bin', 'day', 'week']
+CUBE_VALUES = ['alerts'] + [c for s in _SUMS for c in (s, s.replace('_sum', '_n'))]
+
+
+def wilson_ci(successes: int, trials: int, z: float = 1.96):
+    """
+    Wilson score interval for a binomial proportion.
+    Returns (low_pct, high_pct) in percent, or (None, None) if trials == 0.
+    """
+    if trials == 0:
+        return (None, None)
+    p = successes / trials
+    denom = 1.0 + (z*z) / trials
+    centre = p + (z*z) / (2.0 * trials)
+    margin = z * sqrt((p*(1.0 - p) + (z*z)/(4.0*trials)) / trials)
+    low = (centre - margin) / denom
+    high = (centre + margin) / denom
+    return low * 100.0, high * 100.0
+
+
+def _pct(part, whole):
+    return part / whole * 100.0 if whole else None
+
+
+def _mean(total, count):
+    return float(total / count) if count else None
+
+
+# ============================================================================
+# RESULT TYPES
+# ============================================================================
+
+@dataclass
+class GroupStats:
+    """Counts for one tier / ticker / score bin / week."""
+    key: str
+    alerts: int
+    classified: int
+    pumps: int
+    false_positives: int
+    avg_score: Optional[float]             # Over all alerts in the group
+    classified_avg_score: Optional[float]  # Over classified alerts only
+
+    @property
+    def precision(self):
+        """Pumps / classified, in percent (None if nothing is classified)."""
+        return _pct(self.pumps, self.classified)
+
+    @property
+    def fp_rate(self):
+        return _pct(self.false_positives, self.classified)
+
+    @property
+    def pump_rate(self):
+        """Pumps / all alerts (pending counted as not pumps), in percent."""
+        return _pct(self.pumps, self.alerts)
+
+
+@dataclass
+class OutcomeStats:
+    outcome: str
+    count: int
+    avg_return_5d: Optional[float]
+    avg_return_10d: Optional[float]
+
+
+@dataclass
+class PendingAlert:
+    ticker: str
+    alert_date: str
+    days_since_alert: int
+    classifies_on: str
+
+
+@dataclass
+class AlertMetrics:
+    as_of: str
+    total: int
+    classified: int
+    pending: int
+    pumps: int
+    false_positives: int
+    precision: Optional[float]
+    ci_low: Optional[float]
+    ci_high: Optional[float]
+    coverage: float
+    fp_rate: float
+    avg_score: Optional[float]
+    outcomes: List[OutcomeStats] = field(default_factory=list)      # Most frequent first, pending included
+    score_bins: Dict[str, int] = field(default_factory=dict)        # All alerts, SCORE_LABELS order
+    bin_stats: List[GroupStats] = field(default_factory=list)       # SCORE_LABELS order
+    tier_stats: List[GroupStats] = field(default_factory=list)
+    ticker_stats: List[GroupStats] = field(default_factory=list)    # Most alerts first
+    weekly: List[GroupStats] = field(default_factory=list)          # key = week start, oldest first
+    daily_alerts: Dict[str, int] = field(default_factory=dict)
+    pending_alerts: List[PendingAlert] = field(default_factory=list)
+    alerts_version: Optional[int] = None                            # Store version these describe (tracker runs only)
+
+    def classified_outcomes(self):
+        """outcome -> count over classified alerts, most frequent first."""
+        return {o.outcome: o.count for o in self.outcomes if o.outcome in CLASSIFIED_OUTCOMES}
+
+    def tier(self, name):
+        return next((t for t in self.tier_stats if t.key == name), None)
+
+    def snapshot(self):
+        """The daily JSON snapshot dict (same keys as before the engine existed)."""
+        return {
+            "date": self.as_of,
+            "total_alerts": self.total,
+            "classified": self.classified,
+            "pending": self.pending,
+            "precision": self.precision,
+            "ci_low": self.ci_low,
+            "ci_high": self.ci_high,
+            "outcomes": self.classified_outcomes(),
+            "score_bins": self.score_bins,
+        }
+
+    def history_row(self):
+        """Snapshot plus the extra columns kept in the snapshot history table."""
+        return dict(self.snapshot(), pumps=self.pumps, false_positives=self.false_positives,
+                    coverage=self.coverage, fp_rate=self.fp_rate, avg_score=self.avg_score)
+
+    def to_dict(self):
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, payload):
+        payload = dict(payload)
+        for name, kind in [('outcomes', OutcomeStats), ('bin_stats', GroupStats),
+                           ('tier_stats', GroupStats), ('ticker_stats', GroupStats),
+                           ('weekly', GroupStats), ('pending_alerts', PendingAlert)]:
+            payload[name] = [kind(**item) for item in payload.get(name, [])]
+        return cls(**payload)
+
+
+# ============================================================================
+# SINGLE GROUPED PASS
+# ============================================================================
+
+def cube_rows(alerts_df):
+    """Each alert's cube key and values, before grouping (one row per alert)."""
+    n = len(alerts_df)
+
+    def column(name, default):
+        return alerts_df[name] if name in alerts_df.columns else pd.Series(default, index=alerts_df.index)
+
+    score = pd.to_numeric(column('pump_score', np.nan), errors='coerce')
+    day = pd.to_datetime(column('alert_date', pd.NaT), errors='coerce').dt.normalize()
+    keys = pd.DataFrame({
+        'tier': column('tier', '').astype(str),
+        'ticker': column('ticker', '').astype(str),
+        'outcome': column('outcome', 'pending').astype(str),
+        'score_bin': pd.cut(score, bins=SCORE_BINS, labels=SCORE_LABELS,
+                            include_lowest=True).astype(str),
+        'day': day,
+        'week': day.dt.to_period('W').dt.start_time,
+    }, index=alerts_df.index)
+
+    values = pd.DataFrame({'alerts': np.ones(n, dtype='int64')}, index=alerts_df.index)
+    for out_col, col in _SUMS.items():
+        v = pd.to_numeric(column(col, np.nan), errors='coerce')
+        values[out_col] = v.fillna(0.0)
+        values[out_col.replace('_sum', '_n')] = v.notna().astype('int64')
+
+    return pd.concat([keys, values], axis=1)
+
+
+def build_cube(alerts_df):
+    """One row per (tier, ticker, outcome, score_bin, day) with counts and sums."""
+    # week is a function of day, so grouping on it only carries it along
+    return cube_rows(alerts_df).groupby(
+        CUBE_KEYS, dropna=False, observed=True, sort=False
+    ).sum().reset_index()
+
+
+def slice_cube(cube, tiers=None, outcomes=None):
+    """The cube cells for the given tiers / outcomes (None or empty = all)."""
+    mask = np.ones(len(cube), dtype=bool)
+    if tiers:
+        mask &= cube['tier'].isin(tiers).to_numpy()
+    if outcomes:
+        mask &= cube['outcome'].isin(outcomes).to_numpy()
+    return cube[mask]
+
+
+def _flag(cube):
+    return cube.assign(
+        is_classified=cube['outcome'].isin(CLASSIFIED_OUTCOMES),
+        is_pump=cube['outcome'].isin(PUMP_OUTCOMES),
+        is_fp=cube['outcome'].eq('false_positive'),
+    )
+
+
+def _group_stats(cube, by, order=None):
+    """GroupStats per value of `by`, from the cube."""
+    if len(cube) == 0:
+        return []
+    c = cube.assign(
+        classified=cube['alerts'] * cube['is_classified'],
+        pumps=cube['alerts'] * cube['is_pump'],
+        false_positives=cube['alerts'] * cube['is_fp'],
+        classified_score_sum=cube['score_sum'] * cube['is_classified'],
+        classified_score_n=cube['score_n'] * cube['is_classified'],
+    )
+    g = c.groupby(by, sort=False)[['alerts', 'classified', 'pumps', 'false_positives', 'score_sum',
+                                   'score_n', 'classified_score_sum', 'classified_score_n']].sum()
+    if order is not None:
+        g = g.reindex([k for k in order if k in g.index])
+    return [
+        GroupStats(
+            key=str(key.date()) if isinstance(key, pd.Timestamp) else str(key),
+            alerts=int(r.alerts), classified=int(r.classified), pumps=int(r.pumps),
+            false_positives=int(r.false_positives),
+            avg_score=_mean(r.score_sum, r.score_n),
+            classified_avg_score=_mean(r.classified_score_sum, r.classified_score_n),
+        )
+        for key, r in zip(g.index, g.itertuples())
+    ]
+
+
+def compute_metrics(alerts_df, as_of=None):
+    """AlertMetrics for an alerts frame (alerts_history schema) as of a date."""
+    return metrics_from_cube(build_cube(alerts_df), as_of)
+
+
+def metrics_from_cube(cube, as_of=None):
+    """AlertMetrics for a cube (or any slice of one) as of a date."""
+    as_of = pd.Timestamp(as_of if as_of is not None else datetime.now()).normalize()
+    cube = _flag(cube)
+
+    total = int(cube['alerts'].sum())
+    classified = int(cube.loc[cube['is_classified'], 'alerts'].sum())
+    pumps = int(cube.loc[cube['is_pump'], 'alerts'].sum())
+    false_positives = int(cube.loc[cube['is_fp'], 'alerts'].sum())
+    pending = int(cube.loc[cube['outcome'] == 'pending', 'alerts'].sum())
+    ci_low, ci_high = wilson_ci(pumps, classified)
+
+    by_outcome = cube.groupby('outcome', sort=False)[
+        ['alerts', 'return_5d_sum', 'return_5d_n', 'return_10d_sum', 'return_10d_n']].sum()
+    by_outcome = by_outcome.sort_values('alerts', ascending=False, kind='stable')
+    outcomes = [
+        OutcomeStats(outcome=o, count=int(r.alerts),
+                     avg_return_5d=_mean(r.return_5d_sum, r.return_5d_n),
+                     avg_return_10d=_mean(r.return_10d_sum, r.return_10d_n))
+        for o, r in zip(by_outcome.index, by_outcome.itertuples())
+    ]
+
+    scored_bins = cube[cube['score_bin'].isin(SCORE_LABELS)]
+    score_bins = scored_bins.groupby('score_bin')['alerts'].sum().reindex(SCORE_LABELS, fill_value=0)
+
+    daily = cube.dropna(subset=['day']).groupby('day')['alerts'].sum().sort_index()
+    weekly = _group_stats(cube.dropna(subset=['week']), 'week')
+    weekly.sort(key=lambda w: w.key)
+
+    ticker_stats = _group_stats(cube, 'ticker')
+    ticker_stats.sort(key=lambda t: -t.alerts)
+
+    # One entry per pending alert, in the store's (alert_date, ticker) order
+    pending_alerts = []
+    cells = cube[(cube['outcome'] == 'pending') & cube['day'].notna()]
+    if len(cells) > 0:
+        cells = cells.sort_values(['day', 'ticker'], kind='stable')
+        dates = pd.to_datetime(cells['day'].repeat(cells['alerts']))
+        tickers = cells['ticker'].repeat(cells['alerts'])
+        classify_on = trading_calendar.offset(dates, PENDING_CLASSIFY_DAYS)
+        days_since = (as_of - dates).dt.days.clip(lower=0)
+        pending_alerts = [
+            PendingAlert(ticker=str(t), alert_date=str(d.date()), days_since_alert=int(s),
+                         classifies_on=str(on.date()))
+            for t, d, s, on in zip(tickers, dates, days_since, classify_on)
+        ]
+
+    score_n = int(cube['score_n'].sum())
+    return AlertMetrics(
+        as_of=as_of.strftime('%Y-%m-%d'),
+        total=total,
+        classified=classified,
+        pending=pending,
+        pumps=pumps,
+        false_positives=false_positives,
+        precision=_pct(pumps, classified),
+        ci_low=ci_low,
+        ci_high=ci_high,
+        coverage=_pct(classified, total) or 0.0,
+        fp_rate=_pct(false_positives, classified) or 0.0,
+        avg_score=_mean(cube['score_sum'].sum(), score_n),
+        outcomes=outcomes,
+        score_bins={k: int(v) for k, v in score_bins.items()},
+        bin_stats=_group_stats(cube[cube['is_classified']], 'score_bin', order=SCORE_LABELS),
+        tier_stats=_group_stats(cube, 'tier'),
+        ticker_stats=ticker_stats,
+        weekly=weekly,
+        daily_alerts={str(d.date()): int(v) for d, v in daily.items()},
+        pending_alerts=pending_alerts,
+    )
+
+
+# ============================================================================
+# SNAPSHOT HISTORY SERIES (alert_store.load_snapshots frames)
+# ============================================================================
+
+def rolling_precision(history, window=20):
+    """
+    Precision of the alerts classified within the last `window` snapshots.
+    Snapshot counts are cumulative, so this is a difference of two rows.
+    """
+    pumps = history['pumps'] - history['pumps'].shift(window, fill_value=0)
+    classified = history['classified'] - history['classified'].shift(window, fill_value=0)
+    return (pumps / classified.where(classified > 0) * 100.0).rename('rolling_precision')
+
+
+def period_diff(history, days=7, columns=('total_alerts', 'classified', 'pending', 'precision')):
+    """
+    Change of each column against the latest snapshot at least `days`
+    calendar days earlier (week over week by default).
+    """
+    cols = list(columns)
+    current = history[cols].reset_index()
+    earlier = history[cols].reset_index().rename(columns={c: f'{c}_before' for c in cols})
+    earlier = earlier.rename(columns={'date': 'date_before'})
+    current['lookup'] = current['date'] - pd.Timedelta(days=days)
+    merged = pd.merge_asof(current.sort_values('lookup'), earlier.sort_values('date_before'),
+                           left_on='lookup', right_on='date_before', direction='backward')
+    for c in cols:
+        merged[f'{c}_change'] = merged[c] - merged[f'{c}_before']
+    return merged.drop(columns='lookup').sort_values('date').set_index('date')
+
+
+# ============================================================================
+# MATERIALIZED JSON
+# ============================================================================
+
+def metrics_path(alerts_dir):
+    return os.path.join(alerts_dir, METRICS_FILE)
+
+
+def save_metrics(alerts_dir, metrics):
+    path = metrics_path(alerts_dir)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(metrics.to_dict(), f, indent=2)
+    os.replace(tmp_path, path)
+    return path
+
+
+def load_metrics(alerts_dir):
+    """The run's materialized AlertMetrics, or None if the tracker never wrote it."""
+    path = metrics_path(alerts_dir)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return AlertMetrics.from_dict(json.load(f))
@@ -0,0 +1,281 @@
+import os
+import json
+
+import numpy as np
+
+import alert_metrics
+
+# ============================================================================
+# WEEKLY REPORTS, DAILY SNAPSHOTS AND THE CONSOLE REPORT
+# ============================================================================
+#
+# Pure renderers over an alert_metrics.AlertMetrics: nothing here aggregates
+# alerts itself. alert_tracker renders today's metrics and report_backfill
+# renders point-in-time metrics for earlier days; the output is dated by
+# metrics.as_of.
+
+
+def _fmt_pct(value, spec="+.1f"):
+    """Percent from a fraction, 'nan' when missing (as pandas means printed)."""
+    return format(value * 100 if value is not None else np.nan, spec)
+
+
+# ============================================================================
+# CONSOLE PERFORMANCE REPORT
+# ============================================================================
+
+def print_performance_report(metrics):
+    print("\n" + "="*80)
+    print("PERFORMANCE REPORT")
+    print("="*80)
+
+    print(f"\nTotal Alerts: {metrics.total}")
+    print(f"  Classified: {metrics.classified}")
+    print(f"  Pending (< 5 days old): {metrics.pending}")
+
+    if metrics.classified == 0:
+        return
+
+    print(f"\nOutcome Distribution:")
+    for outcome, count in metrics.classified_outcomes().items():
+        pct = count / metrics.classified * 100
+        print(f"  {outcome:20s}: {count:3d} ({pct:.1f}%)")
+
+    if metrics.ci_low is not None:
+        print(f"\nPRECISION RATE: {metrics.precision:.1f}% (95% CI: {metrics.ci_low:.1f}-{metrics.ci_high:.1f}%)")
+    else:
+        print(f"\nPRECISION RATE: N/A (no classified alerts yet)")
+    print("   (Confirmed + Likely Pumps) / Total Classified")
+    print(f"   Coverage: {metrics.classified}/{metrics.total} alerts ({metrics.coverage:.1f}%)")
+
+    # Average returns by outcome
+    print(f"\nAverage Returns by Outcome:")
+    by_outcome = {o.outcome: o for o in metrics.outcomes}
+    for outcome in ['confirmed_pump', 'likely_pump', 'uncertain', 'false_positive']:
+        stats = by_outcome.get(outcome)
+        if stats is not None and stats.count > 0:
+            print(f"  {outcome:20s}: 5d={_fmt_pct(stats.avg_return_5d)}%  "
+                  f"10d={_fmt_pct(stats.avg_return_10d)}%")
+
+    # Performance by tier
+    print(f"\nPerformance by Tier:")
+    for tier in ['tier1', 'tier2']:
+        stats = metrics.tier(tier)
+        if stats is not None and stats.classified > 0:
+            print(f"  {tier}: {stats.precision:.1f}% precision ({stats.pumps}/{stats.classified} alerts)")
+
+    # Top alerted tickers
+    print(f"\nTop Alerted Tickers:")
+    top = sorted((t for t in metrics.ticker_stats if t.classified > 0),
+                 key=lambda t: -t.classified)[:5]
+    for t in top:
+        avg_score = t.classified_avg_score if t.classified_avg_score is not None else np.nan
+        print(f"  {t.key:6s}: {t.classified} alerts, {t.precision:.0f}% precision, avg_score={avg_score:.1f}")
+
+
+# ============================================================================
+# JSON SNAPSHOT + DIFF ENGINE HELPERS
+# ============================================================================
+
+def save_json_snapshot(metrics, json_dir):
+    """Save the machine-readable JSON snapshot of the day's metrics."""
+    snapshot = metrics.snapshot()
+    out_path = os.path.join(json_dir, f"{snapshot['date']}.json")
+    with open(out_path, "w", encoding="utf-8") as fp:
+        json.dump(snapshot, fp, indent=4)
+    return out_path
+
+
+def diff_snapshots(today, previous):
+    """Change summary between two snapshot dicts."""
+    if previous is None:
+        return "No earlier snapshot to compare against."
+
+    diff = []
+
+    # precision
+    if today.get("precision") and previous.get("precision"):
+        delta = today["precision"] - previous["precision"]
+        diff.append(f"Precision change: {previous['precision']:.1f}% → {today['precision']:.1f}% ({delta:+.1f}%)")
+
+    # total alerts
+    if today["total_alerts"] != previous["total_alerts"]:
+        delta = today["total_alerts"] - previous["total_alerts"]
+        diff.append(f"Total alerts change: {previous['total_alerts']} → {today['total_alerts']} ({delta:+d})")
+
+    # pending
+    if today["pending"] != previous["pending"]:
+        delta = today["pending"] - previous["pending"]
+        diff.append(f"Pending alerts change: {previous['pending']} → {today['pending']} ({delta:+d})")
+
+    if not diff:
+        return f"No major changes since {previous['date']}."
+
+    return "\n".join(diff)
+
+
+# ============================================================================
+# WEEKLY MARKDOWN REPORT
+# ============================================================================
+
+def generate_markdown_report(metrics, out_dir, quiet=False):
+    os.makedirs(out_dir, exist_ok=True)
+    today = metrics.as_of
+
+    if metrics.classified > 0:
+        precision_cell = (f"{metrics.precision:.1f}% "
+                          f"({metrics.ci_low:.1f}–{metrics.ci_high:.1f}% 95% CI)")
+    else:
+        precision_cell = "N/A"
+
+    # -------------------------
+    # Score-bin analysis
+    # -------------------------
+    score_bin_section = ""
+    score_rows = [b for b in metrics.bin_stats if b.classified > 0]
+    if score_rows:
+        score_bin_section += "## 📊 Score-Bin Analysis (Classified Only)\n\n"
+        score_bin_section += "| Score Range | Count | Pumps | FP | Precision % | FP Rate % |\n"
+        score_bin_section += "|-------------|-------|-------|----|-------------|-----------|\n"
+        for b in score_rows:
+            score_bin_section += (f"| {b.key} | {b.classified} | {b.pumps} | {b.false_positives} | "
+                                  f"{b.precision:.1f} | {b.fp_rate:.1f} |\n")
+
+        # Threshold recommendation
+        bottom = [b for b in score_rows if b.key == "≤55"]
+        if bottom:
+            fp_rate_b = bottom[0].fp_rate
+            score_bin_section += "\n### 🎯 Threshold Recommendation\n"
+            if fp_rate_b > 60:
+                score_bin_section += (
+                    f"- FP rate **{fp_rate_b:.1f}%** in ≤55 ⇒ **Raise threshold to 55**\n"
+                )
+            elif fp_rate_b < 30 and metrics.precision and metrics.precision > 85:
+                score_bin_section += (
+                    f"- FP rate **{fp_rate_b:.1f}%** with high precision ⇒ **Lower threshold to 45**\n"
+                )
+            else:
+                score_bin_section += "- Current threshold (50) is acceptable.\n"
+
+    # -------------------------
+    # Tier performance
+    # -------------------------
+    tier_section = ""
+    if metrics.classified > 0:
+        tier_section += "## 🏆 Tier Performance (Classified Only)\n\n"
+        tier_section += "| Tier | Alerts | Pumps | Precision % |\n"
+        tier_section += "|------|--------|--------|--------------|\n"
+
+        tier_stats = [t for t in (metrics.tier("tier1"), metrics.tier("tier2"))
+                      if t is not None and t.classified > 0]
+        for t in tier_stats:
+            tier_section += f"| {t.key} | {t.classified} | {t.pumps} | {t.precision:.1f}% |\n"
+
+        if len(tier_stats) == 2:
+            diff = tier_stats[0].precision - tier_stats[1].precision
+            if diff >= 5:
+                tier_section += f"\n✔ Tier 1 outperforms Tier 2 by **{diff:.1f} pts**\n"
+            else:
+                tier_section += f"\n⚠ Tier difference only **{diff:.1f} pts** → Tiering may need tuning\n"
+
+    # -------------------------
+    # Pending table
+    # -------------------------
+    pending_section = "## ⏳ Pending Alerts\n\n"
+    if not metrics.pending_alerts:
+        pending_section += "*No pending alerts.*\n"
+    else:
+        pending_section += "| Ticker | Alert Date | Days Since | Classifies On |\n"
+        pending_section += "|--------|------------|------------|---------------|\n"
+        for p in metrics.pending_alerts:
+            pending_section += f"| {p.ticker} | {p.alert_date} | {p.days_since_alert} | {p.classifies_on} |\n"
+
+    # -------------------------
+    # Final Markdown assembly
+    # -------------------------
+    md = f"""
+# 📊 Pump Detector Weekly Report  
+Generated: **{today}**
+
+## 🧭 Executive Summary
+| Metric | Value |
+|--------|--------|
+| **Total Alerts** | {metrics.total} |
+| **Classified Alerts** | {metrics.classified} |
+| **Coverage** | {metrics.coverage:.1f}% |
+| **Precision** | {precision_cell} |
+| **Pending Alerts** | {metrics.pending} |
+
+---
+
+## 🎯 Outcome Distribution
+"""
+
+    if metrics.classified == 0:
+        md += "*No classified alerts yet.*\n"
+    else:
+        md += "| Outcome | Count |\n|---------|--------|\n"
+        for o, cnt in metrics.classified_outcomes().items():
+            md += f"| {o} | {cnt} |\n"
+
+    md += "\n---\n\n"
+    md += score_bin_section
+    md += "\n---\n\n"
+    md += tier_section
+    md += "\n---\n\n"
+    md += pending_section
+
+    # Save file
+    out_path = os.path.join(out_dir, f"report_{today}.md")
+    with open(out_path, "w", encoding="utf-8") as f:
+        f.write(md)
+
+    if not quiet:
+        print(f"\nMarkdown report saved to: {out_path}")
+    return out_path
+
+
+# ============================================================================
+# DAILY MARKDOWN SNAPSHOT
+# ============================================================================
+
+def write_daily_snapshot(metrics, daily_dir, diff_text):
+    """Daily snapshot Markdown (metrics, outcomes, score bins, change vs the previous snapshot)."""
+    today = metrics.as_of
+    md_path = os.path.join(daily_dir, f"{today}.md")
+
+    with open(md_path, "w", encoding="utf-8") as f:
+
+        f.write(f"# 📅 Daily Pump Detector Snapshot – {today}\n\n")
+
+        # High-level metrics
+        f.write(f"- Total alerts: **{metrics.total}**\n")
+        f.write(f"- Classified alerts: **{metrics.classified}**\n")
+        f.write(f"- Pending alerts: **{metrics.pending}**\n")
+
+        if metrics.classified > 0:
+            precision_str = f"{metrics.precision:.1f}% (95% CI {metrics.ci_low:.1f}–{metrics.ci_high:.1f}%)"
+        else:
+            precision_str = "Not enough classified alerts yet"
+
+        f.write(f"- Precision: **{precision_str}**\n")
+
+        # Outcome distribution
+        f.write("\n## 📊 Outcome Distribution\n")
+        if metrics.classified == 0:
+            f.write("No classified alerts yet.\n")
+        else:
+            for outcome, cnt in metrics.classified_outcomes().items():
+                f.write(f"- {outcome}: **{cnt}**\n")
+
+        # Score bins
+        if sum(metrics.score_bins.values()) > 0:
+            f.write("\n## 🎯 Score Bins\n")
+            for rng in alert_metrics.SCORE_LABELS:
+                f.write(f"- {rng}: **{metrics.score_bins.get(rng, 0)} alerts**\n")
+
+        # Diff vs the previous snapshot
+        f.write("\n## 🔄 Change vs Previous Snapshot\n")
+        f.write(diff_text + "\n")
+
+    return md_path
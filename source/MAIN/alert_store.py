@@ -0,0 +1,529 @@
+import os
+import glob
+import json
+import sqlite3
+import tempfile
+from contextlib import contextmanager
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+# ============================================================================
+# ALERT STORE (SQLite, one row per ticker/alert_date)
+# ============================================================================
+#
+# The scanner inserts new alerts and the tracker updates outcome columns in
+# place. Both go through short IMMEDIATE transactions on a WAL database, so a
+# scanner run and a tracker run can overlap without overwriting each other.
+# alerts_history.csv is still written as a read-only mirror for ad-hoc scripts
+# (refreshed by the tracker, so scanner inserts stay O(new alerts)), but the
+# store is the source of truth.
+#
+# The same database keeps the daily snapshot history: one row per report date
+# with that day's cumulative metrics, keyed (and clustered) on date, so any
+# date range is a single indexed query instead of a scan of JSON files.
+# It also holds the tracker's materialized alert cube (alert_metrics.build_cube),
+# which the dashboard slices to answer filter changes.
+
+STORE_FILE = "alerts.db"
+LEGACY_CSV = "alerts_history.csv"
+LEGACY_SNAPSHOT_DIR = "daily_snapshots"  # <run>/daily_snapshots/YYYY-MM-DD.json
+
+# Column order matches the historical alerts_history.csv schema
+ALERT_COLUMNS = [
+    'ticker', 'tier', 'alert_date', 'pump_score', 'alert_price', 'volume',
+    'vol_z', 'daily_return', 'days_since_last', 'status', 'outcome',
+    'return_1d', 'return_5d', 'return_10d', 'max_drawdown', 'days_to_bottom',
+    'days_since_alert', 'last_updated',
+]
+KEY_COLUMNS = ['ticker', 'alert_date']
+
+# Store-only bookkeeping (not part of the CSV mirror)
+SCHEDULE_COLUMNS = ['next_maturity']
+STORE_COLUMNS = ALERT_COLUMNS + SCHEDULE_COLUMNS
+# Store version of a row's last write (meta 'alerts_version' at the time);
+# readers holding version v reload just the rows with row_version > v
+VERSION_COLUMN = 'row_version'
+
+# Columns owned by alert_tracker (everything else is written once by the scanner)
+OUTCOME_COLUMNS = [
+    'outcome', 'return_1d', 'return_5d', 'return_10d', 'max_drawdown',
+    'days_to_bottom', 'days_since_alert', 'last_updated', 'next_maturity',
+]
+# Outcome values that decide whether a tracker write is needed at all
+TRACKED_COLUMNS = [c for c in OUTCOME_COLUMNS if c not in ('days_since_alert', 'last_updated')]
+
+_COLUMN_TYPES = {
+    'ticker': 'TEXT NOT NULL',
+    'tier': 'TEXT',
+    'alert_date': 'TEXT NOT NULL',
+    'pump_score': 'REAL',
+    'alert_price': 'REAL',
+    'volume': 'REAL',
+    'vol_z': 'REAL',
+    'daily_return': 'REAL',
+    'days_since_last': 'REAL',
+    'status': 'TEXT',
+    'outcome': 'TEXT',
+    'return_1d': 'REAL',
+    'return_5d': 'REAL',
+    'return_10d': 'REAL',
+    'max_drawdown': 'REAL',
+    'days_to_bottom': 'INTEGER',
+    'days_since_alert': 'INTEGER',
+    'last_updated': 'TEXT',
+    'next_maturity': 'TEXT',
+    'row_version': 'INTEGER',
+}
+
+# Snapshot history: one row per report date, cumulative metrics as of that day.
+# outcomes/score_bins hold the JSON snapshot's dicts as JSON text.
+_SNAPSHOT_TYPES = {
+    'date': 'TEXT PRIMARY KEY',
+    'total_alerts': 'INTEGER',
+    'classified': 'INTEGER',
+    'pending': 'INTEGER',
+    'pumps': 'INTEGER',
+    'false_positives': 'INTEGER',
+    'precision': 'REAL',
+    'ci_low': 'REAL',
+    'ci_high': 'REAL',
+    'coverage': 'REAL',
+    'fp_rate': 'REAL',
+    'avg_score': 'REAL',
+    'outcomes': 'TEXT',
+    'score_bins': 'TEXT',
+}
+SNAPSHOT_COLUMNS = list(_SNAPSHOT_TYPES)
+
+# Materialized alert cube: alert_metrics.CUBE_KEYS + CUBE_VALUES, dates as TEXT
+_CUBE_TYPES = {
+    'tier': 'TEXT', 'ticker': 'TEXT', 'outcome': 'TEXT', 'score_bin': 'TEXT',
+    'day': 'TEXT', 'week': 'TEXT',
+    'alerts': 'INTEGER',
+    'score_sum': 'REAL', 'score_n': 'INTEGER',
+    'return_5d_sum': 'REAL', 'return_5d_n': 'INTEGER',
+    'return_10d_sum': 'REAL', 'return_10d_n': 'INTEGER',
+}
+CUBE_COLUMNS = list(_CUBE_TYPES)
+
+
+def store_path(alerts_dir):
+    return os.path.join(alerts_dir, STORE_FILE)
+
+
+def connect(alerts_dir):
+    """
+    Open the alert store for a run's alerts directory.
+    Creates the schema on first use and imports an existing alerts_history.csv.
+    """
+    os.makedirs(alerts_dir, exist_ok=True)
+    conn = sqlite3.connect(store_path(alerts_dir), timeout=30, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA busy_timeout=30000")
+    _create_schema(conn)
+    _import_legacy_csv(conn, alerts_dir)
+    return conn
+
+
+@contextmanager
+def write_transaction(conn):
+    """BEGIN IMMEDIATE ... COMMIT, rolling back on error."""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+
+
+@contextmanager
+def read_transaction(conn):
+    """BEGIN ... COMMIT around several reads so they all see one snapshot of the store."""
+    conn.execute("BEGIN")
+    try:
+        yield conn
+    finally:
+        conn.execute("COMMIT")
+
+
+def _create_schema(conn):
+    cols = ",\n    ".join(f"{c} {_COLUMN_TYPES[c]}" for c in STORE_COLUMNS + [VERSION_COLUMN])
+    conn.execute(f"CREATE TABLE IF NOT EXISTS alerts (\n    {cols}\n)")
+    # Stores created before a column existed get it added in place
+    existing = {r[1] for r in conn.execute("PRAGMA table_info(alerts)")}
+    for c in STORE_COLUMNS + [VERSION_COLUMN]:
+        if c not in existing:
+            conn.execute(f"ALTER TABLE alerts ADD COLUMN {c} {_COLUMN_TYPES[c]}")
+    conn.execute(
+        "CREATE UNIQUE INDEX IF NOT EXISTS alerts_ticker_date "
+        "ON alerts (ticker, alert_date)"
+    )
+    # Maturity queue: the tracker pops rows in next_maturity order
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS alerts_next_maturity "
+        "ON alerts (next_maturity)"
+    )
+    # Newest-first pages of the alert table
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS alerts_alert_date "
+        "ON alerts (alert_date)"
+    )
+    # Change feed: incremental readers select rows written after their version
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS alerts_row_version "
+        "ON alerts (row_version)"
+    )
+    conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+    # WITHOUT ROWID: rows live in the date primary-key index, so range scans are index scans
+    cols = ",\n    ".join(f"{c} {t}" for c, t in _SNAPSHOT_TYPES.items())
+    conn.execute(f"CREATE TABLE IF NOT EXISTS snapshots (\n    {cols}\n) WITHOUT ROWID")
+    cols = ",\n    ".join(f"{c} {t}" for c, t in _CUBE_TYPES.items())
+    conn.execute(f"CREATE TABLE IF NOT EXISTS alert_cube (\n    {cols}\n)")
+
+
+def _import_legacy_csv(conn, alerts_dir):
+    """One-time migration: seed an empty store from alerts_history.csv."""
+    csv_path = os.path.join(alerts_dir, LEGACY_CSV)
+    if not os.path.exists(csv_path):
+        return
+    if conn.execute("SELECT 1 FROM alerts LIMIT 1").fetchone() is not None:
+        return
+    legacy = pd.read_csv(csv_path)
+    if len(legacy) > 0:
+        upsert_alerts(conn, legacy)
+
+
+# ============================================================================
+# WRITES
+# ============================================================================
+
+def _normalize(rows):
+    """DataFrame/list-of-dicts -> list of tuples in STORE_COLUMNS order."""
+    df = pd.DataFrame(rows).copy()
+    for c in STORE_COLUMNS:
+        if c not in df.columns:
+            df[c] = None
+    for c in ['alert_date', 'next_maturity']:
+        df[c] = pd.to_datetime(df[c]).dt.strftime('%Y-%m-%d')
+    df = df[STORE_COLUMNS].astype(object)
+    df = df.where(pd.notna(df), None)
+    records = []
+    for rec in df.itertuples(index=False, name=None):
+        records.append(tuple(
+            v.item() if isinstance(v, np.generic) else v for v in rec
+        ))
+    return records
+
+
+def _bump_version(conn):
+    """Next alerts_version; call inside the write transaction that uses it."""
+    row = conn.execute("SELECT value FROM meta WHERE key = 'alerts_version'").fetchone()
+    version = int(row[0]) + 1 if row else 1
+    conn.execute(
+        "INSERT INTO meta (key, value) VALUES ('alerts_version', ?) "
+        "ON CONFLICT (key) DO UPDATE SET value = excluded.value",
+        (str(version),),
+    )
+    return version
+
+
+def upsert_alerts(conn, rows, update_columns=None):
+    """
+    Insert alerts keyed on (ticker, alert_date).
+
+    update_columns=None keeps the existing row on conflict (scanner semantics:
+    first alert of the day wins). Passing a list of columns overwrites just
+    those columns on conflict (tracker semantics). Every row written is
+    stamped with a new store version. Returns rows written.
+    """
+    records = _normalize(rows)
+    if not records:
+        return 0
+
+    columns = STORE_COLUMNS + [VERSION_COLUMN]
+    placeholders = ", ".join("?" for _ in columns)
+    sql = f"INSERT INTO alerts ({', '.join(columns)}) VALUES ({placeholders}) "
+    if update_columns:
+        assignments = ", ".join(f"{c} = excluded.{c}" for c in list(update_columns) + [VERSION_COLUMN])
+        sql += f"ON CONFLICT (ticker, alert_date) DO UPDATE SET {assignments}"
+    else:
+        sql += "ON CONFLICT (ticker, alert_date) DO NOTHING"
+
+    before = conn.total_changes
+    with write_transaction(conn):
+        version = _bump_version(conn)
+        conn.executemany(sql, [rec + (version,) for rec in records])
+    # total_changes also counts the meta row
+    return conn.total_changes - before - 1
+
+
+# ============================================================================
+# READS
+# ============================================================================
+
+def _read_alerts(conn, where="", params=(), order="alert_date, ticker", limit=None, offset=0):
+    sql = f"SELECT {', '.join(STORE_COLUMNS)} FROM alerts {where} ORDER BY {order}"
+    if limit is not None:
+        sql += f" LIMIT {int(limit)} OFFSET {int(offset)}"
+    df = pd.read_sql_query(sql, conn, params=params)
+    df['alert_date'] = pd.to_datetime(df['alert_date'])
+    df['next_maturity'] = pd.to_datetime(df['next_maturity'])
+    # days_since_alert is derived; refresh it instead of trusting the last write
+    if len(df) > 0:
+        df['days_since_alert'] = (pd.Timestamp(datetime.now()).normalize()
+                                  - df['alert_date']).dt.days.clip(lower=0)
+    return df
+
+
+def load_alerts(conn):
+    """Load every alert (alerts_history.csv schema plus next_maturity)."""
+    return _read_alerts(conn)
+
+
+def alerts_version(conn):
+    """Version of the last alert write (0 for a store never written to)."""
+    return int(get_meta(conn, 'alerts_version', 0))
+
+
+def alerts_written_since(conn, version):
+    """Alerts inserted or updated after store version `version`."""
+    return _read_alerts(conn, "WHERE row_version > ?", (int(version),))
+
+
+def alerts_since(conn, start):
+    """Alerts dated on or after start (served from the alert_date index)."""
+    return _read_alerts(conn, "WHERE alert_date >= ?", (pd.Timestamp(start).strftime('%Y-%m-%d'),))
+
+
+def _filter_clause(tiers=None, outcomes=None, ticker=None):
+    """WHERE clause + params for the dashboard's tier / outcome / ticker filters."""
+    clauses, params = [], []
+    for col, values in [('tier', tiers), ('outcome', outcomes)]:
+        if values:
+            clauses.append(f"{col} IN ({', '.join('?' for _ in values)})")
+            params.extend(values)
+    if ticker:
+        clauses.append("ticker = ?")
+        params.append(ticker)
+    return (f"WHERE {' AND '.join(clauses)}" if clauses else ""), params
+
+
+def page_alerts(conn, tiers=None, outcomes=None, ticker=None,
+                sort_by='alert_date', descending=True, limit=50, offset=0):
+    """
+    One page of filtered alerts, sorted in SQL (ties broken by alert_date,
+    ticker so pages never overlap). sort_by must be an alerts column.
+    """
+    if sort_by not in STORE_COLUMNS:
+        raise ValueError(f"Cannot sort alerts by {sort_by!r}")
+    direction = "DESC" if descending else "ASC"
+    order = f"{sort_by} {direction}, alert_date {direction}, ticker"
+    where, params = _filter_clause(tiers, outcomes, ticker)
+    return _read_alerts(conn, where, params, order=order, limit=limit, offset=offset)
+
+
+def iter_alerts(conn, tiers=None, outcomes=None, ticker=None, batch_size=5000):
+    """Filtered alerts newest first, yielded as DataFrames of at most batch_size rows."""
+    where, params = _filter_clause(tiers, outcomes, ticker)
+    cursor = conn.execute(
+        f"SELECT {', '.join(ALERT_COLUMNS)} FROM alerts {where} ORDER BY alert_date DESC, ticker",
+        params,
+    )
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            return
+        yield pd.DataFrame.from_records(rows, columns=ALERT_COLUMNS)
+
+
+def due_alerts(conn, as_of):
+    """
+    Alerts with a horizon maturing on or before as_of, plus alerts the
+    tracker has never scheduled. Served from the next_maturity index.
+    """
+    as_of = pd.Timestamp(as_of).strftime('%Y-%m-%d')
+    return _read_alerts(
+        conn,
+        "WHERE next_maturity <= ? OR (next_maturity IS NULL AND return_10d IS NULL)",
+        (as_of,),
+    )
+
+
+def next_maturity(conn):
+    """Earliest scheduled maturity still in the queue (None if every alert is final)."""
+    row = conn.execute("SELECT MIN(next_maturity) FROM alerts").fetchone()
+    return pd.Timestamp(row[0]) if row and row[0] else None
+
+
+def get_meta(conn, key, default=None):
+    row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+    return row[0] if row else default
+
+
+def set_meta(conn, key, value):
+    with write_transaction(conn):
+        conn.execute(
+            "INSERT INTO meta (key, value) VALUES (?, ?) "
+            "ON CONFLICT (key) DO UPDATE SET value = excluded.value",
+            (key, str(value)),
+        )
+
+
+def changed_mask(before, after, columns):
+    """
+    Row-wise "did any of these columns change" between two aligned frames.
+    NaN == NaN, and floats are compared with a small tolerance so re-downloaded
+    prices don't mark every row dirty.
+    """
+    mask = np.zeros(len(after), dtype=bool)
+    for c in columns:
+        old = before[c] if c in before.columns else pd.Series(None, index=before.index)
+        old, new = old.to_numpy(dtype=object), after[c].to_numpy(dtype=object)
+        both_na = pd.isna(old) & pd.isna(new)
+        try:
+            old_num = pd.to_numeric(old).astype(float)
+            new_num = pd.to_numeric(new).astype(float)
+            same = both_na | np.isclose(old_num, new_num, rtol=1e-9, atol=1e-12)
+        except (ValueError, TypeError):
+            same = both_na | (old == new)
+        mask |= ~same
+    return pd.Series(mask, index=after.index)
+
+
+def export_csv(conn, csv_path):
+    """
+    Write the alerts_history.csv mirror atomically (readers never see a partial
+    file). The temp file is unique per call, so concurrent exports can't
+    publish each other's half-written output.
+    """
+    df = load_alerts(conn)[ALERT_COLUMNS]
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(csv_path) or ".",
+                                    prefix=f"{os.path.basename(csv_path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8", newline="") as f:
+            df.to_csv(f, index=False)
+        os.chmod(tmp_path, 0o644)  # mkstemp creates it owner-only
+        os.replace(tmp_path, csv_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return len(df)
+
+
+# ============================================================================
+# SNAPSHOT HISTORY
+# ============================================================================
+
+def _snapshot_record(snapshot):
+    """Snapshot dict (JSON snapshot keys, optionally more) -> row tuple."""
+    outcomes = snapshot.get('outcomes') or {}
+    classified = snapshot.get('classified') or 0
+    total = snapshot.get('total_alerts') or 0
+    pumps = snapshot.get('pumps', outcomes.get('confirmed_pump', 0) + outcomes.get('likely_pump', 0))
+    false_positives = snapshot.get('false_positives', outcomes.get('false_positive', 0))
+    row = dict(snapshot,
+               pumps=pumps,
+               false_positives=false_positives,
+               coverage=snapshot.get('coverage', classified / total * 100.0 if total else 0.0),
+               fp_rate=snapshot.get('fp_rate', false_positives / classified * 100.0 if classified else 0.0),
+               outcomes=json.dumps(outcomes),
+               score_bins=json.dumps(snapshot.get('score_bins') or {}))
+    return tuple(row.get(c) for c in SNAPSHOT_COLUMNS)
+
+
+def upsert_snapshots(conn, snapshots):
+    """
+    Write snapshot rows keyed on date (a re-run for a date replaces that
+    date's row). Returns rows written.
+    """
+    records = [_snapshot_record(s) for s in snapshots]
+    if not records:
+        return 0
+    placeholders = ", ".join("?" for _ in SNAPSHOT_COLUMNS)
+    updates = ", ".join(f"{c} = excluded.{c}" for c in SNAPSHOT_COLUMNS[1:])
+    sql = (f"INSERT INTO snapshots ({', '.join(SNAPSHOT_COLUMNS)}) VALUES ({placeholders}) "
+           f"ON CONFLICT (date) DO UPDATE SET {updates}")
+    with write_transaction(conn):
+        conn.executemany(sql, records)
+    return len(records)
+
+
+def load_snapshots(conn, start=None, end=None):
+    """
+    Snapshot history for [start, end] (open-ended when None), indexed by date.
+    outcomes/score_bins come back as dicts.
+    """
+    clauses, params = [], []
+    if start is not None:
+        clauses.append("date >= ?")
+        params.append(pd.Timestamp(start).strftime('%Y-%m-%d'))
+    if end is not None:
+        clauses.append("date <= ?")
+        params.append(pd.Timestamp(end).strftime('%Y-%m-%d'))
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    df = pd.read_sql_query(
+        f"SELECT {', '.join(SNAPSHOT_COLUMNS)} FROM snapshots {where} ORDER BY date",
+        conn, params=params,
+    )
+    df['date'] = pd.to_datetime(df['date'])
+    for c in ['outcomes', 'score_bins']:
+        df[c] = df[c].map(lambda v: json.loads(v) if v else {})
+    return df.set_index('date')
+
+
+def snapshot_before(conn, date):
+    """The latest snapshot dated strictly before date, as a dict (None if none)."""
+    row = conn.execute(
+        f"SELECT {', '.join(SNAPSHOT_COLUMNS)} FROM snapshots WHERE date < ? "
+        "ORDER BY date DESC LIMIT 1",
+        (pd.Timestamp(date).strftime('%Y-%m-%d'),),
+    ).fetchone()
+    if row is None:
+        return None
+    snapshot = dict(zip(SNAPSHOT_COLUMNS, row))
+    for c in ['outcomes', 'score_bins']:
+        snapshot[c] = json.loads(snapshot[c]) if snapshot[c] else {}
+    return snapshot
+
+
+def import_snapshot_files(conn, json_dir):
+    """One-time migration: seed an empty snapshot table from daily_snapshots/*.json."""
+    if conn.execute("SELECT 1 FROM snapshots LIMIT 1").fetchone() is not None:
+        return 0
+    snapshots = []
+    for path in sorted(glob.glob(os.path.join(json_dir, "????-??-??.json"))):
+        with open(path, "r", encoding="utf-8") as f:
+            snapshots.append(json.load(f))
+    return upsert_snapshots(conn, snapshots)
+
+
+# ============================================================================
+# MATERIALIZED ALERT CUBE
+# ============================================================================
+
+def replace_cube(conn, cube):
+    """Swap in a freshly built cube (readers see the old or the new one, never a mix)."""
+    df = cube[CUBE_COLUMNS].copy()
+    for c in ['day', 'week']:
+        df[c] = pd.to_datetime(df[c]).dt.strftime('%Y-%m-%d')
+    df = df.astype(object).where(pd.notna(df), None)
+    records = [tuple(v.item() if isinstance(v, np.generic) else v for v in rec)
+               for rec in df.itertuples(index=False, name=None)]
+    placeholders = ", ".join("?" for _ in CUBE_COLUMNS)
+    with write_transaction(conn):
+        conn.execute("DELETE FROM alert_cube")
+        conn.executemany(f"INSERT INTO alert_cube ({', '.join(CUBE_COLUMNS)}) VALUES ({placeholders})",
+                         records)
+    return len(records)
+
+
+def load_cube(conn):
+    """The materialized cube, in the shape alert_metrics.build_cube returns."""
+    df = pd.read_sql_query(f"SELECT {', '.join(CUBE_COLUMNS)} FROM alert_cube", conn)
+    df['day'] = pd.to_datetime(df['day'])
+    df['week'] = pd.to_datetime(df['week'])
+    return df
@@ -1,11 +1,19 @@
 import pandas as pd
-import numpy as np
-import yfinance as yf
-from datetime import datetime, timedelta
+from datetime import datetime
 import os
+import sys
 import glob
-from math import sqrt  
-import json
+
+import alert_metrics
+import alert_reports
+import alert_store
+import bar_cache
+import episode_state
+import fetch_planner
+import html_report
+import outcome_tracking
+import profiling
+import run_metrics
 
 
 
@@ -22,8 +30,9 @@ def find_latest_run():
 
 RUN_DIR = find_latest_run()
 ALERTS_DIR = os.path.join(RUN_DIR, "data", "alerts")
-ALERTS_HISTORY_FILE = os.path.join(ALERTS_DIR, "alerts_history.csv")
-TRACKING_DAYS = [1, 5, 10]  # Check returns at 1d, 5d, 10d after alert
+ALERTS_HISTORY_FILE = os.path.join(ALERTS_DIR, "alerts_history.csv")  # CSV mirror of alert_store
+SIGNALS_DIR = os.path.join(RUN_DIR, "data", "signals_csv")
+TRACKING_DAYS = outcome_tracking.TRACKING_DAYS  # Check returns at 1d, 5d, 10d after alert
 
 
 WEEKLY_REVIEWS_DIR = os.path.join(RUN_DIR, "weekly_reviews")
@@ -34,113 +43,75 @@ print("="*80)
 print("PUMP ALERT TRACKER - Validation System")
 print("="*80)
 print(f"Using data from: {RUN_DIR}")
+run_metrics.start("alert_tracker")
+profiling.start(RUN_DIR, "alert_tracker")  # --profile[=STAGE]
 
 # ============================================================================
 # LOAD ALERT HISTORY
 # ============================================================================
 
-if not os.path.exists(ALERTS_HISTORY_FILE):
-    print(f"\nNo alerts history found at {ALERTS_HISTORY_FILE}")
-    print("Run tiered_scanner.py first to generate alerts.")
-    exit()
+run_date = pd.Timestamp(datetime.now()).normalize()
 
-alerts_df = pd.read_csv(ALERTS_HISTORY_FILE)
-alerts_df['alert_date'] = pd.to_datetime(alerts_df['alert_date'])
-alerts_df['alert_price'] = pd.to_numeric(alerts_df['alert_price'])
+store = alert_store.connect(ALERTS_DIR)
+# One read snapshot for the full history and the due queue, so an alert the
+# scanner inserts in between can't show up in one and not the other
+with alert_store.read_transaction(store):
+    alerts_df = alert_store.load_alerts(store)
+    due_df = alert_store.due_alerts(store, run_date)
+    read_version = alert_store.alerts_version(store)
+
+if len(alerts_df) == 0:
+    print(f"\nNo alerts found in {alert_store.store_path(ALERTS_DIR)}")
+    print("Run tiered_scanner.py first to generate alerts.")
+    run_metrics.write(RUN_DIR)
+    profiling.finish()
+    sys.exit()
 
 print(f"\nLoaded {len(alerts_df)} historical alerts")
 print(f"Date range: {alerts_df['alert_date'].min().date()} to {alerts_df['alert_date'].max().date()}")
 
+# ============================================================================
+# MATURITY QUEUE: only alerts with a horizon due since the last run
+# ============================================================================
 
+last_run = alert_store.get_meta(store, "tracker_last_run")
 
-def classify_outcome(row):
-    """Classify alert outcome based on forward returns."""
-    ret_1d = row.get('return_1d')
-    ret_5d = row.get('return_5d')
-    ret_10d = row.get('return_10d')
-    max_dd = row.get('max_drawdown')
-
-    # Need at least 5-day return to classify
-    if pd.isna(ret_5d):
-        return 'pending'
+# Never-scheduled alerts (fresh from the scanner) get their first maturity now
+unscheduled = due_df['next_maturity'].isna()
+due_df.loc[unscheduled, 'next_maturity'] = outcome_tracking.schedule(due_df[unscheduled])
+newly_scheduled = due_df[unscheduled]
+due_df = due_df[due_df['next_maturity'] <= run_date]
 
-    # Confirmed pump: crashed within 5–10 days
-    if ret_5d < -0.15 or (ret_10d is not None and ret_10d < -0.20):
-        return 'confirmed_pump'
+print(f"Last tracker run: {last_run or 'never'}")
+print(f"Alerts due for evaluation: {len(due_df)} "
+      f"({len(alerts_df) - len(due_df)} final or not yet matured)")
 
-    # Quick reversal: down 10%+ in 1 day
-    if ret_1d is not None and ret_1d < -0.10:
-        return 'confirmed_pump'
 
-    # Deep drawdown even if recovered
-    if max_dd is not None and max_dd < -0.25:
-        return 'confirmed_pump'
-    
-    # Pump-ish: was up at day 5 but faded by day 10 (promo unwind / delayed dump)
-    if (ret_10d is not None) and (ret_5d is not None):
-        if ret_5d > 0.05 and ret_10d < -0.05:
-            return 'likely_pump'   # or 'uncertain' if you want to be conservative
 
-    # False positive: sustained gains
-    if ret_5d > 0.05:
-        return 'false_positive'
+# ============================================================================
+# FETCH ONLY THE BAR WINDOWS STILL NEEDED (via the local bar cache)
+# ============================================================================
 
-    # Uncertain: small movements
-    if ret_5d > -0.10:
-        return 'uncertain'
+print("\nPlanning price fetches for due alerts...")
 
-    return 'likely_pump'
+BARS_DIR = bar_cache.cache_dir_for(RUN_DIR)
+unique_tickers = due_df['ticker'].unique().tolist()
 
+needed = fetch_planner.needed_windows(due_df, run_date, TRACKING_DAYS)
+plan = fetch_planner.plan_fetches(needed, BARS_DIR)
+print(f"  {len(unique_tickers)} tickers, {sum(len(w) for w in needed.values())} windows needed, "
+      f"{len(plan)} missing from cache")
 
-# ============================================================================
-# BATCH DOWNLOAD ALL TICKER DATA (ONCE)
-# ============================================================================
+fetch_stats = fetch_planner.execute_plan(plan, BARS_DIR, run_date)
+print(f"  ✓ {fetch_stats['requests']} requests, {fetch_stats['bars']} bars transferred"
+      + (f", failed: {', '.join(sorted(set(fetch_stats['failed'])))}" if fetch_stats['failed'] else ""))
 
-print("\nBatch downloading price data for all tickers...")
-
-# Get unique tickers and date range
-unique_tickers = alerts_df['ticker'].unique().tolist()
-earliest_date = alerts_df['alert_date'].min()
-latest_date = datetime.now()
-
-print(f"  Downloading {len(unique_tickers)} tickers from {earliest_date.date()} to {latest_date.date()}...")
-
-# Download all at once
-try:
-    all_data = yf.download(
-        unique_tickers, 
-        start=earliest_date, 
-        end=latest_date + timedelta(days=1),
-        progress=False,
-        group_by='ticker',
-        auto_adjust=True  # Add this line
-    )
-    
-    # Handle single ticker case (no multiindex)
-    if len(unique_tickers) == 1:
-        all_data = {unique_tickers[0]: all_data}
-    else:
-        # Convert to dict of dataframes for easy lookup
-        ticker_data = {}
-        for ticker in unique_tickers:
-            try:
-                # Handle MultiIndex properly
-                if isinstance(all_data.columns, pd.MultiIndex):
-                    if ticker in all_data.columns.get_level_values(0):
-                        ticker_data[ticker] = all_data[ticker].copy()
-                else:
-                    # Single ticker or flat columns - just copy
-                    ticker_data[ticker] = all_data.copy()
-            except (KeyError, AttributeError, ValueError):
-                pass
-        all_data = ticker_data
-    
-    print(f"  ✓ Downloaded data for {len(all_data)} tickers")
-    
-except Exception as e:
-    print(f"  ✗ Batch download failed: {e}")
-    print("  Falling back to per-ticker downloads...")
-    all_data = {}
+all_data = {}
+for ticker in unique_tickers:
+    with run_metrics.stage('load', ticker):
+        df = bar_cache.load_bars(BARS_DIR, ticker)
+    if not df.empty:
+        all_data[ticker] = df
 
 # Check
 if len(all_data) == 0 and len(unique_tickers) > 0:
@@ -149,201 +120,93 @@ if len(all_data) == 0 and len(unique_tickers) > 0:
     print("  Check your internet connection or yfinance API status.\n")
 
 # ============================================================================
-# UPDATE ALERTS WITH OUTCOMES (using cached data)
+# UPDATE ALERTS WITH OUTCOMES (one vectorized pass over all due alerts)
 # ============================================================================
 
 print("\nCalculating outcomes for alerts...")
 
-def get_forward_returns_cached(ticker, alert_date, alert_price, days_list, cached_data):
-    """Calculate returns using pre-downloaded data."""
-    
-    # Try to use cached data first
-    if ticker in cached_data:
-        df = cached_data[ticker].copy()
-        
-        # Flatten multiindex if present
-        if isinstance(df.columns, pd.MultiIndex):
-            df.columns = df.columns.droplevel(1)
-    else:
-        # Fallback: download this ticker individually
-        try:
-            start = alert_date
-            end = alert_date + timedelta(days=30)
-            df = yf.download(ticker, start=start, end=end, progress=False, auto_adjust=True)
-            
-            if isinstance(df.columns, pd.MultiIndex):
-                df.columns = df.columns.droplevel(1)
-        except Exception as e:
-            print(f"    Error fetching {ticker}: {e}")
-            return {f'return_{d}d': None for d in days_list} | {
-                'max_drawdown': None, 'days_to_bottom': None
-            }
-    
-    if df.empty:
-        return {f'return_{d}d': None for d in days_list} | {
-            'max_drawdown': None, 'days_to_bottom': None
-        }
-    
-    # Restrict to days on/after alert_date
-    future_prices = df[df.index >= alert_date]
-    returns = {}
-    
-    for target_days in days_list:
-        if len(future_prices) > target_days:
-            actual_price = future_prices.iloc[target_days]['Close']
-            ret = (actual_price - alert_price) / alert_price
-            returns[f'return_{target_days}d'] = ret
-        else:
-            returns[f'return_{target_days}d'] = None
-    
-    # Max drawdown relative to alert price
-    if len(future_prices) > 0:
-        future_returns = (future_prices['Close'] - alert_price) / alert_price
-        returns['max_drawdown'] = future_returns.min()
-        bottom_ts = future_returns.idxmin()
-        returns['days_to_bottom'] = (bottom_ts - alert_date).days if bottom_ts is not pd.NaT else None
-    else:
-        returns['max_drawdown'] = None
-        returns['days_to_bottom'] = None
-    
-    return returns
-
-
-updated_rows = []
-for idx, row in alerts_df.iterrows():
-    ticker = row['ticker']
-    alert_date = row['alert_date']
-    alert_price = row['alert_price']
-    
-    days_since = max(0, (datetime.now() - alert_date).days)
-    print(f"  {ticker:6s} ({alert_date.date()}) - {days_since} days ago...", end=" ")
-    
-    # Get forward returns using cached data
-    returns = get_forward_returns_cached(ticker, alert_date, alert_price, TRACKING_DAYS, all_data)
-    
-    # Update row with new data
-    for key, value in returns.items():
-        row[key] = value
-    
-    # Classify outcome
-    row['outcome'] = classify_outcome(row)
-    row['days_since_alert'] = days_since
-    row['last_updated'] = datetime.now().strftime('%Y-%m-%d %H:%M')
-    
-    print(f"{row['outcome']}")
-    updated_rows.append(row)
-
-# ============================================================================
-# SAVE UPDATED DATA
-# ============================================================================
+evaluated_df = due_df.copy()
+with run_metrics.stage('classify'):
+    outcomes = outcome_tracking.evaluate_outcomes(due_df, all_data, TRACKING_DAYS)
+    for col in outcomes.columns:
+        evaluated_df[col] = outcomes[col]
+    evaluated_df['outcome'] = (evaluated_df.apply(outcome_tracking.classify_outcome, axis=1)
+                               if len(evaluated_df) > 0 else pd.Series(dtype=object))
+evaluated_df['days_since_alert'] = (run_date - evaluated_df['alert_date']).dt.days.clip(lower=0)
+evaluated_df['last_updated'] = datetime.now().strftime('%Y-%m-%d %H:%M')
 
-updated_df = pd.DataFrame(updated_rows)
-updated_df.to_csv(ALERTS_HISTORY_FILE, index=False)
-print(f"\nUpdated alerts saved to {ALERTS_HISTORY_FILE}")
-
-if "pump_score" in updated_df.columns:
-    bins = [0, 55, 60, 70, 200]
-    labels = ["≤55", "55–60", "60–70", "70+"]
-    updated_df["score_bin"] = pd.cut(
-        updated_df["pump_score"],
-        bins=bins,
-        labels=labels,
-        include_lowest=True
-    )
+for r in evaluated_df.itertuples():
+    print(f"  {r.ticker:6s} ({r.alert_date.date()}) - {r.days_since_alert} days ago... {r.outcome}")
 
 # ============================================================================
-# REPORT HELPERS: Wilson CI
+# SAVE UPDATED DATA
 # ============================================================================
 
-def wilson_ci(successes: int, trials: int, z: float = 1.96):
-    """
-    Wilson score interval for a binomial proportion.
-    Returns (low_pct, high_pct) in percent, or (None, None) if trials == 0.
-    """
-    if trials == 0:
-        return (None, None)
-    p = successes / trials
-    denom = 1.0 + (z*z) / trials
-    centre = p + (z*z) / (2.0 * trials)
-    margin = z * sqrt((p*(1.0 - p) + (z*z)/(4.0*trials)) / trials)
-    low = (centre - margin) / denom
-    high = (centre + margin) / denom
-    return low * 100.0, high * 100.0
+# Freshly scheduled alerts that aren't due yet still need their queue entry saved
+not_due_yet = newly_scheduled[~newly_scheduled.index.isin(evaluated_df.index)]
+evaluated_df = pd.concat([evaluated_df, not_due_yet])
+# Re-queue: shortest horizon still missing (NaT once final)
+evaluated_df['next_maturity'] = outcome_tracking.schedule(evaluated_df)
+
+key_cols = alert_store.KEY_COLUMNS
+evaluated_df = evaluated_df.set_index(key_cols)
+stored_df = alerts_df.set_index(key_cols)
+before = stored_df.reindex(evaluated_df.index)
+
+# Only rows whose outcome or schedule actually moved are written back
+changed = alert_store.changed_mask(before, evaluated_df, alert_store.TRACKED_COLUMNS)
+if changed.any():
+    with run_metrics.stage('write'):
+        alert_store.upsert_alerts(store, evaluated_df[changed].reset_index(),
+                                  update_columns=alert_store.OUTCOME_COLUMNS)
+# Refreshed on every run (not just on changes) so it also picks up the scanner's inserts
+with run_metrics.stage('write'):
+    alert_store.export_csv(store, ALERTS_HISTORY_FILE)
+
+# The scanner added these alerts to their ticker's episode as 'pending' signals;
+# now that the outcome is final it goes into the episode's pump_count and MASTER_TRUTH
+finalized = evaluated_df[evaluated_df['next_maturity'].isna()].reset_index()
+if len(finalized) > 0 and os.path.isdir(SIGNALS_DIR):
+    with run_metrics.stage('write'), episode_state.state_lock(SIGNALS_DIR):
+        state = episode_state.load_state(SIGNALS_DIR)
+        keys = [episode_state.reclassify(state, r.ticker, r.alert_date, r.outcome)
+                for r in finalized.itertuples()]
+        reclassified = finalized[[k is not None for k in keys]]
+        if len(reclassified) > 0:
+            episode_state.reclassify_master(SIGNALS_DIR, reclassified.rename(
+                columns={'alert_date': 'signal_date', 'outcome': 'classification'}))
+            episode_state.write_episodes(SIGNALS_DIR, state)
+            episode_state.save_state(SIGNALS_DIR, state)
+            print(f"Episodes reclassified: {', '.join(sorted({k for k in keys if k is not None}))}")
+alert_store.set_meta(store, "tracker_last_run", datetime.now().strftime('%Y-%m-%d %H:%M'))
+queue_head = alert_store.next_maturity(store)
+print(f"\nEvaluated {len(due_df)} alerts, wrote {int(changed.sum())} changed rows to {alert_store.store_path(ALERTS_DIR)}")
+print(f"Next maturity in queue: {queue_head.date() if queue_head is not None else 'none (all final)'}")
+
+# Reports still cover the full history: evaluated rows merged over the stored ones
+updated_df = pd.concat([
+    stored_df[~stored_df.index.isin(evaluated_df.index)],
+    evaluated_df,
+]).reset_index()[alerts_df.columns].sort_values(key_cols[::-1], ignore_index=True)
+
+# Every aggregate below (console, Markdown, JSON, dashboard) comes from this one pass.
+# The cube is materialized too, so dashboard filters are answered from its slices.
+with run_metrics.stage('metrics'):
+    cube = alert_metrics.build_cube(updated_df)
+    metrics = alert_metrics.metrics_from_cube(cube, run_date)
+    # The store version this run's own write produced; a scanner insert since the
+    # read moves the store past it, and the dashboard then recomputes instead
+    metrics.alerts_version = read_version + int(changed.any())
+with run_metrics.stage('write'):
+    metrics_file = alert_metrics.save_metrics(ALERTS_DIR, metrics)
+    alert_store.replace_cube(store, cube)
+pending = updated_df[updated_df['outcome'] == 'pending']
 
 # ============================================================================
 # GENERATE PERFORMANCE REPORT
 # ============================================================================
 
-print("\n" + "="*80)
-print("PERFORMANCE REPORT")
-print("="*80)
-
-# Filter to alerts with outcomes (at least 5 days old)
-classified = updated_df[updated_df['outcome'].isin(['confirmed_pump', 'false_positive', 'likely_pump', 'uncertain'])]
-pending = updated_df[updated_df['outcome'] == 'pending']
-
-print(f"\nTotal Alerts: {len(updated_df)}")
-print(f"  Classified: {len(classified)}")
-print(f"  Pending (< 5 days old): {len(pending)}")
-
-precision = None
-low = None
-high = None
-
-if len(classified) > 0:
-    print(f"\nOutcome Distribution:")
-    outcome_counts = classified['outcome'].value_counts()
-    for outcome, count in outcome_counts.items():
-        pct = count / len(classified) * 100
-        print(f"  {outcome:20s}: {count:3d} ({pct:.1f}%)")
-
-    # Precision = (confirmed + likely) / classified
-    pumps = len(classified[classified['outcome'] == 'confirmed_pump'])
-    likely = len(classified[classified['outcome'] == 'likely_pump'])
-    successes = pumps + likely
-    trials = len(classified)
-    precision = (successes / trials * 100.0) if trials > 0 else float("nan")
-    ci_low, ci_high = wilson_ci(successes, trials)
-    low, high = ci_low, ci_high
-
-
-    # Coverage
-    coverage_pct = (trials / len(updated_df) * 100.0) if len(updated_df) > 0 else 0.0
-
-    if ci_low is not None:
-        print(f"\nPRECISION RATE: {precision:.1f}% (95% CI: {ci_low:.1f}-{ci_high:.1f}%)")
-    else:
-        print(f"\nPRECISION RATE: N/A (no classified alerts yet)")
-    print("   (Confirmed + Likely Pumps) / Total Classified")
-    print(f"   Coverage: {trials}/{len(updated_df)} alerts ({coverage_pct:.1f}%)")
-
-    # Average returns by outcome
-    print(f"\nAverage Returns by Outcome:")
-    for outcome in ['confirmed_pump', 'likely_pump', 'uncertain', 'false_positive']:
-        subset = classified[classified['outcome'] == outcome]
-        if len(subset) > 0:
-            avg_5d = subset['return_5d'].mean() * 100 if 'return_5d' in subset.columns else np.nan
-            avg_10d = subset['return_10d'].mean() * 100 if 'return_10d' in subset.columns else np.nan
-            print(f"  {outcome:20s}: 5d={avg_5d:+.1f}%  10d={avg_10d:+.1f}%")
-
-    # Performance by tier
-    print(f"\nPerformance by Tier:")
-    for tier in ['tier1', 'tier2']:
-        tier_alerts = classified[classified['tier'] == tier] if 'tier' in classified.columns else pd.DataFrame()
-        if len(tier_alerts) > 0:
-            tier_pumps = len(tier_alerts[tier_alerts['outcome'].isin(['confirmed_pump', 'likely_pump'])])
-            tier_precision = tier_pumps / len(tier_alerts) * 100
-            print(f"  {tier}: {tier_precision:.1f}% precision ({tier_pumps}/{len(tier_alerts)} alerts)")
-
-    # Top alerted tickers
-    print(f"\nTop Alerted Tickers:")
-    ticker_counts = classified['ticker'].value_counts().head(5)
-    for ticker, count in ticker_counts.items():
-        ticker_alerts = classified[classified['ticker'] == ticker]
-        ticker_pumps = len(ticker_alerts[ticker_alerts['outcome'].isin(['confirmed_pump', 'likely_pump'])])
-        ticker_precision = ticker_pumps / len(ticker_alerts) * 100
-        avg_score = ticker_alerts['pump_score'].mean() if 'pump_score' in ticker_alerts.columns else np.nan
-        print(f"  {ticker:6s}: {count} alerts, {ticker_precision:.0f}% precision, avg_score={avg_score:.1f}")
+alert_reports.print_performance_report(metrics)
 
 # ============================================================================
 # PENDING ALERTS
@@ -363,350 +226,45 @@ if len(pending) > 0:
             print(f"   1-Day Return: {alert['return_1d']*100:+.1f}%")
 
 # ============================================================================
-# JSON SNAPSHOT + DIFF ENGINE HELPERS
+# WEEKLY REPORT + STATIC HTML + DAILY SNAPSHOT (Markdown + JSON + Diff)
 # ============================================================================
-def json_safe(obj):
-    """Convert numpy/pandas types to JSON-serializable types."""
-    if isinstance(obj, (np.integer, np.int32, np.int64)):
-        return int(obj)
-    if isinstance(obj, (np.floating, np.float32, np.float64)):
-        return float(obj)
-    if isinstance(obj, (pd.Timestamp, datetime)):
-        return obj.strftime("%Y-%m-%d")
-    if pd.isna(obj):
-        return None
-    return obj
-
-def save_json_snapshot(updated_df, json_dir):
-    """Save a machine-readable JSON snapshot of today's metrics."""
-
-    today = datetime.now().strftime("%Y-%m-%d")
-    out_path = os.path.join(json_dir, f"{today}.json")
-
-    # Build summary dict
-    classified_df = updated_df[updated_df["outcome"].isin(
-        ["confirmed_pump", "likely_pump", "false_positive", "uncertain"]
-    )]
-    pending_df = updated_df[updated_df["outcome"] == "pending"]
-
-    total = len(updated_df)
-    classified = len(classified_df)
-
-    # Precision calculation
-    if classified > 0:
-        pumps = len(classified_df[classified_df["outcome"].isin(
-            ["confirmed_pump", "likely_pump"]
-        )])
-        precision = pumps / classified * 100
-        ci_low, ci_high = wilson_ci(pumps, classified)
-    else:
-        precision, ci_low, ci_high = None, None, None
-
-    # Score bins (only if exists)
-    score_bins = {}
-    if "score_bin" in updated_df.columns:
-        cnts = updated_df["score_bin"].value_counts()
-        score_bins = {str(k): int(v) for k, v in cnts.items()}
-
-    snapshot = {
-        "date": today,
-        "total_alerts": int(total),
-        "classified": int(classified),
-        "pending": int(len(pending_df)),
-        "precision": json_safe(precision),
-        "ci_low": json_safe(ci_low),
-        "ci_high": json_safe(ci_high),
-        "outcomes": {k: int(v) for k, v in classified_df["outcome"].value_counts().to_dict().items()},
-        "score_bins": score_bins,  # Already converted to int in lines above
-    }
-
-    # Write JSON
-    with open(out_path, "w", encoding="utf-8") as fp:
-        json.dump(snapshot, fp, indent=4)
-
-    return out_path
-
-
-def compare_snapshots(today_json_path, json_dir):
-    """Compare today’s snapshot with yesterday’s and return diff text."""
-
-    today_date = os.path.basename(today_json_path).replace(".json", "")
-    yesterday_date = (datetime.strptime(today_date, "%Y-%m-%d") - timedelta(days=1))\
-                        .strftime("%Y-%m-%d")
-    yesterday_path = os.path.join(json_dir, f"{yesterday_date}.json")
-
-    if not os.path.exists(yesterday_path):
-        return "No snapshot for yesterday."
-
-    with open(today_json_path, "r") as f:
-        today = json.load(f)
-    with open(yesterday_path, "r") as f:
-        yest = json.load(f)
-
-    diff = []
-
-    # precision
-    if today.get("precision") and yest.get("precision"):
-        delta = today["precision"] - yest["precision"]
-        diff.append(f"Precision change: {yest['precision']:.1f}% → {today['precision']:.1f}% ({delta:+.1f}%)")
-
-    # total alerts
-    if today["total_alerts"] != yest["total_alerts"]:
-        delta = today["total_alerts"] - yest["total_alerts"]
-        diff.append(f"Total alerts change: {yest['total_alerts']} → {today['total_alerts']} ({delta:+d})")
-
-    # pending
-    if today["pending"] != yest["pending"]:
-        delta = today["pending"] - yest["pending"]
-        diff.append(f"Pending alerts change: {yest['pending']} → {today['pending']} ({delta:+d})")
-
-    if not diff:
-        return "No major changes since yesterday."
-
-    return "\n".join(diff)
-
-
-def generate_markdown_report(updated_df):
-
-    # Use global WEEKLY_REVIEWS_DIR from main script
-    out_dir = WEEKLY_REVIEWS_DIR
-    os.makedirs(out_dir, exist_ok=True)
-
-    today = datetime.now().strftime("%Y-%m-%d")
-
-    # -------------------------
-    # Basic splits
-    # -------------------------
-    total = len(updated_df)
-    classified_df = updated_df[updated_df["outcome"].isin(
-        ["confirmed_pump", "likely_pump", "false_positive", "uncertain"]
-    )]
-    pending_df = updated_df[updated_df["outcome"] == "pending"]
-
-    classified = len(classified_df)
-    coverage = (classified / total * 100) if total > 0 else 0
-
-    # -------------------------
-    # Precision + CI
-    # -------------------------
-
-    if classified > 0:
-        pumps = len(classified_df[classified_df["outcome"].isin(
-            ["confirmed_pump", "likely_pump"]
-        )])
-        precision = (pumps / classified) * 100
-        low, high = wilson_ci(pumps, classified)
-    else:
-        precision = None
-        low = None
-        high = None
-
-    # -------------------------
-    # Score-bin analysis
-    # -------------------------
-    score_bin_section = ""
-    if classified > 0 and "pump_score" in classified_df.columns:
-        bins = [0, 55, 60, 70, 200]
-        labels = ["≤55", "55–60", "60–70", "70+"]
-
-        classified_df["score_bin"] = pd.cut(
-            classified_df["pump_score"],
-            bins=bins,
-            labels=labels,
-            include_lowest=True
-        )
-
-        score_rows = []
-        for label in labels:
-            group = classified_df[classified_df["score_bin"] == label]
-            if len(group) == 0:
-                continue
-            fp = len(group[group["outcome"] == "false_positive"])
-            pumps2 = len(group[group["outcome"].isin(["confirmed_pump", "likely_pump"])])
-            score_rows.append((label, len(group), pumps2, fp))
-
-        if score_rows:
-            score_bin_section += "## 📊 Score-Bin Analysis (Classified Only)\n\n"
-            score_bin_section += "| Score Range | Count | Pumps | FP | Precision % | FP Rate % |\n"
-            score_bin_section += "|-------------|-------|-------|----|-------------|-----------|\n"
-            for (rng, count, p2, fp2) in score_rows:
-                prec2 = (p2 / count * 100) if count > 0 else 0
-                fp_rate2 = (fp2 / count * 100) if count > 0 else 0
-                score_bin_section += f"| {rng} | {count} | {p2} | {fp2} | {prec2:.1f} | {fp_rate2:.1f} |\n"
-
-            # Threshold recommendation
-            bottom = [r for r in score_rows if r[0] == "≤55"]
-            if bottom:
-                _, count_b, pumps_b, fp_b = bottom[0]
-                fp_rate_b = fp_b / count_b * 100
-                score_bin_section += "\n### 🎯 Threshold Recommendation\n"
-                if fp_rate_b > 60:
-                    score_bin_section += (
-                        f"- FP rate **{fp_rate_b:.1f}%** in ≤55 ⇒ **Raise threshold to 55**\n"
-                    )
-                elif fp_rate_b < 30 and precision and precision > 85:
-                    score_bin_section += (
-                        f"- FP rate **{fp_rate_b:.1f}%** with high precision ⇒ **Lower threshold to 45**\n"
-                    )
-                else:
-                    score_bin_section += "- Current threshold (50) is acceptable.\n"
-
-    # -------------------------
-    # Tier performance
-    # -------------------------
-    tier_section = ""
-    if "tier" in classified_df.columns and classified > 0:
-        tier_section += "## 🏆 Tier Performance (Classified Only)\n\n"
-        tier_section += "| Tier | Alerts | Pumps | Precision % |\n"
-        tier_section += "|------|--------|--------|--------------|\n"
-
-        tier_stats = []
-        for tier in ["tier1", "tier2"]:
-            subset = classified_df[classified_df["tier"] == tier]
-            if len(subset) == 0:
-                continue
-            pumps_t = len(subset[subset["outcome"].isin(["confirmed_pump", "likely_pump"])])
-            prec_t = pumps_t / len(subset) * 100
-            tier_stats.append((tier, len(subset), pumps_t, prec_t))
-            tier_section += f"| {tier} | {len(subset)} | {pumps_t} | {prec_t:.1f}% |\n"
-
-        if len(tier_stats) == 2:
-            diff = tier_stats[0][3] - tier_stats[1][3]
-            if diff >= 5:
-                tier_section += f"\n✔ Tier 1 outperforms Tier 2 by **{diff:.1f} pts**\n"
-            else:
-                tier_section += f"\n⚠ Tier difference only **{diff:.1f} pts** → Tiering may need tuning\n"
-
-    # -------------------------
-    # Pending table
-    # -------------------------
-    pending_section = "## ⏳ Pending Alerts\n\n"
-    if len(pending_df) == 0:
-        pending_section += "*No pending alerts.*\n"
-    else:
-        pending_section += "| Ticker | Alert Date | Days Since | Classifies On |\n"
-        pending_section += "|--------|------------|------------|---------------|\n"
-        for _, r in pending_df.iterrows():
-            days = r["days_since_alert"]
-            classify_on = (r["alert_date"] + pd.Timedelta(days=5)).date()
-            pending_section += f"| {r['ticker']} | {r['alert_date'].date()} | {days} | {classify_on} |\n"
-
-    # -------------------------
-    # Final Markdown assembly
-    # -------------------------
-    md = f"""
-# 📊 Pump Detector Weekly Report  
-Generated: **{today}**
-
-## 🧭 Executive Summary
-| Metric | Value |
-|--------|--------|
-| **Total Alerts** | {total} |
-| **Classified Alerts** | {classified} |
-| **Coverage** | {coverage:.1f}% |
-| **Precision** | {precision:.1f}% ({low:.1f}–{high:.1f}% 95% CI) |
-| **Pending Alerts** | {len(pending_df)} |
-
----
-
-## 🎯 Outcome Distribution
-"""
-
-    if classified == 0:
-        md += "*No classified alerts yet.*\n"
-    else:
-        md += "| Outcome | Count |\n|---------|--------|\n"
-        for o, cnt in classified_df["outcome"].value_counts().items():
-            md += f"| {o} | {cnt} |\n"
-
-    md += "\n---\n\n"
-    md += score_bin_section
-    md += "\n---\n\n"
-    md += tier_section
-    md += "\n---\n\n"
-    md += pending_section
-
-    # Save file
-    out_path = os.path.join(out_dir, f"report_{today}.md")
-    with open(out_path, "w", encoding="utf-8") as f:
-        f.write(md)
-
-    print(f"\nMarkdown report saved to: {out_path}")
-
-
-
-generate_markdown_report(updated_df)
+
+with run_metrics.stage('report'):
+    alert_reports.generate_markdown_report(metrics, WEEKLY_REVIEWS_DIR)
+    html_report.generate_html_report(metrics, cube, updated_df, os.path.join(RUN_DIR, html_report.HTML_DIR),
+                                     run_name=os.path.basename(os.path.normpath(RUN_DIR)))
 
 
 print("\n" + "="*80)
 print("TRACKING COMPLETE")
 print("="*80)
 
-# ============================================================================
-# DAILY SNAPSHOT (Markdown + JSON + Diff)
-# ============================================================================
-
-DAILY_DIR = os.path.join(RUN_DIR, "daily_snapshots")
+DAILY_DIR = os.path.join(RUN_DIR, alert_store.LEGACY_SNAPSHOT_DIR)
 os.makedirs(DAILY_DIR, exist_ok=True)
 
-today = datetime.now().strftime("%Y-%m-%d")
-md_path = os.path.join(DAILY_DIR, f"{today}.md")
-
-# ---------- SAVE JSON first ----------
-json_path = save_json_snapshot(updated_df, DAILY_DIR)
+# ---------- SAVE JSON + snapshot history row ----------
+with run_metrics.stage('write'):
+    json_path = alert_reports.save_json_snapshot(metrics, DAILY_DIR)
+    alert_store.import_snapshot_files(store, DAILY_DIR)
+    previous = alert_store.snapshot_before(store, metrics.as_of)
+    alert_store.upsert_snapshots(store, [metrics.history_row()])
+store.close()
 
 # ---------- Compute diff ----------
-diff_text = compare_snapshots(json_path, DAILY_DIR)
+diff_text = alert_reports.diff_snapshots(metrics.snapshot(), previous)
 
 # ---------- Build Markdown ----------
-with open(md_path, "w", encoding="utf-8") as f:
-
-    f.write(f"# 📅 Daily Pump Detector Snapshot – {today}\n\n")
-
-    # High-level metrics
-    f.write(f"- Total alerts: **{len(updated_df)}**\n")
-    f.write(f"- Classified alerts: **{len(classified)}**\n")
-    f.write(f"- Pending alerts: **{len(pending)}**\n")
-
-# Recompute precision for daily snapshot
-    if len(classified) > 0:
-        daily_pumps = len(classified[classified['outcome'].isin(['confirmed_pump', 'likely_pump'])])
-        daily_precision = (daily_pumps / len(classified)) * 100
-        daily_low, daily_high = wilson_ci(daily_pumps, len(classified))
-        precision_str = f"{daily_precision:.1f}% (95% CI {daily_low:.1f}–{daily_high:.1f}%)"
-    else:
-        precision_str = "Not enough classified alerts yet"
-
-    f.write(f"- Precision: **{precision_str}**\n")
-
-    # Outcome distribution
-    f.write("\n## 📊 Outcome Distribution\n")
-    if len(classified) == 0:
-        f.write("No classified alerts yet.\n")
-    else:
-        for outcome, cnt in classified["outcome"].value_counts().items():
-            f.write(f"- {outcome}: **{cnt}**\n")
-
-    # Score bins
-    if "pump_score" in updated_df.columns:
-        f.write("\n## 🎯 Score Bins\n")
-        bins = [0, 55, 60, 70, 200]
-        labels = ["≤55", "55–60", "60–70", "70+"]
-
-        tmp = updated_df.dropna(subset=["pump_score"]).copy()
-        if not tmp.empty:
-            tmp["score_bin"] = pd.cut(tmp["pump_score"], bins=bins, labels=labels, include_lowest=True)
-            score_counts = tmp["score_bin"].value_counts().reindex(labels, fill_value=0)
-
-            for rng, cnt in score_counts.items():
-                f.write(f"- {rng}: **{cnt} alerts**\n")
-
-    # Diff vs yesterday
-    f.write("\n## 🔄 Change vs Yesterday\n")
-    f.write(diff_text + "\n")
+md_path = alert_reports.write_daily_snapshot(metrics, DAILY_DIR, diff_text)
 
 print(f"Daily MD snapshot saved to: {md_path}")
 print(f"Daily JSON snapshot saved to: {json_path}")
+print(f"Metrics saved to: {metrics_file}")
 
 print(f"\nRun this script daily to update outcomes as they mature.")
 print(f"Alerts need 5+ days to be classified as pumps or false positives.")
+print(f"Earlier days can be rebuilt in bulk with report_backfill.py.")
+
+run_metrics.count('alerts_evaluated', len(due_df))
+run_metrics.count('rows_written', int(changed.sum()))
+run_metrics.write(RUN_DIR)
+profiling.finish()
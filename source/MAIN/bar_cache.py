@@ -0,0 +1,195 @@
+import os
+import json
+import time
+import tempfile
+from contextlib import contextmanager
+
+import pandas as pd
+
+import trading_calendar
+
+# ============================================================================
+# LOCAL DAILY BAR CACHE
+# ============================================================================
+#
+# One CSV of auto-adjusted daily OHLCV per ticker under <run>/data/bars/, plus
+# a small <TICKER>.coverage.json listing the date ranges already fetched. The
+# coverage file is what lets callers skip ranges that legitimately have no
+# bars (weekends, holidays, halts) instead of re-requesting them forever.
+#
+# The tracker, the replay and the dashboard's prefetcher all fill the same
+# cache, possibly at once. Each ticker's read-merge-write runs under a
+# <TICKER>.lock file, and files are replaced from unique temp files.
+
+BAR_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+LOCK_STALE_SECONDS = 60  # A lock this old was left by a crashed writer
+LOCK_POLL_SECONDS = 0.05
+
+
+def cache_dir_for(run_dir):
+    return os.path.join(run_dir, "data", "bars")
+
+
+def _bars_path(cache_dir, ticker):
+    return os.path.join(cache_dir, f"{ticker}.csv")
+
+
+def _coverage_path(cache_dir, ticker):
+    return os.path.join(cache_dir, f"{ticker}.coverage.json")
+
+
+def _lock_path(cache_dir, ticker):
+    return os.path.join(cache_dir, f"{ticker}.lock")
+
+
+def _atomic_write(path, write_fn):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=f"{os.path.basename(path)}.", suffix=".tmp")
+    os.close(fd)
+    try:
+        write_fn(tmp_path)
+        os.chmod(tmp_path, 0o644)  # mkstemp creates it owner-only
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+@contextmanager
+def ticker_lock(cache_dir, ticker):
+    """
+    Cross-process lock on one ticker's cache files (an O_EXCL lock file, so
+    it works the same on every OS). Writes are short, so a lock older than
+    LOCK_STALE_SECONDS is assumed abandoned and broken.
+    """
+    path = _lock_path(cache_dir, ticker)
+    while True:
+        try:
+            os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            break
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(path) > LOCK_STALE_SECONDS:
+                    os.remove(path)
+                    continue
+            except FileNotFoundError:
+                continue
+            time.sleep(LOCK_POLL_SECONDS)
+    try:
+        yield
+    finally:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+# ============================================================================
+# DATE INTERVALS (inclusive [start, end] pairs of Timestamps)
+# ============================================================================
+
+def merge_intervals(intervals):
+    """Sort and merge overlapping ranges, and ranges with no session between them."""
+    merged = []
+    for start, end in sorted((pd.Timestamp(s), pd.Timestamp(e)) for s, e in intervals):
+        if merged and start <= trading_calendar.next_session(merged[-1][1]):
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return [(s, e) for s, e in merged]
+
+
+def subtract_intervals(needed, covered):
+    """Parts of `needed` not inside `covered` (both lists of merged intervals)."""
+    gaps = []
+    for start, end in needed:
+        cursor = start
+        for c_start, c_end in covered:
+            if c_end < cursor or c_start > end:
+                continue
+            if c_start > cursor:
+                gaps.append((cursor, c_start - pd.Timedelta(days=1)))
+            cursor = max(cursor, c_end + pd.Timedelta(days=1))
+            if cursor > end:
+                break
+        if cursor <= end:
+            gaps.append((cursor, end))
+    # Drop gaps that contain no session at all (weekends, holidays)
+    return [(s, e) for s, e in gaps if len(trading_calendar.sessions_in_range(s, e)) > 0]
+
+
+# ============================================================================
+# READ / WRITE
+# ============================================================================
+
+def load_coverage(cache_dir, ticker):
+    path = _coverage_path(cache_dir, ticker)
+    if not os.path.exists(path):
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        return merge_intervals(json.load(f))
+
+
+def bars_mtime(cache_dir, ticker):
+    """Modification time of a ticker's cached bars (0.0 if none are cached)."""
+    path = _bars_path(cache_dir, ticker)
+    return os.path.getmtime(path) if os.path.exists(path) else 0.0
+
+
+def load_bars(cache_dir, ticker, start=None, end=None):
+    """Cached bars for a ticker, optionally sliced to [start, end]. Empty frame if none."""
+    path = _bars_path(cache_dir, ticker)
+    if not os.path.exists(path):
+        return pd.DataFrame(columns=BAR_COLUMNS, index=pd.DatetimeIndex([], name='Date'))
+    df = pd.read_csv(path, index_col=0, parse_dates=True)
+    df.index.name = 'Date'
+    if start is not None:
+        df = df[df.index >= pd.Timestamp(start)]
+    if end is not None:
+        df = df[df.index <= pd.Timestamp(end)]
+    return df
+
+
+def store_bars(cache_dir, ticker, df, covered=None, through_last_bar=False):
+    """
+    Merge freshly downloaded bars into the cache and mark the `covered`
+    (start, end) range as fetched. Returns the number of bars received.
+
+    Coverage is only recorded when bars came back: a failed ticker in a
+    batched download arrives as all-NaN columns, and marking its range
+    covered would stop it ever being requested again. With through_last_bar
+    the range is cut at the last bar received, for ranges running up to the
+    run date whose trailing bars may not be published yet.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    if isinstance(df.columns, pd.MultiIndex):
+        df = df.copy()
+        df.columns = df.columns.droplevel(1)
+    df = df[[c for c in BAR_COLUMNS if c in df.columns]].dropna(how='all')
+    if df.index.tz is not None:
+        df.index = df.index.tz_localize(None)
+
+    if len(df) == 0:
+        return 0
+
+    with ticker_lock(cache_dir, ticker):
+        existing = load_bars(cache_dir, ticker)
+        combined = pd.concat([existing[~existing.index.isin(df.index)], df]).sort_index()
+        combined.index.name = 'Date'
+        _atomic_write(_bars_path(cache_dir, ticker), lambda p: combined.to_csv(p))
+
+        if covered is None:
+            return len(df)
+        covered_start, covered_end = pd.Timestamp(covered[0]), pd.Timestamp(covered[1])
+        if through_last_bar:
+            covered_end = min(covered_end, df.index.max().normalize())
+        if covered_end < covered_start:
+            return len(df)
+        intervals = merge_intervals(load_coverage(cache_dir, ticker) + [(covered_start, covered_end)])
+        payload = [[s.strftime('%Y-%m-%d'), e.strftime('%Y-%m-%d')] for s, e in intervals]
+
+        def write_json(p):
+            with open(p, "w", encoding="utf-8") as f:
+                json.dump(payload, f)
+        _atomic_write(_coverage_path(cache_dir, ticker), write_json)
+    return len(df)
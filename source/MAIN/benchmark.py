@@ -0,0 +1,256 @@
+import pandas as pd
+import numpy as np
+from datetime import datetime
+import os
+import io
+import runpy
+import tracemalloc
+import contextlib
+from time import perf_counter
+from pathlib import Path
+
+import synthetic_market
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+
+# ============================================================================
+# SCALING BENCHMARK
+# ============================================================================
+#
+# Runs the detector pipeline on synthetic markets (synthetic_market) of
+# increasing size and reports, per stage and size, wall time, throughput
+# and peak traced memory, plus how the detection counts grow with the
+# universe:
+#
+#   features        pump_detector.add_features per ticker
+#   scoring         pump_detector.score_features (pump_score and flag) per ticker
+#   backtest        pump_detector.backtest_signals per flagged ticker
+#   classification  pump_detector.auto_classify_signals on the master table
+#   episodes        pump_detector.detect_pump_episodes
+#   analyzer        pump_analyzer.py on the episodes it wrote
+#
+# Settings come from the environment, as in the other scripts:
+#   BENCH_SIZES     comma-separated ticker counts (default 10,100,1000,10000)
+#   BENCH_DAYS      sessions per ticker (default 252)
+#   BENCH_SEED      generator seed (default 0)
+#   BENCH_MEMORY    1 = run each stage a second time under tracemalloc (default 1)
+#   BENCH_ANALYZER  1 = include the pump_analyzer.py stage (default 1)
+#   BENCH_DIR       output folder (default benchmarks/<timestamp>)
+
+SIZES = [int(s) for s in os.environ.get("BENCH_SIZES", "10,100,1000,10000").split(",") if s.strip()]
+DAYS = int(os.environ.get("BENCH_DAYS", synthetic_market.DAYS))
+SEED = int(os.environ.get("BENCH_SEED", 0))
+TRACE_MEMORY = os.environ.get("BENCH_MEMORY", "1") == "1"
+RUN_ANALYZER = os.environ.get("BENCH_ANALYZER", "1") == "1"
+BENCH_DIR = os.path.abspath(os.environ.get("BENCH_DIR", os.path.join("benchmarks", f"{datetime.now():%Y-%m-%d_%H%M}")))
+
+# pump_detector creates runs/<RUN_NAME> on import; an absolute RUN_NAME points
+# that at the benchmark folder instead of adding an empty run for the other
+# scripts to pick up as the latest one.
+os.environ["RUN_NAME"] = BENCH_DIR
+import pump_detector  # noqa: E402
+
+
+# ============================================================================
+# MEASUREMENT
+# ============================================================================
+
+def measure(fn, *args):
+    """
+    Time one call of fn(*args). With TRACE_MEMORY the call is repeated under
+    tracemalloc for its peak (tracing slows the call, so it isn't timed).
+    Returns (result, seconds, peak MB or None).
+    """
+    started = perf_counter()
+    result = fn(*args)
+    seconds = perf_counter() - started
+    peak_mb = None
+    if TRACE_MEMORY:
+        tracemalloc.start()
+        try:
+            fn(*args)
+            peak_mb = tracemalloc.get_traced_memory()[1] / 2**20
+        finally:
+            tracemalloc.stop()
+    return result, seconds, peak_mb
+
+
+@contextlib.contextmanager
+def quiet():
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+# ============================================================================
+# STAGES
+# ============================================================================
+
+def features(bars):
+    return {t: pump_detector.add_features(df.copy()) for t, df in bars.items()}
+
+
+def scoring(featured):
+    return {t: pump_detector.score_features(df.copy()) for t, df in featured.items()}
+
+
+def backtest(scored):
+    frames = [pump_detector.backtest_signals(t, df) for t, df in scored.items()]
+    frames = [f for f in frames if f is not None]
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+
+def classification(master):
+    return pump_detector.auto_classify_signals(master.copy())
+
+
+def episodes(master):
+    with quiet():
+        return pump_detector.detect_pump_episodes(master.copy())
+
+
+def analyzer(run_dir):
+    """pump_analyzer.py run in-process on run_dir (it also writes data/analysis under the cwd)."""
+    cwd = os.getcwd()
+    os.environ["RUN_DIR"] = run_dir
+    os.chdir(run_dir)
+    try:
+        with quiet():
+            runpy.run_path(str(SCRIPT_DIR / "pump_analyzer.py"), run_name="__main__")
+    finally:
+        os.chdir(cwd)
+        import matplotlib.pyplot as plt
+        plt.close("all")
+
+
+def alert_hits(scored):
+    """(ticker, date) of every flagged bar."""
+    frames = [pd.DataFrame({'ticker': t, 'date': df.index[df['flag'].to_numpy()]}) for t, df in scored.items()]
+    return pd.concat(frames, ignore_index=True)
+
+
+def scaling_exponent(sizes, values):
+    """Slope of log(value) on log(size): 1 = linear, 2 = quadratic."""
+    sizes, values = np.asarray(sizes, dtype=float), np.asarray(values, dtype=float)
+    ok = (sizes > 0) & (values > 0)
+    if ok.sum() < 2:
+        return None
+    return float(np.polyfit(np.log(sizes[ok]), np.log(values[ok]), 1)[0])
+
+
+# ============================================================================
+# RUN
+# ============================================================================
+
+print("="*80)
+print("PUMP DETECTOR SCALING BENCHMARK")
+print("="*80)
+print(f"Sizes: {SIZES} tickers x {DAYS} sessions, seed {SEED}")
+print(f"Memory tracing: {'on' if TRACE_MEMORY else 'off'}, analyzer: {'on' if RUN_ANALYZER else 'off'}")
+print(f"Output: {BENCH_DIR}")
+os.makedirs(BENCH_DIR, exist_ok=True)
+
+timings = []
+counts = []
+recalls = []
+
+for n in SIZES:
+    run_dir = os.path.join(BENCH_DIR, f"{n}_tickers")
+    os.makedirs(os.path.join(run_dir, "data", "analysis"), exist_ok=True)
+    pump_detector.RUN_DIR = run_dir
+    print(f"\n--- {n} tickers ---")
+
+    (bars, events), gen_s, gen_mb = measure(synthetic_market.generate_market, n, DAYS, None, SEED)
+    num_bars = sum(len(df) for df in bars.values())
+
+    def record(stage, seconds, peak_mb, rows):
+        timings.append({
+            'tickers': n, 'stage': stage, 'rows_in': rows, 'seconds': seconds,
+            'tickers_per_s': n / seconds if seconds > 0 else None,
+            'rows_per_s': rows / seconds if seconds > 0 else None,
+            'peak_mb': peak_mb,
+        })
+        mem = f", peak {peak_mb:,.1f} MB" if peak_mb is not None else ""
+        print(f"  {stage:15s} {seconds:9.3f}s  {rows:>10,} rows{mem}")
+
+    record('generate', gen_s, gen_mb, num_bars)
+    featured, s, mb = measure(features, bars)
+    record('features', s, mb, num_bars)
+    scored, s, mb = measure(scoring, featured)
+    record('scoring', s, mb, num_bars)
+    del featured
+    master, s, mb = measure(backtest, scored)
+    record('backtest', s, mb, len(master))
+
+    row = {'tickers': n, 'bars': num_bars, 'events': len(events)}
+    hits = alert_hits(scored)
+    row['alerts'] = len(hits)
+    row['alerts_per_1k_bars'] = len(hits) / num_bars * 1000 if num_bars else None
+    row['signals'] = len(master)
+
+    if len(master) > 0:
+        master, s, mb = measure(classification, master)
+        record('classification', s, mb, len(master))
+        (_, episode_df, _), s, mb = measure(episodes, master)
+        record('episodes', s, mb, len(master))
+        for cls, c in master['classification'].value_counts().items():
+            row[cls] = int(c)
+        row['episodes'] = len(episode_df)
+        row['multi_signal_episodes'] = int((episode_df['signal_count'] >= 2).sum())
+
+        if RUN_ANALYZER:
+            _, s, mb = measure(analyzer, run_dir)
+            record('analyzer', s, mb, len(master))
+            campaigns_path = os.path.join(run_dir, "data", "analysis", "coordinated_campaigns.csv")
+            if os.path.exists(campaigns_path):
+                row['campaigns'] = len(pd.read_csv(campaigns_path))
+
+    # Detection against the injected events: an alert between start and the day after the peak
+    recall = synthetic_market.detection_recall(events, hits, lag=1)
+    pumps = recall[[synthetic_market.PROFILES[p].crash != 'none' for p in recall.index]]
+    row['pump_recall_pct'] = (pumps['detected'].sum() / pumps['events'].sum() * 100.0) if pumps['events'].sum() else None
+    counts.append(row)
+    recalls.append(recall.reset_index().assign(tickers=n))
+    del bars, scored, master, hits
+
+timings_df = pd.DataFrame(timings)
+counts_df = pd.DataFrame(counts).set_index('tickers')
+recall_df = pd.concat(recalls, ignore_index=True) if recalls else pd.DataFrame()
+
+timings_df.to_csv(os.path.join(BENCH_DIR, "stage_timings.csv"), index=False)
+counts_df.to_csv(os.path.join(BENCH_DIR, "detection_counts.csv"))
+recall_df.to_csv(os.path.join(BENCH_DIR, "detection_recall.csv"), index=False)
+
+# ============================================================================
+# SUMMARY
+# ============================================================================
+
+print("\n" + "="*80)
+print("SECONDS PER STAGE")
+print("="*80)
+seconds = timings_df.pivot(index='stage', columns='tickers', values='seconds')
+seconds = seconds.reindex([s for s in timings_df['stage'].unique()])
+seconds['scaling_exp'] = [scaling_exponent(SIZES, r) for r in seconds[SIZES].to_numpy()]
+print(seconds.round(3).to_string())
+
+print("\n" + "="*80)
+print("THROUGHPUT (tickers/s)  |  PEAK MEMORY (MB)")
+print("="*80)
+print(timings_df.pivot(index='stage', columns='tickers', values='tickers_per_s')
+      .reindex(seconds.index).round(1).to_string())
+if TRACE_MEMORY:
+    print()
+    print(timings_df.pivot(index='stage', columns='tickers', values='peak_mb')
+          .reindex(seconds.index).round(1).to_string())
+
+print("\n" + "="*80)
+print("DETECTION COUNTS")
+print("="*80)
+print(counts_df.round(1).astype(object).T.to_string())
+
+print("\n" + "="*80)
+print("RECALL BY EVENT PROFILE (%)")
+print("="*80)
+if len(recall_df):
+    print(recall_df.pivot(index='profile', columns='tickers', values='recall_pct').round(1).to_string())
+
+print(f"\nResults saved to: {BENCH_DIR}")
@@ -0,0 +1,179 @@
+import numpy as np
+import pandas as pd
+
+# ============================================================================
+# CROSS-TICKER CAMPAIGN DETECTION
+# ============================================================================
+#
+# A single sweep over every signal sorted by date pairs each signal with the
+# signals of other tickers in the preceding WINDOW_DAYS. Counting those pairs
+# gives a sparse ticker x ticker co-occurrence matrix (one row per pair that
+# actually fired together), so there is no all-pairs comparison. Pairs that
+# co-fire at least MIN_SUPPORT times become edges; a union-find over those
+# edges yields the connected components = suspected coordinated campaigns.
+
+WINDOW_DAYS = 3   # Signals at most this many days apart count as firing together
+MIN_SUPPORT = 3   # Co-firings needed before two tickers are linked
+MAX_PAIRS = 5_000_000  # Candidate pairs materialized per sweep chunk
+
+EDGE_COLUMNS = ['campaign_id', 'ticker_a', 'ticker_b', 'co_signals', 'jaccard',
+                'first_date', 'last_date']
+CAMPAIGN_COLUMNS = ['campaign_id', 'num_tickers', 'tickers', 'num_edges',
+                    'total_co_signals', 'first_date', 'last_date']
+
+
+def _window_pairs(day, codes, lo, hi, window_days):
+    """
+    Index pairs (earlier, later) for later in [lo, hi) of signals at most
+    window_days apart. day must be sorted; same-ticker pairs are dropped.
+    """
+    start = np.searchsorted(day, day[lo:hi] - window_days, side='left')
+    counts = np.arange(lo, hi) - start
+    later = np.repeat(np.arange(lo, hi), counts)
+    # Offset of each pair within its signal's window: 1..counts[i]
+    first_pair = np.cumsum(counts) - counts
+    earlier = later - (np.arange(len(later)) - np.repeat(first_pair, counts) + 1)
+    keep = codes[earlier] != codes[later]
+    return earlier[keep], later[keep]
+
+
+def _chunks(day, window_days, max_pairs):
+    """
+    Split the sweep into [lo, hi) row ranges of about max_pairs pairs each,
+    cut only between days so every (pair, day) falls in a single chunk.
+    """
+    pair_counts = np.arange(len(day)) - np.searchsorted(day, day - window_days, side='left')
+    day_ends = np.r_[np.flatnonzero(np.diff(day)) + 1, len(day)]
+    pairs_through = np.cumsum(pair_counts)[day_ends - 1]
+    lo = 0
+    while lo < len(day):
+        spent = pairs_through[np.searchsorted(day_ends, lo) - 1] if lo else 0
+        fits = np.searchsorted(pairs_through, spent + max_pairs, side='right')
+        # Always take at least the next day, however many pairs it has
+        hi = day_ends[max(fits, np.searchsorted(day_ends, lo, side='right') + 1) - 1]
+        yield lo, int(hi)
+        lo = int(hi)
+
+
+def _components(n, a, b):
+    """Union-find over edges (a[i], b[i]) of n nodes; returns a root label per node."""
+    parent = np.arange(n)
+
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for x, y in zip(a.tolist(), b.tolist()):
+        rx, ry = find(x), find(y)
+        if rx != ry:
+            parent[max(rx, ry)] = min(rx, ry)
+    return np.array([find(x) for x in range(n)])
+
+
+def co_occurrence(signals, window_days=WINDOW_DAYS, min_support=1, max_pairs=MAX_PAIRS):
+    """
+    Ticker co-firing counts from (ticker, signal_date) rows.
+
+    Returns (tickers, edges). tickers is the sorted ticker index. edges has
+    one row per ticker pair with the number of distinct days on which one
+    of them fired within window_days of the other (pairs with fewer than
+    min_support such days are dropped).
+    """
+    sig = (signals[['ticker', 'signal_date']]
+           .assign(signal_date=pd.to_datetime(signals['signal_date']).dt.normalize())
+           .drop_duplicates()
+           .sort_values('signal_date', kind='stable'))
+    tickers, codes = np.unique(sig['ticker'].to_numpy(dtype=str), return_inverse=True)
+    day = sig['signal_date'].to_numpy().astype('datetime64[D]').astype('int64')
+
+    # Sweep in bounded chunks; each chunk is reduced to per-pair counts right away
+    n = len(tickers)
+    span = int(day[-1] - day[0] + 1) if len(day) else 1
+    parts = []
+    for lo, hi in _chunks(day, window_days, max_pairs):
+        earlier, later = _window_pairs(day, codes, lo, hi, window_days)
+        if len(later) == 0:
+            continue
+        pair = (np.minimum(codes[earlier], codes[later]).astype('int64') * n
+                + np.maximum(codes[earlier], codes[later]))
+        # One count per pair per day, however many signals that day holds
+        pair_day = np.sort(pair * span + (day[later] - day[0]))
+        pair_day = pair_day[np.r_[True, np.diff(pair_day) != 0]]
+        pair, pair_days = pair_day // span, pair_day % span + day[0]
+        starts = np.flatnonzero(np.r_[True, np.diff(pair) != 0])
+        ends = np.r_[starts[1:], len(pair)] - 1
+        parts.append((pair[starts], np.diff(np.r_[starts, len(pair)]),
+                      pair_days[starts], pair_days[ends]))
+
+    if parts:
+        pair, size, first, last = (np.concatenate(col) for col in zip(*parts))
+    else:
+        pair = size = first = last = np.array([], dtype='int64')
+    # Chunks can share pairs (never pair-days): merge their partial aggregates
+    if len(parts) > 1:
+        order = np.argsort(pair, kind='stable')
+        pair, size, first, last = pair[order], size[order], first[order], last[order]
+        starts = np.flatnonzero(np.r_[True, np.diff(pair) != 0])
+        pair, size = pair[starts], np.add.reduceat(size, starts)
+        first, last = np.minimum.reduceat(first, starts), np.maximum.reduceat(last, starts)
+    keep = size >= min_support
+    pair, size, first, last = pair[keep], size[keep], first[keep], last[keep]
+
+    edges = pd.DataFrame({
+        'a': pair // n,
+        'b': pair % n,
+        'co_signals': size,
+        'first_date': first.astype('datetime64[D]'),
+        'last_date': last.astype('datetime64[D]'),
+    })
+
+    # Jaccard against each ticker's own signal-day count
+    signal_days = np.bincount(codes, minlength=len(tickers))
+    union = signal_days[edges['a']] + signal_days[edges['b']] - edges['co_signals']
+    edges['jaccard'] = edges['co_signals'] / np.maximum(union, 1)
+    edges['ticker_a'] = tickers[edges['a']]
+    edges['ticker_b'] = tickers[edges['b']]
+    return tickers, edges
+
+
+def detect_campaigns(signals, window_days=WINDOW_DAYS, min_support=MIN_SUPPORT):
+    """
+    Cluster tickers that repeatedly fire together.
+
+    Returns (campaigns, edges). edges holds the pairs that meet min_support.
+    campaigns has one row per connected component with 2+ tickers, largest
+    first, with the date span of its co-firings.
+    """
+    if len(signals) == 0:
+        return pd.DataFrame(columns=CAMPAIGN_COLUMNS), pd.DataFrame(columns=EDGE_COLUMNS)
+
+    tickers, edges = co_occurrence(signals, window_days, min_support)
+    if len(edges) == 0:
+        return pd.DataFrame(columns=CAMPAIGN_COLUMNS), pd.DataFrame(columns=EDGE_COLUMNS)
+
+    labels = _components(len(tickers), edges['a'].to_numpy(), edges['b'].to_numpy())
+    edges['component'] = labels[edges['a']]
+
+    members = pd.Series(tickers[np.unique(edges[['a', 'b']].to_numpy())])
+    member_labels = labels[np.searchsorted(tickers, members)]
+    ticker_lists = members.groupby(member_labels).agg(lambda t: ', '.join(sorted(t)))
+    ticker_counts = members.groupby(member_labels).size()
+
+    campaigns = edges.groupby('component').agg(
+        num_edges=('co_signals', 'size'),
+        total_co_signals=('co_signals', 'sum'),
+        first_date=('first_date', 'min'),
+        last_date=('last_date', 'max'),
+    )
+    campaigns['num_tickers'] = ticker_counts
+    campaigns['tickers'] = ticker_lists
+    campaigns = campaigns.sort_values(['num_tickers', 'total_co_signals'], ascending=False)
+    campaigns['campaign_id'] = [f"C{i + 1}" for i in range(len(campaigns))]
+    rank = pd.Series(np.arange(len(campaigns)), index=campaigns.index)
+
+    edges['campaign_id'] = edges['component'].map(campaigns['campaign_id'])
+    edges = (edges.assign(_rank=edges['component'].map(rank))
+             .sort_values(['_rank', 'co_signals'], ascending=[True, False]))
+    return campaigns[CAMPAIGN_COLUMNS].reset_index(drop=True), edges[EDGE_COLUMNS].reset_index(drop=True)
@@ -0,0 +1,55 @@
+import numpy as np
+
+# ============================================================================
+# LARGEST-TRIANGLE-THREE-BUCKETS DOWNSAMPLING
+# ============================================================================
+#
+# Reduces a long (x, y) series to about as many points as a chart has pixels
+# while keeping its visual shape: the first and last points are kept, the
+# rest is split into equal buckets, and from each bucket the point forming
+# the largest triangle with the previously kept point and the next bucket's
+# mean is kept. Points that must stay visible (alert dates) are added back
+# on top of the selection.
+
+
+def lttb_indices(x, y, n_out):
+    """Sorted positions of the points LTTB keeps (all of them if len(x) <= n_out)."""
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    # n_out - 2 buckets between the fixed first and last points
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    keep = np.empty(n_out, dtype=int)
+    keep[0], keep[-1] = 0, n - 1
+
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # Mean of the next bucket (the last point for the final bucket)
+        nlo, nhi = hi, edges[i + 2] if i + 2 < len(edges) else n
+        cx, cy = x[nlo:nhi].mean(), y[nlo:nhi].mean()
+        bx, by = x[lo:hi], y[lo:hi]
+        area = np.abs((x[a] - cx) * (by - y[a]) - (x[a] - bx) * (cy - y[a]))
+        a = lo + int(np.argmax(area))
+        keep[i + 1] = a
+    return keep
+
+
+def downsample(df, x, y, n_out, keep=None):
+    """
+    LTTB-downsampled rows of df (sorted by x), ignoring rows where y is NaN.
+    Rows where the boolean column `keep` is True are always included.
+    """
+    df = df.dropna(subset=[y])
+    if len(df) <= n_out:
+        return df
+    xs = df[x].to_numpy()
+    if np.issubdtype(xs.dtype, np.datetime64):
+        xs = xs.astype('datetime64[ns]').astype('int64')
+    idx = lttb_indices(xs, df[y].to_numpy(), n_out)
+    if keep is not None:
+        idx = np.union1d(idx, np.flatnonzero(df[keep].to_numpy(dtype=bool)))
+    return df.iloc[idx]
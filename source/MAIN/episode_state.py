@@ -0,0 +1,287 @@
+import os
+import json
+import math
+
+import pandas as pd
+
+import bar_cache
+
+# ============================================================================
+# INCREMENTAL PUMP EPISODE STATE
+# ============================================================================
+#
+# Signals for a ticker belong to the same episode while each one lands within
+# EPISODE_GAP_DAYS of the previous signal. The episode that might still be
+# extended is held per ticker (key, start, last signal date). Every episode
+# keeps running sums rather than its signal list. Adding a signal is one dict
+# lookup and a few additions, and PUMP_EPISODES.csv is rebuilt from the
+# aggregates without touching MASTER_TRUTH.
+#
+# State lives in <run>/data/signals_csv/episode_state.json next to the tables
+# it describes.
+#
+# Scanner alerts join their episode as 'pending' signals; the episode keeps
+# their dates until the tracker finalizes each one's outcome and reclassify()
+# counts it into pump_count (and MASTER_TRUTH's classification).
+
+STATE_FILE = "episode_state.json"
+STATE_VERSION = 2  # 2: episodes list their pending signals
+EPISODES_FILE = "PUMP_EPISODES.csv"
+MASTER_FILE = "MASTER_TRUTH_WITH_EPISODES.csv"
+
+EPISODE_GAP_DAYS = 7  # New episode if more than 7 days since the ticker's last signal
+PUMP_CLASSES = ('confirmed_pump', 'likely_pump')
+PENDING = 'pending'
+
+EPISODE_COLUMNS = [
+    'episode_key', 'ticker', 'start_date', 'end_date', 'signal_count',
+    'avg_pump_score', 'avg_price', 'avg_drawdown', 'avg_return_20d',
+    'pump_count', 'duration_days', 'episode_pump_rate',
+]
+
+# Running means kept as (sum, non-null count): output column -> signal column
+_MEAN_FIELDS = {
+    'avg_pump_score': 'pump_score',
+    'avg_price': 'entry_price',
+    'avg_drawdown': 'max_drawdown_20d',
+    'avg_return_20d': 'return_20d',
+}
+
+
+def new_state():
+    return {'version': STATE_VERSION, 'tickers': {}, 'episodes': {}}
+
+
+def state_path(signals_dir):
+    return os.path.join(signals_dir, STATE_FILE)
+
+
+def load_state(signals_dir):
+    """
+    Load the run's episode state. Runs that predate the state file (or its
+    current STATE_VERSION) are rebuilt once from MASTER_TRUTH_WITH_EPISODES.csv.
+    """
+    path = state_path(signals_dir)
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+        if state.get('version') == STATE_VERSION:
+            return state
+
+    state = new_state()
+    master_path = os.path.join(signals_dir, MASTER_FILE)
+    if os.path.exists(master_path):
+        master = pd.read_csv(master_path)
+        master['signal_date'] = pd.to_datetime(master['signal_date'], errors='coerce')
+        add_signals(state, master.dropna(subset=['signal_date']))
+    return state
+
+
+def state_lock(signals_dir):
+    """Cross-process lock around a load_state .. save_state update (scanner and tracker both write)."""
+    os.makedirs(signals_dir, exist_ok=True)
+    return bar_cache.ticker_lock(signals_dir, "episode_state")
+
+
+def save_state(signals_dir, state):
+    os.makedirs(signals_dir, exist_ok=True)
+    path = state_path(signals_dir)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, path)
+
+
+# ============================================================================
+# UPDATES
+# ============================================================================
+
+def _number(value):
+    """float(value), or None for missing/non-numeric values."""
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    return None if math.isnan(value) else value
+
+
+def add_signal(state, signal):
+    """
+    Extend the ticker's open episode or open a new one.
+
+    signal is a mapping with ticker and signal_date plus any of pump_score,
+    entry_price, max_drawdown_20d, return_20d and classification. Signals on
+    or before the ticker's last recorded signal date are treated as already
+    applied and return None; otherwise the episode_key is returned.
+    """
+    ticker = signal['ticker']
+    signal_date = pd.Timestamp(signal['signal_date']).normalize()
+    day = signal_date.strftime('%Y-%m-%d')
+    open_episode = state['tickers'].get(ticker)
+
+    if open_episode is not None:
+        last_date = pd.Timestamp(open_episode['last_date'])
+        if signal_date <= last_date:
+            return None
+        if (signal_date - last_date).days > EPISODE_GAP_DAYS:
+            open_episode = None
+
+    if open_episode is None:
+        episode_id = state['tickers'].get(ticker, {}).get('episode_id', 0) + 1
+        key = f"{ticker}_E{episode_id}"
+        state['tickers'][ticker] = {'episode_id': episode_id, 'episode_key': key,
+                                    'start_date': day, 'last_date': day}
+        state['episodes'][key] = {
+            'ticker': ticker, 'start_date': day, 'end_date': day,
+            'signal_count': 0, 'pump_count': 0,
+            'sums': {c: [0.0, 0] for c in _MEAN_FIELDS},
+        }
+    else:
+        key = open_episode['episode_key']
+        open_episode['last_date'] = day
+
+    episode = state['episodes'][key]
+    episode['end_date'] = day
+    episode['signal_count'] += 1
+    episode['pump_count'] += int(signal.get('classification') in PUMP_CLASSES)
+    if signal.get('classification') == PENDING:
+        episode.setdefault('pending', []).append(day)
+    for out_col, col in _MEAN_FIELDS.items():
+        value = _number(signal.get(col))
+        if value is not None:
+            episode['sums'][out_col][0] += value
+            episode['sums'][out_col][1] += 1
+    return key
+
+
+def _episode_at(state, ticker, day):
+    """Key of the ticker's episode spanning day (its latest first), or None."""
+    episode_id = state['tickers'].get(ticker, {}).get('episode_id', 0)
+    for n in range(episode_id, 0, -1):
+        key = f"{ticker}_E{n}"
+        episode = state['episodes'].get(key)
+        if episode is None or episode['end_date'] < day:
+            return None
+        if episode['start_date'] <= day:
+            return key
+    return None
+
+
+def reclassify(state, ticker, signal_date, classification):
+    """
+    Count a pending signal's final classification into its episode.
+
+    Only signals added as 'pending' (scanner alerts) are waiting for one; each
+    is counted once. Returns the episode_key, or None when (ticker,
+    signal_date) is not a pending signal of any episode.
+    """
+    day = pd.Timestamp(signal_date).normalize().strftime('%Y-%m-%d')
+    key = _episode_at(state, ticker, day)
+    if key is None or day not in state['episodes'][key].get('pending', []):
+        return None
+    episode = state['episodes'][key]
+    episode['pending'].remove(day)
+    episode['pump_count'] += int(classification in PUMP_CLASSES)
+    return key
+
+
+def add_signals(state, signals_df):
+    """
+    Apply a frame of signals in (ticker, signal_date) order.
+    Returns the episode_key per row, aligned to signals_df.index (None where skipped).
+    """
+    keys = pd.Series(None, index=signals_df.index, dtype=object)
+    if len(signals_df) == 0:
+        return keys
+    ordered = signals_df.sort_values(['ticker', 'signal_date'], kind='stable')
+    for idx, signal in zip(ordered.index, ordered.to_dict('records')):
+        keys[idx] = add_signal(state, signal)
+    return keys
+
+
+# ============================================================================
+# TABLES
+# ============================================================================
+
+def episodes_frame(state):
+    """PUMP_EPISODES table (sorted by pump_count, highest first) from the aggregates."""
+    rows = []
+    for key in sorted(state['episodes']):
+        ep = state['episodes'][key]
+        row = {'episode_key': key, 'ticker': ep['ticker'],
+               'start_date': ep['start_date'], 'end_date': ep['end_date'],
+               'signal_count': ep['signal_count'], 'pump_count': ep['pump_count']}
+        for out_col, (total, count) in ep['sums'].items():
+            row[out_col] = total / count if count else float('nan')
+        rows.append(row)
+
+    episodes = pd.DataFrame(rows, columns=[c for c in EPISODE_COLUMNS
+                                           if c not in ('duration_days', 'episode_pump_rate')])
+    episodes['start_date'] = pd.to_datetime(episodes['start_date'])
+    episodes['end_date'] = pd.to_datetime(episodes['end_date'])
+    episodes['duration_days'] = (episodes['end_date'] - episodes['start_date']).dt.days
+    episodes['episode_pump_rate'] = (episodes['pump_count'] / episodes['signal_count'] * 100)
+    episodes = episodes[EPISODE_COLUMNS]
+    return episodes.sort_values('pump_count', ascending=False)
+
+
+def write_episodes(signals_dir, state):
+    """Rewrite PUMP_EPISODES.csv from the state (one row per episode, no signal scan)."""
+    episodes = episodes_frame(state)
+    path = os.path.join(signals_dir, EPISODES_FILE)
+    tmp_path = f"{path}.tmp"
+    episodes.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, path)
+    return episodes
+
+
+def append_master(signals_dir, signals_df):
+    """Append newly keyed signals to MASTER_TRUTH_WITH_EPISODES.csv in its column order."""
+    if len(signals_df) == 0:
+        return 0
+    path = os.path.join(signals_dir, MASTER_FILE)
+    if os.path.exists(path):
+        columns = pd.read_csv(path, nrows=0).columns
+        signals_df.reindex(columns=columns).to_csv(path, mode='a', header=False, index=False)
+    else:
+        signals_df.to_csv(path, index=False)
+    return len(signals_df)
+
+
+def reclassify_master(signals_dir, classified):
+    """
+    Set the classification of pending MASTER_TRUTH rows from classified
+    (ticker, signal_date, classification). Rewrites the file; returns rows changed.
+    """
+    path = os.path.join(signals_dir, MASTER_FILE)
+    if len(classified) == 0 or not os.path.exists(path):
+        return 0
+    master = pd.read_csv(path)
+    dates = pd.to_datetime(master['signal_date'], errors='coerce').dt.normalize()
+    lookup = classified.assign(signal_date=pd.to_datetime(classified['signal_date']).dt.normalize()) \
+        .set_index(['ticker', 'signal_date'])['classification']
+    found = pd.Series(lookup.reindex(pd.MultiIndex.from_arrays([master['ticker'], dates])).to_numpy(),
+                      index=master.index)
+    update = (master['classification'] == PENDING) & found.notna()
+    if not update.any():
+        return 0
+    master.loc[update, 'classification'] = found[update]
+    tmp_path = f"{path}.tmp"
+    master.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, path)
+    return int(update.sum())
+
+
+def signals_from_alerts(alerts):
+    """Scanner alerts -> MASTER_TRUTH-style signal rows (classified later, so 'pending')."""
+    alerts_df = pd.DataFrame(alerts)
+    return pd.DataFrame({
+        'ticker': alerts_df['ticker'],
+        'signal_date': pd.to_datetime(alerts_df['alert_date']).dt.normalize(),
+        'entry_price': alerts_df['alert_price'],
+        'pump_score': alerts_df['pump_score'],
+        'volume': alerts_df['volume'],
+        'vol_z': alerts_df['vol_z'],
+        'signal_return': alerts_df['daily_return'],
+        'classification': PENDING,
+    })
@@ -0,0 +1,100 @@
+import numpy as np
+import pandas as pd
+
+# ============================================================================
+# EPISODE STATISTICS (vectorized)
+# ============================================================================
+#
+# Group-wise versions of the per-episode / per-ticker loops in pump_analyzer.
+# Everything is one sort plus groupby transforms, so cost grows with the
+# number of signals rather than episodes x signals.
+
+
+def episode_progression(master, episodes, min_signals=2):
+    """
+    One row per signal of every multi-signal episode, with the day offset
+    from the episode's first signal. Rows follow the episode order of
+    `episodes`, then signal_date within each episode.
+    Columns: episode_key, ticker, day, pump_score, signal_return, vol_z.
+    """
+    columns = ['episode_key', 'ticker', 'day', 'pump_score', 'signal_return', 'vol_z']
+    multi = episodes[episodes['signal_count'] >= min_signals]
+    multi = multi[~multi['episode_key'].duplicated()]
+    episode_order = pd.Series(np.arange(len(multi)), index=multi['episode_key'].values)
+    episode_ticker = pd.Series(multi['ticker'].values, index=multi['episode_key'].values)
+
+    signals = master[master['episode_key'].isin(episode_order.index)]
+    signals = signals[signals.groupby('episode_key')['episode_key'].transform('size') >= min_signals]
+    if len(signals) == 0:
+        return pd.DataFrame(columns=columns)
+
+    signals = (signals.assign(_order=signals['episode_key'].map(episode_order))
+               .sort_values(['_order', 'signal_date'], kind='stable'))
+    start = signals.groupby('episode_key')['signal_date'].transform('min')
+
+    return pd.DataFrame({
+        'episode_key': signals['episode_key'].values,
+        'ticker': signals['episode_key'].map(episode_ticker).values,
+        'day': (signals['signal_date'] - start).dt.days.values,
+        'pump_score': signals['pump_score'].values,
+        'signal_return': signals['signal_return'].values,
+        'vol_z': signals['vol_z'].values,
+    }, columns=columns)
+
+
+def _group_std(values, group_starts):
+    """Population std per contiguous group, summed the same way as np.std."""
+    bounds = list(group_starts) + [len(values)]
+    return np.array([np.std(values[lo:hi]) for lo, hi in zip(bounds[:-1], bounds[1:])])
+
+
+def ticker_intervals(episodes, min_episodes=3):
+    """
+    Gap statistics between consecutive episodes for tickers with at least
+    `min_episodes` episodes, one row per ticker in ticker order.
+
+    avg_gap_days is end -> next start, avg_cycle_days start -> next start;
+    predicted_next is the last episode end plus the (truncated) average gap.
+    """
+    columns = ['ticker', 'num_episodes', 'avg_gap_days', 'avg_cycle_days', 'std_gap_days',
+               'coefficient_variation', 'last_pump', 'predicted_next', 'predictability']
+    counts = episodes.groupby('ticker')['ticker'].transform('size')
+    eps = episodes[counts >= max(min_episodes, 2)]
+    if len(eps) == 0:
+        return pd.DataFrame(columns=columns)
+
+    eps = eps.sort_values(['ticker', 'start_date'], kind='stable')
+    by_ticker = eps.groupby('ticker', sort=True)
+    eps = eps.assign(
+        gap=(eps['start_date'] - by_ticker['end_date'].shift()).dt.days,
+        cycle=(eps['start_date'] - by_ticker['start_date'].shift()).dt.days,
+    )
+    gaps = eps.dropna(subset=['gap'])
+    gap_groups = gaps.groupby('ticker', sort=True)
+
+    stats = pd.DataFrame({
+        'num_episodes': by_ticker.size(),
+        'avg_gap_days': gap_groups['gap'].sum() / gap_groups.size(),
+        'avg_cycle_days': gap_groups['cycle'].sum() / gap_groups.size(),
+        'last_end': by_ticker['end_date'].last(),
+    })
+    # np.std's two-pass summation, so values match the per-ticker loop bit for bit
+    first_rows = np.flatnonzero(gaps['ticker'].ne(gaps['ticker'].shift()).to_numpy())
+    stats['std_gap_days'] = _group_std(gaps['gap'].to_numpy(dtype=float), first_rows)
+
+    avg_gap = stats['avg_gap_days']
+    cv = (stats['std_gap_days'] / avg_gap).where(avg_gap > 0, 0.0)
+    predicted = stats['last_end'] + pd.to_timedelta(np.trunc(avg_gap), unit='D')
+
+    out = pd.DataFrame({
+        'ticker': stats.index.values,
+        'num_episodes': stats['num_episodes'].values,
+        'avg_gap_days': avg_gap.values,
+        'avg_cycle_days': stats['avg_cycle_days'].values,
+        'std_gap_days': stats['std_gap_days'].values,
+        'coefficient_variation': cv.values,
+        'last_pump': stats['last_end'].dt.strftime('%Y-%m-%d').values,
+        'predicted_next': predicted.dt.strftime('%Y-%m-%d').values,
+        'predictability': np.select([cv < 0.3, cv < 0.6], ['HIGH', 'MEDIUM'], 'LOW'),
+    }, columns=columns)
+    return out
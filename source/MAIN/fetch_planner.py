@@ -0,0 +1,95 @@
+from collections import defaultdict
+from datetime import timedelta
+
+import pandas as pd
+import yfinance as yf
+
+import bar_cache
+import outcome_tracking
+import run_metrics
+
+# ============================================================================
+# MINIMAL-WINDOW FETCH PLANNER
+# ============================================================================
+#
+# For each ticker: union of [alert_date, final maturity] over the alerts that
+# still need evaluation, minus what the bar cache already covers. Whatever is
+# left is fetched as one range request per gap; tickers whose gaps are the
+# same range share a single batched yf.download call.
+
+
+def needed_windows(alerts_df, run_date, days_list=outcome_tracking.TRACKING_DAYS):
+    """ticker -> merged [alert_date, final maturity] intervals, capped at run_date."""
+    if len(alerts_df) == 0:
+        return {}
+    run_date = pd.Timestamp(run_date).normalize()
+    ends = outcome_tracking.final_maturity(alerts_df['alert_date'], days_list)
+    windows = defaultdict(list)
+    for ticker, start, end in zip(alerts_df['ticker'], alerts_df['alert_date'], ends):
+        windows[ticker].append((pd.Timestamp(start).normalize(), min(end, run_date)))
+    return {t: bar_cache.merge_intervals(w) for t, w in windows.items()}
+
+
+def plan_fetches(needed, cache_dir):
+    """List of (ticker, start, end) ranges missing from the cache."""
+    plan = []
+    for ticker, intervals in sorted(needed.items()):
+        covered = bar_cache.load_coverage(cache_dir, ticker)
+        for start, end in bar_cache.subtract_intervals(intervals, covered):
+            plan.append((ticker, start, end))
+    return plan
+
+
+def execute_plan(plan, cache_dir, run_date):
+    """
+    Download every planned range into the cache.
+    Today's bar is stored but not marked covered, since it may still change,
+    and a range reaching the run date is only covered up to its last bar.
+    Tickers that came back without any bars are listed in 'failed' and stay
+    uncovered, so the next run requests them again.
+    Returns {'requests', 'ranges', 'bars', 'failed'}.
+    """
+    run_date = pd.Timestamp(run_date).normalize()
+    by_range = defaultdict(list)
+    for ticker, start, end in plan:
+        by_range[(start, end)].append(ticker)
+
+    stats = {'requests': 0, 'ranges': len(plan), 'bars': 0, 'failed': []}
+    for (start, end), tickers in sorted(by_range.items()):
+        stats['requests'] += 1
+        covered_end = min(end, run_date - timedelta(days=1))
+        run_metrics.count('api_calls')
+        try:
+            with run_metrics.stage('download'):
+                data = yf.download(
+                    tickers,
+                    start=start,
+                    end=end + timedelta(days=1),
+                    progress=False,
+                    group_by='ticker',
+                    auto_adjust=True,
+                )
+        except Exception as e:
+            print(f"    Error fetching {', '.join(tickers)} {start.date()}–{end.date()}: {e}")
+            run_metrics.count('api_errors')
+            stats['failed'].extend(tickers)
+            continue
+        run_metrics.count('bytes_fetched', run_metrics.frame_bytes(data))
+
+        covered = (start, covered_end) if covered_end >= start else None
+        open_ended = end >= run_date
+        for ticker in tickers:
+            if isinstance(data.columns, pd.MultiIndex):
+                if ticker not in data.columns.get_level_values(0):
+                    stats['failed'].append(ticker)
+                    continue
+                df = data[ticker]
+            else:
+                df = data
+            with run_metrics.stage('write', ticker):
+                bars = bar_cache.store_bars(cache_dir, ticker, df, covered, through_last_bar=open_ended)
+            if bars == 0:
+                stats['failed'].append(ticker)
+            stats['bars'] += bars
+    run_metrics.count('bars_fetched', stats['bars'])
+    return stats
@@ -0,0 +1,315 @@
+import os
+import json
+import shutil
+
+import numpy as np
+import pandas as pd
+
+import alert_metrics
+import pump_scoring
+
+# ============================================================================
+# STATIC HTML DASHBOARD
+# ============================================================================
+#
+# A single self-contained HTML file (no server, no CDN) that alert_tracker
+# writes after each run next to the Markdown reports. It embeds, as compact
+# JSON:
+#
+#   summary   the AlertMetrics snapshot and pending list the Markdown report uses
+#   cube      alert_metrics.build_cube cells, dictionary-encoded
+#   alerts    the alert table, column-wise and dictionary-encoded
+#
+# The page's script sums the cube cells matching the tier / outcome filters
+# to get the KPIs, score bins, outcome counts and weekly and tier precision
+# with the same arithmetic as alert_metrics, draws the charts as inline SVG,
+# and pages, sorts and filters the alert table in the browser.
+
+HTML_DIR = "html"
+LATEST_FILE = "index.html"
+TABLE_COLUMNS = ['alert_date', 'ticker', 'tier', 'pump_score', 'outcome', 'alert_price',
+                 'vol_z', 'daily_return', 'return_5d', 'return_10d']
+_ENCODED = ['ticker', 'tier', 'outcome', 'score_bin']
+
+
+def _encode(values):
+    """Dictionary-encode a column: (sorted distinct values, codes)."""
+    codes, uniques = pd.factorize(pd.Series(values).astype(str), sort=True)
+    return [str(u) for u in uniques], codes.tolist()
+
+
+def _numbers(values, digits=4):
+    """Floats rounded for the payload, NaN -> null."""
+    arr = np.round(pd.to_numeric(pd.Series(values), errors='coerce').to_numpy(dtype=float), digits)
+    return [None if np.isnan(v) else (int(v) if v.is_integer() else float(v)) for v in arr]
+
+
+def _dates(values):
+    return pd.to_datetime(pd.Series(values)).dt.strftime('%Y-%m-%d').where(lambda s: s.notna(), None).tolist()
+
+
+def _columnar(df, encoded):
+    """{'dict': {col: values}, 'cols': {col: codes or values}} for a frame."""
+    out = {'dict': {}, 'cols': {}}
+    for col in df.columns:
+        if col in encoded:
+            out['dict'][col], out['cols'][col] = _encode(df[col])
+        elif col in ('alert_date', 'day', 'week'):
+            out['cols'][col] = _dates(df[col])
+        else:
+            out['cols'][col] = _numbers(df[col])
+    return out
+
+
+def build_payload(metrics, cube, alerts_df, run_name=""):
+    """Everything the page needs, as plain JSON-able structures."""
+    cube = cube[['tier', 'ticker', 'outcome', 'score_bin', 'week'] + alert_metrics.CUBE_VALUES]
+    alerts = alerts_df.reindex(columns=TABLE_COLUMNS).sort_values(
+        ['alert_date', 'ticker'], ascending=[False, True], kind='stable')
+    return {
+        'run': run_name,
+        'as_of': metrics.as_of,
+        'summary': metrics.snapshot(),
+        'pending': [vars(p) for p in metrics.pending_alerts],
+        'score_labels': alert_metrics.SCORE_LABELS,
+        'classified_outcomes': alert_metrics.CLASSIFIED_OUTCOMES,
+        'pump_outcomes': alert_metrics.PUMP_OUTCOMES,
+        'threshold': pump_scoring.PUMP_THRESHOLD,
+        'cube': _columnar(cube, _ENCODED),
+        'alerts': _columnar(alerts, _ENCODED),
+    }
+
+
+def generate_html_report(metrics, cube, alerts_df, out_dir, run_name="", quiet=False):
+    """Write html/dashboard_<as_of>.html (and index.html, the latest copy). Returns the dated path."""
+    os.makedirs(out_dir, exist_ok=True)
+    payload = json.dumps(build_payload(metrics, cube, alerts_df, run_name),
+                         separators=(',', ':'), ensure_ascii=False)
+    # A literal "</" inside the JSON would close the <script> element early
+    html = _TEMPLATE.replace("__PAYLOAD__", payload.replace("</", "<\\/"))
+
+    out_path = os.path.join(out_dir, f"dashboard_{metrics.as_of}.html")
+    tmp_path = f"{out_path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(html)
+    os.replace(tmp_path, out_path)
+    shutil.copyfile(out_path, os.path.join(out_dir, LATEST_FILE))
+
+    if not quiet:
+        print(f"HTML dashboard saved to: {out_path} ({os.path.getsize(out_path) / 1024:.0f} KB)")
+    return out_path
+
+
+_TEMPLATE = r"""<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>Pump-and-Dump Detector — Report</title>
+<style>
+  body { font-family: -apple-system, "Segoe UI", Roboto, sans-serif; margin: 0 auto; max-width: 1200px;
+         padding: 16px 24px; color: #0f172a; }
+  h1 { font-size: 1.5rem; margin-bottom: 0; } h2 { font-size: 1.15rem; margin-top: 28px; }
+  .muted { color: #64748b; font-size: .85rem; }
+  .filters { display: flex; gap: 24px; flex-wrap: wrap; padding: 12px; background: #f1f5f9; border-radius: 8px; }
+  .filters label { margin-right: 10px; font-size: .9rem; white-space: nowrap; }
+  .kpis { display: grid; grid-template-columns: repeat(5, 1fr); gap: 12px; margin-top: 16px; }
+  .kpi { border: 1px solid #e2e8f0; border-radius: 8px; padding: 10px 14px; }
+  .kpi .v { font-size: 1.6rem; font-weight: 600; } .kpi .l { color: #64748b; font-size: .8rem; }
+  .grid2 { display: grid; grid-template-columns: 1fr 1fr; gap: 24px; }
+  table { border-collapse: collapse; width: 100%; font-size: .85rem; }
+  th, td { border-bottom: 1px solid #e2e8f0; padding: 4px 8px; text-align: right; }
+  th { cursor: pointer; background: #f8fafc; position: sticky; top: 0; }
+  td.t, th.t { text-align: left; }
+  .pager { margin: 8px 0; display: flex; gap: 8px; align-items: center; }
+  svg text { font-size: 11px; fill: #334155; }
+  .o-confirmed_pump { background: #22c55e; } .o-likely_pump { background: #86efac; }
+  .o-false_positive { background: #ef4444; } .o-uncertain { background: #f59e0b; }
+  .o-pending { background: #cbd5e1; }
+</style>
+</head>
+<body>
+<h1>Pump-and-Dump Detector — Report</h1>
+<div class="muted" id="meta"></div>
+
+<h2>Filters</h2>
+<div class="filters">
+  <div><b>Tier</b><br><span id="f-tier"></span></div>
+  <div><b>Outcome</b><br><span id="f-outcome"></span></div>
+</div>
+
+<div class="kpis" id="kpis"></div>
+
+<div class="grid2">
+  <div><h2>Outcome Distribution</h2><div id="c-outcomes"></div></div>
+  <div><h2>Alerts per Week</h2><div id="c-weekly-alerts"></div></div>
+  <div><h2>Weekly Precision (%)</h2><div id="c-weekly-precision"></div></div>
+  <div><h2>Precision by Tier (%)</h2><div id="c-tiers"></div></div>
+</div>
+
+<h2>Score Distribution Analysis (classified)</h2>
+<div id="t-bins"></div>
+
+<h2>Alert Summary by Ticker</h2>
+<div id="t-tickers"></div>
+
+<h2>Alerts</h2>
+<div class="pager">Ticker <input id="f-ticker" size="8" placeholder="all">
+  <button id="prev">&lsaquo;</button><span id="page"></span><button id="next">&rsaquo;</button>
+  <select id="size"><option>25</option><option selected>50</option><option>100</option><option>250</option></select>
+</div>
+<div id="t-alerts"></div>
+
+<script id="payload" type="application/json">__PAYLOAD__</script>
+<script>
+"use strict";
+const P = JSON.parse(document.getElementById("payload").textContent);
+
+// ---------- decoding ----------
+function column(block, name) {
+  const codes = block.cols[name], dict = block.dict[name];
+  return dict ? codes.map(c => dict[c]) : codes;
+}
+function rows(block) {
+  const names = Object.keys(block.cols), n = names.length ? block.cols[names[0]].length : 0;
+  const cols = names.map(c => column(block, c)), out = new Array(n);
+  for (let i = 0; i < n; i++) { const r = {}; names.forEach((c, j) => r[c] = cols[j][i]); out[i] = r; }
+  return out;
+}
+const CUBE = rows(P.cube), ALERTS = rows(P.alerts);
+const CLASSIFIED = new Set(P.classified_outcomes), PUMPS = new Set(P.pump_outcomes);
+
+// ---------- filters ----------
+const state = { tiers: new Set(P.cube.dict.tier), outcomes: new Set(P.cube.dict.outcome),
+                ticker: "", sort: "alert_date", desc: true, page: 0, size: 50 };
+function checkboxes(el, values, set) {
+  el.innerHTML = values.map(v => `<label><input type="checkbox" value="${esc(v)}" checked> ${esc(v)}</label>`).join("");
+  el.querySelectorAll("input").forEach(cb => cb.addEventListener("change", () => {
+    cb.checked ? set.add(cb.value) : set.delete(cb.value); state.page = 0; render();
+  }));
+}
+const keep = r => state.tiers.has(r.tier) && state.outcomes.has(r.outcome);
+
+// ---------- aggregation (alert_metrics arithmetic over cube cells) ----------
+function group(cells, key) {
+  const g = new Map();
+  for (const c of cells) {
+    const k = c[key];
+    if (!g.has(k)) g.set(k, { key: k, alerts: 0, classified: 0, pumps: 0, fp: 0, score_sum: 0, score_n: 0 });
+    const s = g.get(k), n = c.alerts;
+    s.alerts += n; s.score_sum += c.score_sum; s.score_n += c.score_n;
+    if (CLASSIFIED.has(c.outcome)) s.classified += n;
+    if (PUMPS.has(c.outcome)) s.pumps += n;
+    if (c.outcome === "false_positive") s.fp += n;
+  }
+  return [...g.values()];
+}
+const pct = (a, b) => b ? a / b * 100 : null;
+function wilson(k, n, z = 1.96) {
+  if (!n) return [null, null];
+  const p = k / n, d = 1 + z * z / n, c = p + z * z / (2 * n);
+  const m = z * Math.sqrt((p * (1 - p) + z * z / (4 * n)) / n);
+  return [(c - m) / d * 100, (c + m) / d * 100];
+}
+const fmt = (v, d = 1, s = "") => v === null || v === undefined ? "—" : v.toFixed(d) + s;
+const ESCAPES = { "&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;", "'": "&#39;" };
+// Payload strings (tickers, tiers, outcomes) go into innerHTML, so escape them
+const esc = v => String(v ?? "").replace(/[&<>"']/g, ch => ESCAPES[ch]);
+
+// ---------- SVG charts ----------
+function bars(el, data, opts = {}) {
+  const w = 520, h = 220, pad = 34, max = Math.max(1, ...data.map(d => d.v ?? 0));
+  const bw = (w - pad - 8) / Math.max(1, data.length);
+  el.innerHTML = `<svg viewBox="0 0 ${w} ${h}" width="100%">` + data.map((d, i) => {
+    const bh = (d.v ?? 0) / max * (h - 2 * pad), x = pad + i * bw, y = h - pad - bh;
+    const label = data.length <= 12 ? `<text x="${x + bw / 2}" y="${h - pad + 14}" text-anchor="middle">${esc(d.k)}</text>` : "";
+    return `<rect x="${x + 2}" y="${y}" width="${Math.max(1, bw - 4)}" height="${bh}" fill="${opts.color || "#3b82f6"}">` +
+           `<title>${esc(d.k)}: ${fmt(d.v, opts.digits ?? 0)}</title></rect>` + label +
+           (data.length <= 12 ? `<text x="${x + bw / 2}" y="${y - 3}" text-anchor="middle">${fmt(d.v, opts.digits ?? 0)}</text>` : "");
+  }).join("") + `<text x="${pad}" y="12">max ${fmt(max, opts.digits ?? 0)}</text></svg>`;
+}
+function line(el, data) {
+  const w = 520, h = 220, pad = 34, pts = data.filter(d => d.v !== null);
+  if (!pts.length) { el.innerHTML = "<p class='muted'>No data.</p>"; return; }
+  const x = i => pad + i / Math.max(1, data.length - 1) * (w - 2 * pad), y = v => h - pad - v / 100 * (h - 2 * pad);
+  const path = data.map((d, i) => d.v === null ? null : `${x(i)},${y(d.v)}`).filter(Boolean).join(" ");
+  el.innerHTML = `<svg viewBox="0 0 ${w} ${h}" width="100%">` +
+    `<line x1="${pad}" x2="${w - pad}" y1="${y(50)}" y2="${y(50)}" stroke="#e2e8f0"/>` +
+    `<polyline fill="none" stroke="#3b82f6" stroke-width="2" points="${path}"/>` +
+    data.map((d, i) => d.v === null ? "" : `<circle cx="${x(i)}" cy="${y(d.v)}" r="2.5" fill="#3b82f6"><title>${esc(d.k)}: ${fmt(d.v)}%</title></circle>`).join("") +
+    `<text x="${pad}" y="${h - 8}">${esc(data[0].k)}</text><text x="${w - pad}" y="${h - 8}" text-anchor="end">${esc(data[data.length - 1].k)}</text>` +
+    `<text x="4" y="${y(100) + 4}">100</text><text x="4" y="${y(0) + 4}">0</text></svg>`;
+}
+function table(el, head, body, cls = []) {
+  el.innerHTML = `<table><tr>${head.map((h, i) => `<th class="${cls[i] || ""}">${esc(h)}</th>`).join("")}</tr>` +
+    body.map(r => `<tr>${r.map((v, i) => `<td class="${cls[i] || ""}">${esc(v)}</td>`).join("")}</tr>`).join("") + "</table>";
+}
+
+// ---------- render ----------
+function render() {
+  const cells = CUBE.filter(keep);
+  const all = group(cells, "all")[0] || { alerts: 0, classified: 0, pumps: 0, fp: 0, score_sum: 0, score_n: 0 };
+  const pending = cells.filter(c => c.outcome === "pending").reduce((a, c) => a + c.alerts, 0);
+  const [lo, hi] = wilson(all.pumps, all.classified);
+  document.getElementById("kpis").innerHTML = [
+    ["Total Alerts", all.alerts, `${all.classified} classified · ${pending} pending`],
+    ["Coverage", fmt(pct(all.classified, all.alerts) ?? 0, 1, "%"), ""],
+    ["Precision", fmt(pct(all.pumps, all.classified), 1, "%"), lo === null ? "" : `95% CI ${fmt(lo)}–${fmt(hi)}%`],
+    ["FP Rate", fmt(pct(all.fp, all.classified) ?? 0, 1, "%"), ""],
+    ["Avg Score", fmt(all.score_n ? all.score_sum / all.score_n : null), ""],
+  ].map(([l, v, sub]) => `<div class="kpi"><div class="l">${l}</div><div class="v">${v}</div><div class="muted">${sub}</div></div>`).join("");
+
+  const outcomes = group(cells, "outcome").sort((a, b) => b.alerts - a.alerts);
+  bars(document.getElementById("c-outcomes"), outcomes.map(o => ({ k: o.key, v: o.alerts })));
+  const weeks = group(cells.filter(c => c.week), "week").sort((a, b) => a.key < b.key ? -1 : 1);
+  bars(document.getElementById("c-weekly-alerts"), weeks.map(w => ({ k: w.key, v: w.alerts })), { color: "#64748b" });
+  line(document.getElementById("c-weekly-precision"), weeks.map(w => ({ k: w.key, v: pct(w.pumps, w.alerts) })));
+  bars(document.getElementById("c-tiers"), group(cells, "tier").map(t => ({ k: t.key, v: pct(t.pumps, t.alerts) })),
+       { color: "#22c55e", digits: 1 });
+
+  const byBin = new Map(group(cells.filter(c => CLASSIFIED.has(c.outcome)), "score_bin").map(b => [b.key, b]));
+  table(document.getElementById("t-bins"), ["Score Range", "Count", "Pumps", "FP", "Precision %", "FP Rate %"],
+        P.score_labels.filter(l => byBin.has(l)).map(l => { const b = byBin.get(l);
+          return [l, b.classified, b.pumps, b.fp, fmt(pct(b.pumps, b.classified)), fmt(pct(b.fp, b.classified))]; }),
+        ["t"]);
+
+  const tickers = group(cells, "ticker").sort((a, b) => b.alerts - a.alerts).slice(0, 25);
+  table(document.getElementById("t-tickers"), ["Ticker", "Alerts", "Avg Score", "Pumps", "Precision %"],
+        tickers.map(t => [t.key, t.alerts, fmt(t.score_n ? t.score_sum / t.score_n : null, 2), t.pumps, fmt(pct(t.pumps, t.alerts), 2)]),
+        ["t"]);
+  renderAlerts();
+}
+
+function renderAlerts() {
+  const q = state.ticker.trim().toUpperCase();
+  let list = ALERTS.filter(r => keep(r) && (!q || r.ticker.includes(q)));
+  const k = state.sort, dir = state.desc ? -1 : 1;
+  list = list.slice().sort((a, b) => (a[k] === b[k] ? 0 : a[k] === null ? 1 : b[k] === null ? -1 : a[k] < b[k] ? -dir : dir));
+  const pages = Math.max(1, Math.ceil(list.length / state.size));
+  state.page = Math.min(state.page, pages - 1);
+  const page = list.slice(state.page * state.size, (state.page + 1) * state.size);
+  document.getElementById("page").textContent = `page ${state.page + 1} of ${pages} · ${list.length} alerts`;
+  const cols = Object.keys(P.alerts.cols);
+  const el = document.getElementById("t-alerts");
+  el.innerHTML = `<table><tr>${cols.map(c => `<th data-c="${esc(c)}" class="${["alert_date", "ticker", "tier", "outcome"].includes(c) ? "t" : ""}">` +
+    `${esc(c)}${c === k ? (state.desc ? " ▾" : " ▴") : ""}</th>`).join("")}</tr>` +
+    page.map(r => `<tr class="o-${esc(r.outcome)}">${cols.map(c => {
+      const v = r[c], t = typeof v === "number" && !Number.isInteger(v) ? v.toFixed(3) : (v ?? "");
+      return `<td class="${typeof v === "number" ? "" : "t"}">${esc(t)}</td>`; }).join("")}</tr>`).join("") + "</table>";
+  el.querySelectorAll("th").forEach(th => th.addEventListener("click", () => {
+    state.desc = state.sort === th.dataset.c ? !state.desc : true; state.sort = th.dataset.c; renderAlerts();
+  }));
+}
+
+document.getElementById("meta").textContent =
+  `Run ${P.run} · metrics as of ${P.as_of} · ${ALERTS.length} alerts · ${P.pending.length} pending`;
+checkboxes(document.getElementById("f-tier"), P.cube.dict.tier, state.tiers);
+checkboxes(document.getElementById("f-outcome"), P.cube.dict.outcome, state.outcomes);
+document.getElementById("f-ticker").addEventListener("input", e => { state.ticker = e.target.value; state.page = 0; renderAlerts(); });
+document.getElementById("prev").addEventListener("click", () => { state.page = Math.max(0, state.page - 1); renderAlerts(); });
+document.getElementById("next").addEventListener("click", () => { state.page += 1; renderAlerts(); });
+document.getElementById("size").addEventListener("change", e => { state.size = +e.target.value; state.page = 0; renderAlerts(); });
+render();
+</script>
+</body>
+</html>
+"""
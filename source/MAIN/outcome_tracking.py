@@ -0,0 +1,151 @@
+import numpy as np
+import pandas as pd
+
+import trading_calendar
+
+# ============================================================================
+# OUTCOME MATURITY SCHEDULE
+# ============================================================================
+#
+# An alert's forward return for horizon h can only change once, on the day its
+# h-th bar after the alert exists. next_maturity is the date the shortest
+# still-missing horizon matures; once every horizon is filled it is NaT and
+# the alert is final. alert_store indexes this column, so each tracker run
+# pops just the alerts whose next maturity has arrived.
+
+TRACKING_DAYS = [1, 5, 10]  # Check returns at 1d, 5d, 10d after alert
+
+
+def maturity_dates(alert_dates, days):
+    """Session(s) on which the `days`-bar forward return first becomes available."""
+    return trading_calendar.offset(alert_dates, days)
+
+
+def schedule(alerts_df, days_list=TRACKING_DAYS):
+    """Vectorized next_maturity for every alert (NaT when all horizons are filled)."""
+    next_due = pd.Series(pd.NaT, index=alerts_df.index, dtype='datetime64[ns]')
+    if len(alerts_df) == 0:
+        return next_due
+    # Longest horizon first so the shortest missing one wins
+    for days in sorted(days_list, reverse=True):
+        col = f'return_{days}d'
+        missing = alerts_df[col].isna() if col in alerts_df.columns \
+            else pd.Series(True, index=alerts_df.index)
+        if missing.any():
+            next_due[missing] = maturity_dates(alerts_df.loc[missing, 'alert_date'], days)
+    return next_due
+
+
+def final_maturity(alert_dates, days_list=TRACKING_DAYS):
+    """Date after which no horizon can change any more."""
+    return maturity_dates(alert_dates, max(days_list))
+
+
+# ============================================================================
+# OUTCOME CLASSIFICATION
+# ============================================================================
+
+def classify_outcome(row):
+    """Classify alert outcome based on forward returns."""
+    ret_1d = row.get('return_1d')
+    ret_5d = row.get('return_5d')
+    ret_10d = row.get('return_10d')
+    max_dd = row.get('max_drawdown')
+
+    # Need at least 5-day return to classify
+    if pd.isna(ret_5d):
+        return 'pending'
+
+    # Confirmed pump: crashed within 5–10 days
+    if ret_5d < -0.15 or (ret_10d is not None and ret_10d < -0.20):
+        return 'confirmed_pump'
+
+    # Quick reversal: down 10%+ in 1 day
+    if ret_1d is not None and ret_1d < -0.10:
+        return 'confirmed_pump'
+
+    # Deep drawdown even if recovered
+    if max_dd is not None and max_dd < -0.25:
+        return 'confirmed_pump'
+    
+    # Pump-ish: was up at day 5 but faded by day 10 (promo unwind / delayed dump)
+    if (ret_10d is not None) and (ret_5d is not None):
+        if ret_5d > 0.05 and ret_10d < -0.05:
+            return 'likely_pump'   # or 'uncertain' if you want to be conservative
+
+    # False positive: sustained gains
+    if ret_5d > 0.05:
+        return 'false_positive'
+
+    # Uncertain: small movements
+    if ret_5d > -0.10:
+        return 'uncertain'
+
+    return 'likely_pump'
+
+
+# ============================================================================
+# BATCH FORWARD-RETURN EVALUATION
+# ============================================================================
+
+def _bar_positions(dates, wanted):
+    """Index of each wanted date in the sorted bar dates, -1 where there is no bar for it."""
+    pos = np.minimum(np.searchsorted(dates, wanted, side='left'), len(dates) - 1)
+    return np.where(dates[pos] == wanted, pos, -1)
+
+
+def evaluate_outcomes(alerts_df, bars, days_list=TRACKING_DAYS):
+    """
+    Forward returns, max drawdown and days-to-bottom for every alert at once.
+
+    bars maps ticker -> OHLCV frame indexed by date. Each alert's window is the
+    sessions trading_calendar.offset(alert_date, 0..horizon); every session is
+    looked up by exact date, since the bar cache can hold disjoint windows and
+    "n bars after the entry" may then land weeks later. A horizon whose session
+    has no bar stays NaN (so the alert stays queued), and the drawdown only
+    covers sessions that have one. Returns a frame aligned to alerts_df.index.
+    """
+    horizon = max(days_list)
+    out = pd.DataFrame(index=alerts_df.index)
+    for days in days_list:
+        out[f'return_{days}d'] = np.nan
+    out['max_drawdown'] = np.nan
+    out['days_to_bottom'] = np.nan
+
+    for ticker, group in alerts_df.groupby('ticker', sort=False):
+        df = bars.get(ticker)
+        if df is None or df.empty:
+            continue
+        dates = df.index.values
+        close = df['Close'].to_numpy(dtype=float)
+
+        alert_price = group['alert_price'].to_numpy(dtype=float)
+        # Window sessions 0..horizon after each alert (alert date rolled forward first)
+        first = np.asarray(trading_calendar.session_index(group['alert_date'].values))
+        steps = first[:, None] + np.arange(horizon + 1)
+        sessions = trading_calendar.session_at(steps.ravel()).values.reshape(steps.shape)
+        window = _bar_positions(dates, sessions.astype(dates.dtype))
+
+        for days in days_list:
+            pos = window[:, days]
+            ok = pos >= 0
+            ret = np.full(len(group), np.nan)
+            ret[ok] = (close[pos[ok]] - alert_price[ok]) / alert_price[ok]
+            out.loc[group.index, f'return_{days}d'] = ret
+
+        # Drawdown window: the sessions above that have a bar (not-yet-traded ones are skipped)
+        window_close = np.where(window >= 0, close[window], np.nan)
+        window_close = np.where(np.isnan(window_close), np.inf, window_close)
+        bottom = window_close.argmin(axis=1)
+        bottom_close = window_close[np.arange(len(group)), bottom]
+        has_bar = np.isfinite(bottom_close)
+
+        drawdown = np.full(len(group), np.nan)
+        drawdown[has_bar] = (bottom_close[has_bar] - alert_price[has_bar]) / alert_price[has_bar]
+        # Counted in trading sessions, like the horizons themselves
+        to_bottom = np.where(has_bar, bottom, np.nan)
+
+        out.loc[group.index, 'max_drawdown'] = drawdown
+        out.loc[group.index, 'days_to_bottom'] = to_bottom
+
+    return out
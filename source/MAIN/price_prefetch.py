@@ -0,0 +1,167 @@
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+
+import numpy as np
+import pandas as pd
+
+import bar_cache
+import fetch_planner
+import pump_scoring
+
+# ============================================================================
+# BACKGROUND PRICE PREFETCH
+# ============================================================================
+#
+# The dashboard's ticker detail chart needs a ticker's bars and the
+# pump_score series over them. A PricePrefetcher warms these for a whole
+# ticker set on a small thread pool, in the order given (the dashboard
+# passes the most recently alerted first). Any part of a ticker's chart
+# window that the run's bar cache lacks is fetched into that shared cache
+# through fetch_planner. The scored frame is then kept in memory, keyed on
+# the bar file's mtime. Reads go through the same object: a fresh frame is
+# a hit, a prefetch still in flight is awaited, and anything else is loaded
+# on the spot.
+
+MAX_WORKERS = 4
+LATENCY_SAMPLES = 500
+
+
+def contiguous_segments(cache_dir, ticker, dates):
+    """
+    Segment number for each cached bar date. The cache holds whatever windows
+    were fetched, so a ticker's bars can jump weeks or months between them;
+    bars in one merged coverage range (plus uncovered bars, such as today's,
+    joined to the range they continue) share a segment.
+    """
+    intervals = bar_cache.merge_intervals(
+        bar_cache.load_coverage(cache_dir, ticker) + [(d, d) for d in dates])
+    starts = np.array([s for s, _ in intervals], dtype='datetime64[ns]')
+    return np.searchsorted(starts, dates.to_numpy(dtype='datetime64[ns]'), side='right') - 1
+
+
+def scored_bars(cache_dir, ticker):
+    """
+    Close and pump_score for every cached bar of a ticker, each contiguous
+    segment scored on its own so each bar reads as the scanner saw it (the
+    first WARMUP_BARS of a segment have no full rolling window and are left
+    blank, rather than rolling across a gap in the cache).
+    Returns df with columns ['date','close','pump_score'].
+    """
+    bars = bar_cache.load_bars(cache_dir, ticker)
+    if bars.empty:
+        return pd.DataFrame(columns=['date', 'close', 'pump_score'])
+    bars = bars[bar_cache.BAR_COLUMNS]
+    segment = contiguous_segments(cache_dir, ticker, bars.index)
+    scores = []
+    for seg in np.unique(segment):
+        scored = pump_scoring.calculate_pump_score(bars[segment == seg])
+        score = scored['pump_score'].to_numpy(dtype=float)
+        score[:pump_scoring.WARMUP_BARS] = np.nan
+        scores.append(score)
+    return pd.DataFrame({'date': bars.index, 'close': bars['Close'].to_numpy(),
+                         'pump_score': np.concatenate(scores)})
+
+
+def rank_by_recency(alerts_df):
+    """Tickers ordered by their latest alert, newest first."""
+    latest = alerts_df.groupby('ticker')['alert_date'].max()
+    return list(latest.sort_values(ascending=False, kind='stable').index)
+
+
+class PricePrefetcher:
+    """Bounded-pool prefetch and in-memory cache of scored bars for one run."""
+
+    def __init__(self, cache_dir, max_workers=MAX_WORKERS):
+        self.cache_dir = cache_dir
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="price-prefetch")
+        self._lock = threading.Lock()
+        # yfinance keeps module-level state per download, so network fetches run one at a time
+        self._fetch_lock = threading.Lock()
+        self._frames = {}     # ticker -> (bars mtime, scored frame)
+        self._inflight = {}   # ticker -> Future
+        self._latency = deque(maxlen=LATENCY_SAMPLES)
+        self._counts = {'hits': 0, 'waits': 0, 'misses': 0, 'loaded': 0, 'fetched': 0, 'failed': 0}
+
+    # ------------------------------------------------------------------
+    def _fresh(self, ticker):
+        entry = self._frames.get(ticker)
+        return entry is not None and entry[0] == bar_cache.bars_mtime(self.cache_dir, ticker)
+
+    def _load(self, ticker, window):
+        """Fill the window's gaps in the bar cache, then score the cached bars."""
+        started = perf_counter()
+        fetched = failed = 0
+        try:
+            if window is not None:
+                today = pd.Timestamp.today().normalize()
+                # Today's bar is never marked covered (fetch_planner), so stop at yesterday
+                # or every load would re-fetch it and bump the file's mtime again
+                start = pd.Timestamp(window[0])
+                end = min(pd.Timestamp(window[1]), today - pd.Timedelta(days=1))
+                plan = fetch_planner.plan_fetches({ticker: [(start, end)]}, self.cache_dir) if start <= end else []
+                if plan:
+                    with self._fetch_lock:
+                        result = fetch_planner.execute_plan(plan, self.cache_dir, today)
+                    fetched, failed = result['requests'], len(result['failed'])
+            mtime = bar_cache.bars_mtime(self.cache_dir, ticker)
+            frame = scored_bars(self.cache_dir, ticker)
+            with self._lock:
+                self._frames[ticker] = (mtime, frame)
+            return frame
+        finally:
+            with self._lock:
+                self._inflight.pop(ticker, None)
+                self._latency.append(perf_counter() - started)
+                self._counts['loaded'] += 1
+                self._counts['fetched'] += fetched
+                self._counts['failed'] += failed
+
+    # ------------------------------------------------------------------
+    def prefetch(self, windows):
+        """
+        Queue every ticker in `windows` (ticker -> (start, end), in priority
+        order) that is neither fresh nor already queued. Queued work for
+        tickers no longer in the set is cancelled. Returns the number queued.
+        """
+        queued = 0
+        with self._lock:
+            for ticker, future in list(self._inflight.items()):
+                if ticker not in windows and future.cancel():
+                    del self._inflight[ticker]
+            for ticker, window in windows.items():
+                if ticker in self._inflight or self._fresh(ticker):
+                    continue
+                self._inflight[ticker] = self._pool.submit(self._load, ticker, window)
+                queued += 1
+        return queued
+
+    def get(self, ticker, window=None):
+        """Scored bars for a ticker: cached, awaited from the pool, or loaded now."""
+        with self._lock:
+            if self._fresh(ticker):
+                self._counts['hits'] += 1
+                return self._frames[ticker][1]
+            future = self._inflight.get(ticker)
+            self._counts['waits' if future is not None else 'misses'] += 1
+        if future is not None and not future.cancelled():
+            return future.result()
+        return self._load(ticker, window)
+
+    def stats(self):
+        with self._lock:
+            counts = dict(self._counts)
+            latency = np.array(self._latency, dtype=float)
+            queued = sum(not f.done() for f in self._inflight.values())
+            cached = len(self._frames)
+        reads = counts['hits'] + counts['waits'] + counts['misses']
+        return dict(
+            counts,
+            reads=reads,
+            hit_rate=counts['hits'] / reads * 100.0 if reads else None,
+            cached=cached,
+            queued=queued,
+            latency_mean_ms=float(latency.mean() * 1000) if len(latency) else None,
+            latency_p95_ms=float(np.percentile(latency, 95) * 1000) if len(latency) else None,
+        )
@@ -0,0 +1,278 @@
+import os
+import sys
+import time
+import atexit
+import pstats
+import cProfile
+import threading
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+
+import run_metrics
+
+# ============================================================================
+# OPT-IN PROFILING
+# ============================================================================
+#
+# Entry points call start(run_dir, script) once; it does nothing unless the
+# command line has
+#
+#   --profile           profile the whole run
+#   --profile=STAGE     profile only the run_metrics stage of that name
+#                       (download, features, score, backtest, classify, plot,
+#                       write, report, ticker = each whole per-ticker scope, ...)
+#
+# While the target runs, three profilers are active on the calling thread:
+#
+#   cProfile    deterministic call counts and times       -> <prefix>.pstats, <prefix>_stats.txt
+#   sampler     the thread's stack every SAMPLE_INTERVAL   -> <prefix>.collapsed
+#               (one "frame;frame;frame count" line per distinct stack, the
+#               format flamegraph.pl / speedscope / inferno read)
+#   tracemalloc allocation sites and peak traced memory    -> <prefix>_alloc.txt
+#
+# All three run together, so absolute times are inflated; compare shares of
+# the total within one profile, not against unprofiled runs.
+#
+# Output goes to <run_dir>/profiling/, prefix = <script>_<timestamp>[_<stage>].
+# finish() writes it; it is also registered with atexit, so early exits
+# still leave a profile behind.
+
+PROFILE_DIR = "profiling"
+FLAG = "--profile"
+WHOLE_RUN = "all"
+SAMPLE_INTERVAL = 0.005  # Seconds between stack samples
+TOP_N = 25               # Rows in the text reports
+TRACE_FRAMES = 1         # tracemalloc frames kept per allocation (1 = by line)
+
+_IGNORED_ALLOCS = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, __file__),  # The sampler's own stack counts
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+]
+
+_active = None
+
+
+def requested(argv=None):
+    """The profiling target from the command line: None, WHOLE_RUN or a stage name."""
+    for arg in (sys.argv[1:] if argv is None else argv):
+        if arg == FLAG:
+            return WHOLE_RUN
+        if arg.startswith(FLAG + "="):
+            return arg.split("=", 1)[1].strip() or WHOLE_RUN
+    return None
+
+
+def _frame_label(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class _StackSampler:
+    """Samples one thread's Python stack on a daemon thread while resumed."""
+
+    def __init__(self, thread_id, interval=SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._resumed = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._resumed.wait()
+            if self._stopped.is_set():
+                return
+            time.sleep(self.interval)
+            if not self._resumed.is_set():
+                continue
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame.f_code))
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+                self.samples += 1
+
+    def resume(self):
+        self._resumed.set()
+
+    def pause(self):
+        self._resumed.clear()
+
+    def stop(self):
+        self._stopped.set()
+        self._resumed.set()
+        self._thread.join(timeout=1.0)
+
+
+class Profiler:
+    """Profiles every entry of one target (stage name or WHOLE_RUN) on the starting thread."""
+
+    def __init__(self, run_dir, script, target):
+        self.run_dir = run_dir
+        self.script = script
+        self.target = target
+        self.started = datetime.now()
+        self.thread_id = threading.get_ident()
+        self.profile = cProfile.Profile()
+        self.sampler = _StackSampler(self.thread_id)
+        self.blocks = 0
+        self.seconds = 0.0
+        self.peak = 0               # Highest traced peak over a single block
+        self.peak_snapshot = None   # Snapshot at the end of that block
+        self.baseline = None
+        self._depth = 0
+        self._entered = 0.0
+        self._finished = False
+
+    # ------------------------------------------------------------------
+    def _enter(self):
+        self._depth += 1
+        if self._depth > 1:
+            return
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(TRACE_FRAMES)
+            self.baseline = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+        self.blocks += 1
+        self._entered = time.perf_counter()
+        self.sampler.resume()
+        self.profile.enable()
+
+    def _exit(self):
+        self._depth -= 1
+        if self._depth > 0:
+            return
+        self.profile.disable()
+        self.sampler.pause()
+        self.seconds += time.perf_counter() - self._entered
+        peak = tracemalloc.get_traced_memory()[1]
+        # A snapshot costs a walk over every trace, so only keep the heaviest block's
+        if peak > self.peak or self.peak_snapshot is None:
+            self.peak = peak
+            self.peak_snapshot = tracemalloc.take_snapshot()
+
+    @contextmanager
+    def block(self):
+        self._enter()
+        try:
+            yield
+        finally:
+            self._exit()
+
+    def hook(self, name):
+        """run_metrics stage hook: profile the block when it is the target stage."""
+        if name != self.target or self._finished or threading.get_ident() != self.thread_id:
+            return None
+        return self.block()
+
+    # ------------------------------------------------------------------
+    def _prefix(self):
+        suffix = "" if self.target == WHOLE_RUN else f"_{self.target}"
+        return os.path.join(self.run_dir, PROFILE_DIR, f"{self.script}_{self.started:%Y%m%d_%H%M%S}{suffix}")
+
+    def _write_stats(self, prefix):
+        self.profile.dump_stats(f"{prefix}.pstats")
+        with open(f"{prefix}_stats.txt", "w", encoding="utf-8") as f:
+            f.write(f"{self.script} --profile={self.target}: {self.blocks} profiled block(s), "
+                    f"{self.seconds:.2f}s, started {self.started:%Y-%m-%d %H:%M:%S}\n\n")
+            stats = pstats.Stats(self.profile, stream=f).strip_dirs()
+            f.write(f"Top {TOP_N} by cumulative time\n")
+            stats.sort_stats("cumulative").print_stats(TOP_N)
+            f.write(f"Top {TOP_N} by own time\n")
+            stats.sort_stats("tottime").print_stats(TOP_N)
+
+    def _write_collapsed(self, prefix):
+        with open(f"{prefix}.collapsed", "w", encoding="utf-8") as f:
+            for stack, n in sorted(self.sampler.stacks.items()):
+                f.write(f"{stack} {n}\n")
+
+    def _write_allocations(self, prefix):
+        final = self.peak_snapshot
+        if self.target == WHOLE_RUN:
+            final = tracemalloc.take_snapshot()
+        final = final.filter_traces(_IGNORED_ALLOCS)
+        lines = [
+            f"{self.script} --profile={self.target}",
+            f"Traced peak: {self.peak / 2**20:,.1f} MiB "
+            + ("(whole run)" if self.target == WHOLE_RUN else "(heaviest single block)"),
+            "",
+            f"Top {TOP_N} allocation sites still live at the end of "
+            + ("the run" if self.target == WHOLE_RUN else "the heaviest block") + ":",
+        ]
+        for stat in final.statistics("lineno")[:TOP_N]:
+            frame = stat.traceback[0]
+            lines.append(f"  {stat.size / 1024:>10,.1f} KiB  {stat.count:>8,} blocks  {frame.filename}:{frame.lineno}")
+        if self.baseline is not None:
+            lines += ["", f"Top {TOP_N} growth since profiling began:"]
+            diff = final.compare_to(self.baseline.filter_traces(_IGNORED_ALLOCS), "lineno")
+            for stat in diff[:TOP_N]:
+                frame = stat.traceback[0]
+                lines.append(f"  {stat.size_diff / 1024:>+10,.1f} KiB  {stat.count_diff:>+8,} blocks  "
+                             f"{frame.filename}:{frame.lineno}")
+        with open(f"{prefix}_alloc.txt", "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+
+    def finish(self):
+        """Stop profiling and write the reports. Returns the output prefix (None if nothing ran)."""
+        if self._finished:
+            return None
+        if self.target == WHOLE_RUN and self._depth > 0:
+            self.peak = max(self.peak, tracemalloc.get_traced_memory()[1])
+            self._depth = 1
+            self._exit()
+        self._finished = True
+        self.sampler.stop()
+
+        prefix = None
+        if self.blocks == 0:
+            print(f"Profiling: stage '{self.target}' never ran in {self.script}; nothing written")
+        else:
+            prefix = self._prefix()
+            os.makedirs(os.path.dirname(prefix), exist_ok=True)
+            self._write_stats(prefix)
+            self._write_collapsed(prefix)
+            self._write_allocations(prefix)
+            print(f"Profile ({self.target}, {self.blocks} block(s), {self.seconds:.1f}s, "
+                  f"{self.sampler.samples} stack samples) saved to: {prefix}.*")
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+        return prefix
+
+
+def start(run_dir, script, target=None):
+    """
+    Begin profiling `target` (default: from --profile on the command line).
+    Returns the Profiler, or None when profiling wasn't requested.
+    """
+    global _active
+    target = target or requested()
+    if not target or _active is not None:
+        return _active
+    _active = Profiler(run_dir, script, target)
+    if target == WHOLE_RUN:
+        _active._enter()
+    else:
+        run_metrics.set_stage_hook(_active.hook)
+    atexit.register(finish)
+    print(f"Profiling {'the whole run' if target == WHOLE_RUN else f'stage {target!r}'} "
+          f"-> {os.path.join(run_dir, PROFILE_DIR)}")
+    return _active
+
+
+def finish():
+    """Write the active profile (if any). Safe to call more than once."""
+    global _active
+    if _active is None:
+        return None
+    profiler, _active = _active, None
+    run_metrics.set_stage_hook(None)
+    return profiler.finish()
@@ -1,9 +1,13 @@
 import pandas as pd
-import numpy as np
 import matplotlib.pyplot as plt
-from datetime import datetime, timedelta
+from datetime import datetime
 import os
 from scipy.stats import chisquare
+
+import campaign_detector
+import episode_stats
+import profiling
+import run_metrics
 RUN_DIR = os.environ.get("RUN_DIR", "runs/LATEST")
 
 # If 'runs/LATEST' doesn't exist, pick the newest run automatically
@@ -16,6 +20,8 @@ if RUN_DIR == "runs/LATEST":
         key=os.path.getmtime
     )
 
+run_metrics.start("pump_analyzer")
+profiling.start(RUN_DIR, "pump_analyzer")  # --profile[=STAGE]
 print(f"Using run folder: {RUN_DIR}")
 os.makedirs(os.path.join(RUN_DIR, 'data/analysis'), exist_ok=True)
 
@@ -59,8 +65,9 @@ if not os.path.exists(master_path):
 if not os.path.exists(episodes_path):
     raise FileNotFoundError(f"Episodes file not found: {episodes_path}")
 
-master = pd.read_csv(master_path)
-episodes = pd.read_csv(episodes_path)
+with run_metrics.stage('load'):
+    master = pd.read_csv(master_path)
+    episodes = pd.read_csv(episodes_path)
 
 # Convert date columns right after reading the CSVs
 # This ensures all date columns are real datetime objects (not strings)
@@ -89,34 +96,9 @@ multi_episodes = episodes[episodes['signal_count'] >= 2].copy()
 if len(multi_episodes) > 0:
     print(f"\n Analyzing {len(multi_episodes)} multi-day campaigns...")
     
-    progression_data = []
-    
-    for _, episode in multi_episodes.iterrows():
-        episode_key = episode['episode_key']
-        ticker = episode['ticker']
-        
-        # Get all signals in this episode
-        episode_signals = master[master['episode_key'] == episode_key].sort_values('signal_date')
-        
-        if len(episode_signals) >= 2:
-            # Calculate day number within episode
-            start_date = episode_signals['signal_date'].min()
-            
-            for idx, signal in episode_signals.iterrows():
-                
-                signal_date = pd.to_datetime(signal['signal_date'])
-                days_from_start = (signal['signal_date'] - start_date).days
-                
-                progression_data.append({
-                    'episode_key': episode_key,
-                    'ticker': ticker,
-                    'day': days_from_start,
-                    'pump_score': signal['pump_score'],
-                    'signal_return': signal['signal_return'],
-                    'vol_z': signal['vol_z']
-                })
-    
-    progression_df = pd.DataFrame(progression_data)
+    # One row per signal with its day offset from the episode's first signal
+    with run_metrics.stage('analyze'):
+        progression_df = episode_stats.episode_progression(master, episodes)
     
     # Calculate average progression
     avg_progression = progression_df.groupby('day').agg({
@@ -169,7 +151,8 @@ if len(multi_episodes) > 0:
     ax2.grid(alpha=0.3)
     
     plt.tight_layout()
-    plt.savefig(os.path.join(RUN_DIR, 'data/analysis/episode_progression.png'), dpi=300, bbox_inches='tight')
+    with run_metrics.stage('plot'):
+        plt.savefig(os.path.join(RUN_DIR, 'data/analysis/episode_progression.png'), dpi=300, bbox_inches='tight')
     plt.close()
 
 else:
@@ -185,60 +168,16 @@ print("="*80)
 print("Question: Do tickers pump on predictable intervals?")
 
 # Calculate intervals for tickers with 3+ episodes
-high_risk_tickers = episodes.groupby('ticker').size()
-high_risk_tickers = high_risk_tickers[high_risk_tickers >= 3].index
-
-interval_analysis = []
-
-for ticker in high_risk_tickers:
-    ticker_episodes = episodes[episodes['ticker'] == ticker].sort_values('start_date')
-    
-    if len(ticker_episodes) >= 2:
-        
-        end_to_start_intervals = []
-        start_to_start_intervals = []
-        
-        for i in range(1, len(ticker_episodes)):
-            prev_end = ticker_episodes.iloc[i-1]['end_date']
-            prev_start = ticker_episodes.iloc[i-1]['start_date']
-            curr_start = ticker_episodes.iloc[i]['start_date']
-            
-            end_to_start = (curr_start - prev_end).days
-            start_to_start = (curr_start - prev_start).days
-            
-            end_to_start_intervals.append(end_to_start)
-            start_to_start_intervals.append(start_to_start)
-        
-        if end_to_start_intervals:
-            avg_gap = np.mean(end_to_start_intervals)
-            avg_cycle = np.mean(start_to_start_intervals)
-            std_gap = np.std(end_to_start_intervals)
-            cv = std_gap / avg_gap if avg_gap > 0 else 0
-            
-            # Predict next pump using gap metric
-            last_end = ticker_episodes.iloc[-1]['end_date']
-            predicted_next = last_end + timedelta(days=int(avg_gap))
-            
-            interval_analysis.append({
-                'ticker': ticker,
-                'num_episodes': len(ticker_episodes),
-                'avg_gap_days': avg_gap,
-                'avg_cycle_days': avg_cycle,
-                'std_gap_days': std_gap,
-                'coefficient_variation': cv,
-                'last_pump': last_end.strftime('%Y-%m-%d'),
-                'predicted_next': predicted_next.strftime('%Y-%m-%d'),
-                'predictability': 'HIGH' if cv < 0.3 else 'MEDIUM' if cv < 0.6 else 'LOW'
-            })
-
-interval_df = pd.DataFrame(interval_analysis)
+with run_metrics.stage('analyze'):
+    interval_df = episode_stats.ticker_intervals(episodes, min_episodes=3)
 interval_df = interval_df.sort_values('coefficient_variation')
 
 print("\n Interval Predictability:")
 print(interval_df.to_string(index=False))
 
 # Save to CSV
-interval_df.to_csv(os.path.join(RUN_DIR, 'data/analysis/ticker_intervals.csv'), index=False)
+with run_metrics.stage('write'):
+    interval_df.to_csv(os.path.join(RUN_DIR, 'data/analysis/ticker_intervals.csv'), index=False)
 
 
 # Key findings
@@ -278,16 +217,42 @@ if len(interval_df) > 0:
     ax2.grid(alpha=0.3)
     
     plt.tight_layout()
-    plt.savefig(os.path.join(RUN_DIR, 'data/analysis/ticker_intervals.png'), dpi=300, bbox_inches='tight')
+    with run_metrics.stage('plot'):
+        plt.savefig(os.path.join(RUN_DIR, 'data/analysis/ticker_intervals.png'), dpi=300, bbox_inches='tight')
 
     plt.close()
 
 # ============================================================================
-# SECTION 3: TEMPORAL PATTERNS
+# SECTION 3: COORDINATED CAMPAIGNS
 # ============================================================================
 
 print("\n" + "="*80)
-print("SECTION 3: TEMPORAL PATTERNS")
+print("SECTION 3: COORDINATED CAMPAIGNS")
+print("="*80)
+print("Question: Do different tickers get pumped together?")
+
+with run_metrics.stage('campaigns'):
+    campaigns_df, campaign_edges = campaign_detector.detect_campaigns(master[['ticker', 'signal_date']])
+with run_metrics.stage('write'):
+    campaigns_df.to_csv(os.path.join(RUN_DIR, 'data/analysis/coordinated_campaigns.csv'), index=False)
+    campaign_edges.to_csv(os.path.join(RUN_DIR, 'data/analysis/campaign_edges.csv'), index=False)
+
+if len(campaigns_df) > 0:
+    print(f"\n {len(campaigns_df)} ticker group(s) fired together "
+          f"{campaign_detector.MIN_SUPPORT}+ times within {campaign_detector.WINDOW_DAYS} days:")
+    for _, row in campaigns_df.head(10).iterrows():
+        print(f"  {row['campaign_id']:4s}: {row['tickers']} "
+              f"({row['total_co_signals']} co-signals, "
+              f"{row['first_date']:%Y-%m-%d} to {row['last_date']:%Y-%m-%d})")
+else:
+    print("\n  No tickers repeatedly fire together")
+
+# ============================================================================
+# SECTION 4: TEMPORAL PATTERNS
+# ============================================================================
+
+print("\n" + "="*80)
+print("SECTION 4: TEMPORAL PATTERNS")
 print("="*80)
 print("Question: Do pumps cluster on certain days/months?")
 
@@ -334,7 +299,8 @@ plt.xlabel('Day of Week', fontweight='bold')
 plt.ylabel('Year-Week', fontweight='bold')
 plt.title('Temporal Pump Clustering', fontweight='bold', fontsize=14)
 plt.tight_layout()
-plt.savefig(os.path.join(RUN_DIR, 'data/analysis/temporal_heatmap.png'), dpi=300, bbox_inches='tight')
+with run_metrics.stage('plot'):
+    plt.savefig(os.path.join(RUN_DIR, 'data/analysis/temporal_heatmap.png'), dpi=300, bbox_inches='tight')
 plt.close()
 
 
@@ -353,7 +319,7 @@ else:
     print(f"  → No clear day-of-week pattern")
 
 # ============================================================================
-# SECTION 4: SUMMARY STATISTICS
+# SECTION 5: SUMMARY STATISTICS
 # ============================================================================
 
 print("\n" + "="*80)
@@ -389,6 +355,12 @@ if len(highly_predictable) > 0:
 else:
     summary += "\n  No tickers show predictable timing patterns\n"
 
+# Add campaign findings
+if len(campaigns_df) > 0:
+    summary += f"\n {len(campaigns_df)} coordinated campaign group(s) detected:\n"
+    for _, row in campaigns_df.head(5).iterrows():
+        summary += f"  - {row['campaign_id']}: {row['tickers']} ({row['total_co_signals']} co-signals)\n"
+
 # Add temporal findings
 if p_value < 0.05:
     max_day = dow_counts.idxmax()
@@ -399,7 +371,8 @@ else:
 summary += f"\n{'='*60}\n"
 
 # Save summary
-with open(os.path.join(RUN_DIR, 'data/analysis/summary_stats.txt'), 'w', encoding='utf-8') as f:
+with run_metrics.stage('write'), \
+        open(os.path.join(RUN_DIR, 'data/analysis/summary_stats.txt'), 'w', encoding='utf-8') as f:
     f.write(summary)
 
 print(summary)
@@ -408,3 +381,7 @@ print(summary)
 print("\n" + "="*80)
 print("ANALYSIS COMPLETE")
 print("="*80)
+run_metrics.count('signals', len(master))
+run_metrics.count('episodes', len(episodes))
+run_metrics.write(RUN_DIR)
+profiling.finish()
@@ -6,6 +6,11 @@ matplotlib.use("Agg")  # Force non-GUI backend
 import matplotlib.pyplot as plt
 import os
 from datetime import datetime
+
+import episode_state
+import profiling
+import run_metrics
+import trading_calendar
 LOOKBACK = os.environ.get("LOOKBACK", "1y")  # '6mo', '1y', etc.
 RUN_NAME = os.environ.get("RUN_NAME", f"{datetime.now():%Y-%m-%d_%H%M}_{LOOKBACK}")
 RUN_DIR  = os.path.join("runs", RUN_NAME)
@@ -59,8 +64,8 @@ def backtest_signals(ticker, df):
             max_drawdown = drawdowns.min()
             
             if max_drawdown < 0:
-                days_to_bottom = drawdowns.idxmin()
-                days_to_bottom = (days_to_bottom - signal_date).days
+                days_to_bottom = int(trading_calendar.trading_days_between(
+                    signal_date, drawdowns.idxmin()))
         
         # === TIME TO PEAK ===
         # Did it keep pumping before dumping?
@@ -72,8 +77,8 @@ def backtest_signals(ticker, df):
             max_gain = gains.max()
             
             if max_gain > 0:
-                days_to_peak = gains.idxmax()
-                days_to_peak = (days_to_peak - signal_date).days
+                days_to_peak = int(trading_calendar.trading_days_between(
+                    signal_date, gains.idxmax()))
         
         # Compile all metrics
         result = {
@@ -195,52 +200,21 @@ def detect_pump_episodes(master):
     # Convert signal_date to datetime
     master['signal_date'] = pd.to_datetime(master['signal_date'])
     
-    # Sort by ticker and date
-    df = master.sort_values(['ticker', 'signal_date']).copy()
-    
-    # Calculate days since last signal for same ticker
-    df['days_since_last'] = df.groupby('ticker')['signal_date'].diff().dt.days
-    
-    # New episode starts if >7 days since last signal (or first signal for ticker)
-    df['new_episode'] = (df['days_since_last'].isna()) | (df['days_since_last'] > 7)
-    
-    # Assign episode IDs
-    df['episode_id'] = df.groupby('ticker')['new_episode'].cumsum()
-    
-    # Create unique episode identifier
-    df['episode_key'] = df['ticker'] + '_E' + df['episode_id'].astype(str)
-    
-    # Episode statistics
-    episodes = df.groupby('episode_key').agg({
-        'ticker': 'first',
-        'signal_date': ['min', 'max', 'count'],
-        'pump_score': 'mean',
-        'entry_price': 'mean',
-        'max_drawdown_20d': 'mean',
-        'return_20d': 'mean',
-        'classification': lambda x: (x.isin(['confirmed_pump', 'likely_pump'])).sum()
-    })
-    
-    # Flatten columns
-    episodes.columns = ['ticker', 'start_date', 'end_date', 'signal_count', 
-                       'avg_pump_score', 'avg_price', 'avg_drawdown', 
-                       'avg_return_20d', 'pump_count']
-    
-    # Calculate duration
-    episodes['duration_days'] = (episodes['end_date'] - episodes['start_date']).dt.days
-    episodes['episode_pump_rate'] = (episodes['pump_count'] / episodes['signal_count'] * 100)
-    
-    # Keep episode_key as a column (don't drop it)
-    episodes = episodes.reset_index()  # Changed from reset_index(drop=True)
-    
-    episodes = episodes.sort_values('pump_count', ascending=False)
+    # Fresh master for this run, so the episode state is rebuilt from it.
+    # Each signal extends its ticker's open episode or opens a new one
+    # (>7 days since the last signal); live scanner alerts extend it later.
+    state = episode_state.new_state()
+    with run_metrics.stage('episodes'):
+        episode_keys = episode_state.add_signals(state, master)
     
     # Ensure directory exists
     signals_dir = os.path.join(RUN_DIR, "data", "signals_csv")
     os.makedirs(signals_dir, exist_ok=True)
     
     # Save episodes
-    episodes.to_csv(os.path.join(signals_dir, "PUMP_EPISODES.csv"), index=False)
+    with run_metrics.stage('write'):
+        episodes = episode_state.write_episodes(signals_dir, state)
+        episode_state.save_state(signals_dir, state)
     
     print(f"\n Episode Summary:")
     print(f"  Total episodes: {len(episodes)}")
@@ -322,42 +296,19 @@ def detect_pump_episodes(master):
     
     print(f"\n Episode data saved to: {signals_dir}/PUMP_EPISODES.csv")
     
-    #
-    master_with_episodes = master.merge(
-        df[['ticker', 'signal_date', 'episode_key']],
-        on=['ticker', 'signal_date'],
-        how='left'
-    )
+    master_with_episodes = master.assign(episode_key=episode_keys)
     
     # Save enhanced master
-    master_with_episodes.to_csv(os.path.join(signals_dir, "MASTER_TRUTH_WITH_EPISODES.csv"), index=False)
+    with run_metrics.stage('write'):
+        master_with_episodes.to_csv(os.path.join(signals_dir, "MASTER_TRUTH_WITH_EPISODES.csv"), index=False)
 
 
     return master_with_episodes, episodes, ticker_episodes
 
-def analyze_ticker(ticker):
+def add_features(df):
     """
-    Main analysis function - now integrated with backtesting
+    The detector's rolling features, added to df in place (also returned)
     """
-    print(f"\n=== Analyzing {ticker} ===")
-
-    # Download data
-    df = yf.download(ticker, period=LOOKBACK, interval="1d")
-
-
-    # Updated directory structure
-    img_dir = os.path.join(RUN_DIR, "data/images", ticker)
-
-    os.makedirs(img_dir, exist_ok=True)
-
-    if isinstance(df.columns, pd.MultiIndex):
-        df.columns = df.columns.droplevel(1)
-
-    if df.empty:
-        print(f"No data returned for {ticker}. Skipping.")
-        return None
-
-    # === FEATURE ENGINEERING ===
     df['vol_z'] = (df['Volume'] - df['Volume'].rolling(20).mean()) / \
                   (df['Volume'].rolling(20).std() + 1e-9)
     df['vol_ratio'] = df['Volume'] / (df['Volume'].rolling(20).mean() + 1e-9)
@@ -370,8 +321,13 @@ def analyze_ticker(ticker):
     df['volatility'] = (df['High'] - df['Low']) / (df['Close'] + 1e-9)
     df['momentum'] = df['Close'].rolling(5).mean() / \
                      (df['Close'].rolling(20).mean() + 1e-9) - 1
+    return df
 
-    # === PUMP SCORING WITH SYNERGY ===
+
+def score_features(df):
+    """
+    Pump score with synergy bonus and the signal flag, added to df in place (also returned)
+    """
     df['pump_score'] = 0
     df.loc[df['vol_z'] > 2, 'pump_score'] += 20
     df.loc[df['vol_z'] > 3, 'pump_score'] += 10
@@ -381,95 +337,135 @@ def analyze_ticker(ticker):
     df.loc[df['price_z'] > 2, 'pump_score'] += 15
     df.loc[df['gap_up'] > 0.05, 'pump_score'] += 10
     df.loc[df['volatility'] > 0.1, 'pump_score'] += 10
-    
+
     synergy_condition = (df['vol_trend'] > 1.2) & (df['return'] > 0.1)
     df.loc[synergy_condition, 'pump_score'] += 10
-    
+
     df['flag'] = df['pump_score'] > 50
+    return df
 
-    # === TWO-PANEL VISUALIZATION ===
-    fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(14, 8), 
-                                     sharex=True, 
-                                     gridspec_kw={'height_ratios': [2, 1]})
-    
-    ax1.plot(df.index, df['Close'], label="Close Price", 
-             linewidth=2, color='#2E86DE')
-    ax1.plot(df.index, df['Close'].rolling(20).mean(), 
-             label="20-day MA", linestyle='--', alpha=0.7, color='#A29BFE')
 
-    flags = df[df['flag'] == True]
-    
-    if len(flags) > 0:
-        for idx, row in flags.iterrows():
-            ax1.scatter(idx, row['Close'], marker='o', color='#FF6B6B', 
-                       s=50, zorder=5, edgecolors='darkred', linewidths=2)
+def analyze_ticker(ticker):
+    """
+    Main analysis function - now integrated with backtesting
+    """
+    print(f"\n=== Analyzing {ticker} ===")
+
+    # Download data
+    run_metrics.count('api_calls')
+    with run_metrics.stage('download'):
+        df = yf.download(ticker, period=LOOKBACK, interval="1d")
+    run_metrics.count('bytes_fetched', run_metrics.frame_bytes(df))
+
+
+    # Updated directory structure
+    img_dir = os.path.join(RUN_DIR, "data/images", ticker)
+
+    os.makedirs(img_dir, exist_ok=True)
+
+    if isinstance(df.columns, pd.MultiIndex):
+        df.columns = df.columns.droplevel(1)
+
+    if df.empty:
+        print(f"No data returned for {ticker}. Skipping.")
+        return None
+
+    # === FEATURE ENGINEERING ===
+    with run_metrics.stage('features'):
+        add_features(df)
+
+    # === PUMP SCORING WITH SYNERGY ===
+    with run_metrics.stage('score'):
+        score_features(df)
+
+    # === TWO-PANEL VISUALIZATION ===
+    with run_metrics.stage('plot'):
+        fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(14, 8), 
+                                         sharex=True, 
+                                         gridspec_kw={'height_ratios': [2, 1]})
+    
+        ax1.plot(df.index, df['Close'], label="Close Price", 
+                 linewidth=2, color='#2E86DE')
+        ax1.plot(df.index, df['Close'].rolling(20).mean(), 
+                 label="20-day MA", linestyle='--', alpha=0.7, color='#A29BFE')
+
+        flags = df[df['flag'] == True]
+    
+        if len(flags) > 0:
+            for idx, row in flags.iterrows():
+                ax1.scatter(idx, row['Close'], marker='o', color='#FF6B6B', 
+                           s=50, zorder=5, edgecolors='darkred', linewidths=2)
             
-            score_text = f"🚨{int(row['pump_score'])}"
-            ax1.text(idx, row['Close'], score_text, 
-                    fontsize=9, ha='center', va='bottom',
-                    bbox=dict(boxstyle='round,pad=0.3', 
-                             facecolor='red', alpha=0.7, edgecolor='darkred'),
-                    color='white', fontweight='bold')
-
-    ax1.set_title(f"Pump Detection Analysis: {ticker}", 
-                  fontsize=15, fontweight='bold', pad=15)
-    ax1.set_ylabel("Price ($)", fontsize=12, fontweight='bold')
-    ax1.legend(loc='upper left', framealpha=0.9)
-    ax1.grid(alpha=0.3, linestyle='--')
-    
-    ax2.plot(df.index, df['pump_score'], 
-             linewidth=2, color='#6C5CE7', label='Pump Score')
-    ax2.fill_between(df.index, 0, df['pump_score'], 
-                     alpha=0.3, color='#6C5CE7')
-    ax2.axhline(y=50, color='#FF6B6B', linestyle='--', 
-                linewidth=2, label='Pump Threshold (50)', alpha=0.8)
-    
-    for idx in flags.index:
-        ax2.axvline(x=idx, color='#FF6B6B', alpha=0.3, linewidth=1.5)
-    
-    ax2.set_xlabel("Date", fontsize=12, fontweight='bold')
-    ax2.set_ylabel("Pump Score", fontsize=12, fontweight='bold')
-    ax2.set_ylim(0, max(100, df['pump_score'].max() + 10))
-    ax2.legend(loc='upper left', framealpha=0.9)
-    ax2.grid(alpha=0.3, linestyle='--')
-    
-    plt.tight_layout()
-    plt.savefig(f"{img_dir}/{ticker}_two_panel_analysis.png", dpi=300, bbox_inches='tight')
-    plt.close()
-
-    # === VOLUME CHART ===
-    df_plot = df[df['Volume'] > 0].copy()
-    plt.figure(figsize=(14, 4))
-    plt.bar(df_plot.index, df_plot['Volume'], width=1.0, alpha=0.7, color='#00B894')
-    plt.yscale("log")
-    plt.xticks(rotation=45, ha='right')
-    plt.title(f"Volume Analysis: {ticker}", fontsize=14, fontweight='bold')
-    plt.xlabel("Date", fontsize=12)
-    plt.ylabel("Volume (log scale)", fontsize=12)
-    plt.grid(axis='y', linestyle='--', alpha=0.5)
-    plt.tight_layout()
-    plt.savefig(f"{img_dir}/{ticker}_volume.png", dpi=300, bbox_inches='tight')
-    plt.close()
+                score_text = f"🚨{int(row['pump_score'])}"
+                ax1.text(idx, row['Close'], score_text, 
+                        fontsize=9, ha='center', va='bottom',
+                        bbox=dict(boxstyle='round,pad=0.3', 
+                                 facecolor='red', alpha=0.7, edgecolor='darkred'),
+                        color='white', fontweight='bold')
+
+        ax1.set_title(f"Pump Detection Analysis: {ticker}", 
+                      fontsize=15, fontweight='bold', pad=15)
+        ax1.set_ylabel("Price ($)", fontsize=12, fontweight='bold')
+        ax1.legend(loc='upper left', framealpha=0.9)
+        ax1.grid(alpha=0.3, linestyle='--')
+    
+        ax2.plot(df.index, df['pump_score'], 
+                 linewidth=2, color='#6C5CE7', label='Pump Score')
+        ax2.fill_between(df.index, 0, df['pump_score'], 
+                         alpha=0.3, color='#6C5CE7')
+        ax2.axhline(y=50, color='#FF6B6B', linestyle='--', 
+                    linewidth=2, label='Pump Threshold (50)', alpha=0.8)
+    
+        for idx in flags.index:
+            ax2.axvline(x=idx, color='#FF6B6B', alpha=0.3, linewidth=1.5)
+    
+        ax2.set_xlabel("Date", fontsize=12, fontweight='bold')
+        ax2.set_ylabel("Pump Score", fontsize=12, fontweight='bold')
+        ax2.set_ylim(0, max(100, df['pump_score'].max() + 10))
+        ax2.legend(loc='upper left', framealpha=0.9)
+        ax2.grid(alpha=0.3, linestyle='--')
+    
+        plt.tight_layout()
+        plt.savefig(f"{img_dir}/{ticker}_two_panel_analysis.png", dpi=300, bbox_inches='tight')
+        plt.close()
+
+        # === VOLUME CHART ===
+        df_plot = df[df['Volume'] > 0].copy()
+        plt.figure(figsize=(14, 4))
+        plt.bar(df_plot.index, df_plot['Volume'], width=1.0, alpha=0.7, color='#00B894')
+        plt.yscale("log")
+        plt.xticks(rotation=45, ha='right')
+        plt.title(f"Volume Analysis: {ticker}", fontsize=14, fontweight='bold')
+        plt.xlabel("Date", fontsize=12)
+        plt.ylabel("Volume (log scale)", fontsize=12)
+        plt.grid(axis='y', linestyle='--', alpha=0.5)
+        plt.tight_layout()
+        plt.savefig(f"{img_dir}/{ticker}_volume.png", dpi=300, bbox_inches='tight')
+        plt.close()
 
     # === SAVE SIGNALS CSV (UPDATED PATH) ===
     signals_dir = os.path.join(RUN_DIR, "data/signals_csv", ticker)
     os.makedirs(signals_dir, exist_ok=True)
 
-    df_export = df.reset_index()
-    df_export.to_csv(f"{signals_dir}/signals.csv", index=False)
+    with run_metrics.stage('write'):
+        df_export = df.reset_index()
+        df_export.to_csv(f"{signals_dir}/signals.csv", index=False)
 
 
 
     
     # === RUN BACKTEST ===
-    backtest_df = backtest_signals(ticker, df)
+    with run_metrics.stage('backtest'):
+        backtest_df = backtest_signals(ticker, df)
     
     if backtest_df is not None and len(backtest_df) > 0:
         # STEP 2: Auto-classify signals
-        backtest_df = auto_classify_signals(backtest_df)
+        with run_metrics.stage('classify'):
+            backtest_df = auto_classify_signals(backtest_df)
         
         # Save individual ticker backtest (UPDATED PATH)
-        backtest_df.to_csv(f"{signals_dir}/backtest.csv", index=False)
+        with run_metrics.stage('write'):
+            backtest_df.to_csv(f"{signals_dir}/backtest.csv", index=False)
         print(f"Backtest results saved to {signals_dir}/{ticker}_backtest.csv")
         
         # Show classification breakdown
@@ -526,7 +522,8 @@ def create_master_truth_csv(tickers):
     master = master.sort_values('pump_score', ascending=False)
     
     # STEP 4: Save master truth CSV (UPDATED PATH)
-    master.to_csv(f"{signals_dir}/MASTER_TRUTH.csv", index=False)
+    with run_metrics.stage('write'):
+        master.to_csv(f"{signals_dir}/MASTER_TRUTH.csv", index=False)
     
 
     print("MASTER TRUTH DATASET CREATED")
@@ -636,12 +633,15 @@ if __name__ == "__main__":
         "VSEE","EHGO"
     ]
     
+    run_metrics.start("pump_detector")
+    profiling.start(RUN_DIR, "pump_detector")  # --profile[=STAGE], e.g. --profile=ticker for analyze_ticker
     print("Starting Complete Pump Detection System")
     print("="*80)
     
     # Analyze each ticker
     for t in tickers:
-        analyze_ticker(t)
+        with run_metrics.for_ticker(t):
+            analyze_ticker(t)
     
     # Create master truth CSV
     master = create_master_truth_csv(tickers)
@@ -652,4 +652,8 @@ if __name__ == "__main__":
     
     print("\n" + "="*80)
     print("COMPLETE ANALYSIS FINISHED")
-    print("="*80)
\ No newline at end of file
+    print("="*80)
+    if master is not None:
+        run_metrics.count('signals', len(master))
+    run_metrics.write(RUN_DIR)
+    profiling.finish()
\ No newline at end of file
@@ -0,0 +1,77 @@
+import numpy as np
+
+import run_metrics
+
+# ============================================================================
+# PUMP SCORING
+# ============================================================================
+#
+# The per-bar pump_score shared by the live scanner (tiered_scanner) and the
+# historical replay (scanner_replay). Every feature is a trailing rolling
+# window, so a bar's score only depends on the WARMUP_BARS before it: scoring
+# a ticker's full bar history once gives the same per-bar scores as the
+# scanner's 60-bar download on each of those days.
+
+PUMP_THRESHOLD = 50
+SCAN_WINDOW_BARS = 60   # Bars in the scanner's 60d download
+WARMUP_BARS = 20        # Rolling window; earlier bars in a download can't be scored
+MIN_BARS = 25           # Downloads shorter than this are treated as no data
+MAX_DAILY_RETURN = 5.0  # > 500% in a day is a bad print, not a pump
+
+
+def add_features(ticker_data):
+    """The trailing-window features pump_score is built from, added to a copy of the bars."""
+    df = ticker_data.copy()
+    df = df.replace([np.inf, -np.inf], np.nan)
+    df = df.ffill().bfill()
+    df['vol_z'] = (df['Volume'] - df['Volume'].rolling(20).mean()) / \
+                  (df['Volume'].rolling(20).std() + 1e-9)
+    df['vol_ratio'] = df['Volume'] / (df['Volume'].rolling(20).mean() + 1e-9)
+    df['vol_trend'] = df['Volume'].rolling(5).mean() / \
+                      (df['Volume'].rolling(20).mean() + 1e-9)
+    df['return'] = df['Close'].pct_change()
+    df['price_z'] = (df['return'] - df['return'].rolling(20).mean()) / \
+                    (df['return'].rolling(20).std() + 1e-9)
+    df['gap_up'] = (df['Open'] - df['Close'].shift(1)) / (df['Close'].shift(1) + 1e-9)
+    df['volatility'] = (df['High'] - df['Low']) / (df['Close'] + 1e-9)
+    return df
+
+
+def score_features(df):
+    """Adds pump_score to a frame from add_features (in place) and returns it."""
+    df['pump_score'] = 0
+    df.loc[df['vol_z'] > 2, 'pump_score'] += 20
+    df.loc[df['vol_z'] > 3, 'pump_score'] += 10
+    df.loc[df['vol_ratio'] > 3, 'pump_score'] += 15
+    df.loc[df['return'] > 0.1, 'pump_score'] += 20
+    df.loc[df['return'] > 0.2, 'pump_score'] += 10
+    df.loc[df['price_z'] > 2, 'pump_score'] += 15
+    df.loc[df['gap_up'] > 0.05, 'pump_score'] += 10
+    df.loc[df['volatility'] > 0.1, 'pump_score'] += 10
+
+    synergy = (df['vol_trend'] > 1.2) & (df['return'] > 0.1)
+    df.loc[synergy, 'pump_score'] += 10
+    synergy2 = (df['price_z'] > 2.5) & (df['vol_ratio'] > 2)
+    df.loc[synergy2, 'pump_score'] += 10
+
+    return df
+
+
+def calculate_pump_score(ticker_data):
+    with run_metrics.stage('features'):
+        df = add_features(ticker_data)
+    with run_metrics.stage('score'):
+        return score_features(df)
+
+
+def sanity_masks(scored):
+    """(bad_print, no_volume) boolean Series for scored bars."""
+    bad_print = scored['return'].abs() > MAX_DAILY_RETURN
+    no_volume = scored['Volume'].isna() | (scored['Volume'] <= 0)
+    return bad_print, no_volume
+
+
+def alert_mask(scored, threshold=PUMP_THRESHOLD):
+    """Bars that would raise an alert: above threshold and passing the sanity filter."""
+    bad_print, no_volume = sanity_masks(scored)
+    return (scored['pump_score'] > threshold) & ~bad_print & ~no_volume
@@ -0,0 +1,198 @@
+import pandas as pd
+import numpy as np
+from datetime import datetime
+import os
+import time
+
+import alert_metrics
+import alert_reports
+import alert_store
+import bar_cache
+import outcome_tracking
+import run_metrics
+import scan_scheduler
+import trading_calendar
+
+# ============================================================================
+# REPORT / SNAPSHOT BACKFILL
+# ============================================================================
+#
+# Rewrites weekly_reviews/report_YYYY-MM-DD.md and
+# daily_snapshots/YYYY-MM-DD.{json,md} for every session in
+# [BACKFILL_START, BACKFILL_END], as alert_tracker would have written them on
+# each of those days, and replaces those days in the store's snapshot history.
+#
+# The alert history is loaded once. An alert's outcome only moves at its
+# horizon maturities (the tracker's maturity queue re-evaluates it on those
+# days and no others):
+#
+#   before the 5d maturity     pending
+#   5d .. 10d maturity         classified from the 1d/5d returns and the
+#                              drawdown over the first 5 bars
+#   from the 10d maturity on   classified from the final returns
+#
+# Both outcomes are classified once per alert with the current
+# classify_outcome, so a rule change shows up across the whole range. Each
+# stage carries only the returns the tracker had by then (none while
+# pending, the 5d return at the early stage).
+#
+# Every alert then becomes a few dated cube rows (alert_metrics.cube_rows):
+# its pending cell added on the alert date, and on each maturity the old
+# cell subtracted and the new stage's cell added. Sorted by date, one pass
+# accumulates them, so each session's cube is the running total after that
+# day's rows and its metrics are read off the cube (metrics_from_cube)
+# instead of re-aggregating the alerts raised so far.
+
+
+RUN_DIR = scan_scheduler.find_latest_run()
+ALERTS_DIR = os.path.join(RUN_DIR, "data", "alerts")
+BARS_DIR = bar_cache.cache_dir_for(RUN_DIR)
+WEEKLY_REVIEWS_DIR = os.path.join(RUN_DIR, "weekly_reviews")
+DAILY_DIR = os.path.join(RUN_DIR, alert_store.LEGACY_SNAPSHOT_DIR)
+
+# Backfill range (YYYY-MM-DD). Defaults to the last quarter through today.
+TODAY = pd.Timestamp(datetime.now()).normalize()
+BACKFILL_END = pd.Timestamp(os.environ.get("BACKFILL_END") or TODAY)
+BACKFILL_START = pd.Timestamp(os.environ.get("BACKFILL_START") or BACKFILL_END - pd.DateOffset(months=3))
+
+
+# ============================================================================
+# OUTCOME STAGES (one classification per alert and stage)
+# ============================================================================
+
+def early_outcomes(alerts_df, bars):
+    """
+    Outcomes as the tracker saw them at the 5d maturity: 1d/5d returns and
+    the drawdown over entry..entry+5. Computed from cached bars where
+    available; otherwise from the stored final values, keeping the drawdown
+    only when the bottom fell within those 5 bars.
+    Returns the early returns with an 'outcome' column.
+    """
+    early = outcome_tracking.evaluate_outcomes(alerts_df, bars, [1, 5])
+    stored = alerts_df[['return_1d', 'return_5d', 'max_drawdown', 'days_to_bottom']]
+    missing = early['return_5d'].isna()
+    early.loc[missing, 'return_1d'] = stored.loc[missing, 'return_1d']
+    early.loc[missing, 'return_5d'] = stored.loc[missing, 'return_5d']
+    early.loc[missing, 'max_drawdown'] = stored.loc[missing, 'max_drawdown'].where(
+        stored.loc[missing, 'days_to_bottom'] <= 5)
+    early['return_10d'] = np.nan
+    early['outcome'] = early.apply(outcome_tracking.classify_outcome, axis=1)
+    return early
+
+
+def outcome_stages(alerts_df, bars):
+    """Sorted alerts with the maturity dates and outcome of each stage attached."""
+    alerts_df = alerts_df.sort_values(alert_store.KEY_COLUMNS[::-1], ignore_index=True)
+    alerts_df['matures_5d'] = outcome_tracking.maturity_dates(alerts_df['alert_date'], 5)
+    alerts_df['matures_10d'] = outcome_tracking.final_maturity(alerts_df['alert_date'])
+    if len(alerts_df) == 0:
+        alerts_df['early_outcome'] = alerts_df['final_outcome'] = pd.Series(dtype=object)
+        alerts_df['early_return_5d'] = pd.Series(dtype=float)
+        return alerts_df
+    early = early_outcomes(alerts_df, bars)
+    alerts_df['early_outcome'] = early['outcome']
+    alerts_df['early_return_5d'] = early['return_5d']
+    alerts_df['final_outcome'] = alerts_df.apply(outcome_tracking.classify_outcome, axis=1)
+    return alerts_df
+
+
+def cube_events(staged):
+    """
+    Dated cube rows: each alert's pending cell from its alert date, swapped
+    for its early cell on the 5d maturity and for its final cell on the 10d
+    maturity. Returns (cells, effective dates, values), sorted by date, where
+    cells holds alert_metrics.CUBE_KEYS plus a 'cell' id per distinct key.
+    """
+    stages = [
+        # (outcome, return_5d, return_10d, from, until)
+        ('pending', np.nan, np.nan, 'alert_date', 'matures_5d'),
+        (staged['early_outcome'], staged['early_return_5d'], np.nan, 'matures_5d', 'matures_10d'),
+        (staged['final_outcome'], staged['return_5d'], staged['return_10d'], 'matures_10d', None),
+    ]
+    parts = []
+    for outcome, r5, r10, start, end in stages:
+        rows = alert_metrics.cube_rows(staged.assign(outcome=outcome, return_5d=r5, return_10d=r10))
+        parts.append(rows.assign(effective=staged[start].to_numpy(), sign=1))
+        if end is not None:
+            parts.append(rows.assign(effective=staged[end].to_numpy(), sign=-1))
+    events = pd.concat(parts, ignore_index=True).sort_values('effective', kind='stable', ignore_index=True)
+
+    keys = alert_metrics.CUBE_KEYS
+    cells = events[keys].assign(cell=events.groupby(keys, dropna=False, observed=True, sort=False).ngroup())
+    values = events[alert_metrics.CUBE_VALUES].to_numpy(dtype=float) * events['sign'].to_numpy()[:, None]
+    return cells, events['effective'].to_numpy(dtype='datetime64[ns]'), values
+
+
+def cumulative_cubes(staged, days):
+    """Yield the cube as of each of the sorted days, in one pass over cube_events."""
+    cells, effective, values = cube_events(staged)
+    keys = cells.drop_duplicates('cell').set_index('cell').sort_index()
+    cell_ids = cells['cell'].to_numpy()
+    ends = np.searchsorted(effective, np.asarray(days, dtype='datetime64[ns]'), side='right')
+    totals = np.zeros((len(keys), values.shape[1]))
+    applied = 0
+    for end in ends:
+        np.add.at(totals, cell_ids[applied:end], values[applied:end])
+        applied = end
+        live = totals[:, 0] > 0.5  # 'alerts' count; subtracted cells drop to 0
+        cube = keys[live].reset_index(drop=True)
+        for i, c in enumerate(alert_metrics.CUBE_VALUES):
+            column = totals[live, i]
+            cube[c] = np.rint(column).astype('int64') if c == 'alerts' or c.endswith('_n') else column
+        yield cube
+
+
+# ============================================================================
+# MAIN EXECUTION
+# ============================================================================
+
+if __name__ == "__main__":
+    started = time.perf_counter()
+    run_metrics.start("report_backfill")
+    print("="*80)
+    print("REPORT / SNAPSHOT BACKFILL")
+    print("="*80)
+    print(f"Using data from: {RUN_DIR}")
+
+    store = alert_store.connect(ALERTS_DIR)
+    alerts_df = alert_store.load_alerts(store)
+
+    bars = {}
+    for ticker in alerts_df['ticker'].unique():
+        with run_metrics.stage('load', ticker):
+            df = bar_cache.load_bars(BARS_DIR, ticker)
+        if not df.empty:
+            bars[ticker] = df
+
+    with run_metrics.stage('classify'):
+        staged = outcome_stages(alerts_df, bars)
+    days = trading_calendar.sessions_in_range(BACKFILL_START, BACKFILL_END)
+    print(f"Backfilling {len(days)} sessions ({BACKFILL_START:%Y-%m-%d} to {BACKFILL_END:%Y-%m-%d}) "
+          f"from {len(alerts_df)} alerts")
+
+    os.makedirs(DAILY_DIR, exist_ok=True)
+    alert_store.import_snapshot_files(store, DAILY_DIR)
+    previous = alert_store.snapshot_before(store, days[0]) if len(days) else None
+    history = []
+    cubes = cumulative_cubes(staged, days)
+    for day in days:
+        with run_metrics.stage('metrics'):
+            cube = next(cubes)
+            metrics = alert_metrics.metrics_from_cube(cube, day)
+            snapshot = metrics.snapshot()
+        with run_metrics.stage('report'):
+            alert_reports.save_json_snapshot(metrics, DAILY_DIR)
+            alert_reports.write_daily_snapshot(metrics, DAILY_DIR, alert_reports.diff_snapshots(snapshot, previous))
+            alert_reports.generate_markdown_report(metrics, WEEKLY_REVIEWS_DIR, quiet=True)
+        history.append(metrics.history_row())
+        previous = snapshot
+    with run_metrics.stage('write'):
+        alert_store.upsert_snapshots(store, history)
+    store.close()
+
+    print(f"\nWrote {len(days)} reports to {WEEKLY_REVIEWS_DIR}")
+    print(f"Wrote {len(days)} JSON + Markdown snapshots to {DAILY_DIR}")
+    print(f"Wrote {len(history)} snapshot history rows to {alert_store.store_path(ALERTS_DIR)}")
+    print(f"Done in {time.perf_counter() - started:.1f}s")
+    run_metrics.count('sessions', len(days))
+    run_metrics.write(RUN_DIR)
@@ -0,0 +1,177 @@
+import os
+import sys
+import json
+import threading
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+from time import perf_counter
+
+import numpy as np
+
+# ============================================================================
+# RUN INSTRUMENTATION
+# ============================================================================
+#
+# Process-wide timers and counters. Library code wraps its work in
+#
+#   with run_metrics.stage("download"): ...      wall time per named stage
+#   run_metrics.count("api_calls")               named counters
+#
+# and scripts mark which ticker the work belongs to with
+#
+#   with run_metrics.for_ticker(ticker): ...
+#
+# so each stage also gets a per-ticker latency histogram (the time a stage
+# spent on one ticker, summed over its calls). The ticker scope is
+# thread-local, so pooled work is attributed correctly.
+#
+# A script calls start() once and write(run_dir) at the end. write() appends
+# one record to <run_dir>/metrics.json, a list of run records with this layout:
+#
+#   {script, started, finished, seconds,
+#    stages:   {name: {calls, seconds, tickers, latency_ms: {mean, p50, p95, max, histogram}}},
+#    counters: {name: value}}
+
+METRICS_FILE = "metrics.json"
+MAX_RECORDS = 1000  # Oldest records are dropped past this
+LATENCY_BUCKETS_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 30000]
+TICKER_STAGE = "ticker"  # Whole for_ticker() scope
+
+_lock = threading.Lock()
+_local = threading.local()
+_stage_hook = None  # name -> context manager wrapped around the stage, or None (profiling.py)
+
+
+def _new_state(script):
+    return {'script': script, 'started': datetime.now(), 'clock': perf_counter(),
+            'stages': {}, 'ticker_seconds': {}, 'counters': {}}
+
+
+_state = _new_state(os.path.basename(sys.argv[0]) or "python")
+
+
+def start(script=None):
+    """Reset all timers and counters for a new run."""
+    global _state
+    with _lock:
+        _state = _new_state(script or os.path.basename(sys.argv[0]))
+
+
+def set_stage_hook(hook):
+    """Install (or clear, with None) a callable giving a context manager to run each stage under."""
+    global _stage_hook
+    _stage_hook = hook
+
+
+def _hooked(name):
+    hook = _stage_hook
+    wrapper = hook(name) if hook is not None else None
+    return wrapper if wrapper is not None else nullcontext()
+
+
+def _add(name, seconds, ticker):
+    with _lock:
+        stage = _state['stages'].setdefault(name, {'calls': 0, 'seconds': 0.0})
+        stage['calls'] += 1
+        stage['seconds'] += seconds
+        if ticker is not None:
+            per_ticker = _state['ticker_seconds'].setdefault(name, {})
+            per_ticker[ticker] = per_ticker.get(ticker, 0.0) + seconds
+
+
+@contextmanager
+def stage(name, ticker=None):
+    """Time the block under `name`, for `ticker` or else the current for_ticker() scope."""
+    started = perf_counter()
+    try:
+        with _hooked(name):
+            yield
+    finally:
+        _add(name, perf_counter() - started, ticker if ticker is not None else getattr(_local, 'ticker', None))
+
+
+@contextmanager
+def for_ticker(ticker):
+    """Attribute stages inside the block to `ticker`; the whole block is timed as TICKER_STAGE."""
+    previous = getattr(_local, 'ticker', None)
+    _local.ticker = ticker
+    started = perf_counter()
+    try:
+        with _hooked(TICKER_STAGE):
+            yield
+    finally:
+        _local.ticker = previous
+        _add(TICKER_STAGE, perf_counter() - started, ticker)
+
+
+def count(name, n=1):
+    with _lock:
+        _state['counters'][name] = _state['counters'].get(name, 0) + n
+
+
+def frame_bytes(df):
+    """In-memory size of a downloaded frame (yfinance doesn't expose transfer sizes)."""
+    return int(df.memory_usage(deep=True, index=True).sum()) if df is not None else 0
+
+
+def _latency(seconds):
+    ms = np.asarray(seconds, dtype=float) * 1000.0
+    counts = np.histogram(ms, bins=[0] + LATENCY_BUCKETS_MS + [np.inf])[0]
+    return {
+        'mean': round(float(ms.mean()), 3),
+        'p50': round(float(np.percentile(ms, 50)), 3),
+        'p95': round(float(np.percentile(ms, 95)), 3),
+        'max': round(float(ms.max()), 3),
+        # Upper bucket edges in ms ("inf" for the overflow bucket) -> tickers
+        'histogram': {str(edge): int(c) for edge, c in zip(LATENCY_BUCKETS_MS + ['inf'], counts) if c},
+    }
+
+
+def snapshot():
+    """The current run as a metrics.json record."""
+    with _lock:
+        stages = {}
+        for name, s in _state['stages'].items():
+            entry = {'calls': s['calls'], 'seconds': round(s['seconds'], 4)}
+            per_ticker = _state['ticker_seconds'].get(name)
+            if per_ticker:
+                entry['tickers'] = len(per_ticker)
+                entry['latency_ms'] = _latency(list(per_ticker.values()))
+            stages[name] = entry
+        return {
+            'script': _state['script'],
+            'started': _state['started'].isoformat(timespec='seconds'),
+            'finished': datetime.now().isoformat(timespec='seconds'),
+            'seconds': round(perf_counter() - _state['clock'], 3),
+            'stages': stages,
+            'counters': dict(_state['counters']),
+        }
+
+
+def load(run_dir):
+    """All records in <run_dir>/metrics.json (empty list if none)."""
+    path = os.path.join(run_dir, METRICS_FILE)
+    if not os.path.exists(path):
+        return []
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            records = json.load(f)
+    except (OSError, ValueError):
+        return []
+    return records if isinstance(records, list) else []
+
+
+def write(run_dir, quiet=False):
+    """Append this run's record to <run_dir>/metrics.json. Returns the path."""
+    record = snapshot()
+    records = (load(run_dir) + [record])[-MAX_RECORDS:]
+    path = os.path.join(run_dir, METRICS_FILE)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(records, f, indent=1)
+    os.replace(tmp_path, path)
+    if not quiet:
+        slowest = sorted(((s['seconds'], n) for n, s in record['stages'].items() if n != TICKER_STAGE), reverse=True)
+        top = ", ".join(f"{n} {sec:.1f}s" for sec, n in slowest[:4])
+        print(f"Run metrics saved to: {path} ({record['seconds']:.1f}s total{'; ' + top if top else ''})")
+    return path
@@ -0,0 +1,183 @@
+import os
+import glob
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# ============================================================================
+# RISK-BUDGETED SCAN SCHEDULER
+# ============================================================================
+#
+# Instead of fixed weekday tiers, every known ticker gets a priority from its
+# interval history and the scanner spends its daily request budget from the
+# top of that ranking down:
+#
+#   priority = frequency x timing x regularity x recency
+#
+#   frequency   episodes per 30 days of typical cycle (1 / avg_gap)
+#   timing      where today falls in the ticker's cycle, using the same
+#               TOO_SOON / NORMAL / DUE / OVERDUE bands check_ticker reports
+#   regularity  1 / (1 + CV): predictable cycles make timing more trustworthy
+#   recency     boost from the best pump_score alerted in the last few days
+#
+# Every ticker with interval history is ranked, Tier 3 included: the old
+# weekday schedule never scanned Tier 3, but a Tier 3 ticker that is DUE can
+# now outrank a Tier 1 ticker that pumped last week. Tier labels are still
+# stored on alerts for the tracker's per-tier stats.
+#
+# Pinned tickers (the watchlist, plus Tier 1 in union_tier1 mode) take the
+# budget first, in priority order; whatever budget is left goes to the
+# highest-priority unpinned tickers. The budget is never exceeded: if the
+# pins alone need more, the lowest-priority pins are left out (the scanner
+# warns, and the schedule CSV shows them pinned but not selected).
+
+DEFAULT_BUDGET = 40        # yfinance requests per scan run
+DEFAULT_AVG_GAP = 30       # Fallback cycle for tickers without interval history
+RECENT_SCORE_DAYS = 10     # Window for the recency boost
+
+# Timing weight per status band (days_since_last / avg_gap)
+TIMING_WEIGHTS = {'TOO_SOON': 0.2, 'NORMAL': 0.5, 'DUE': 1.0, 'OVERDUE': 0.8, 'NEW': 0.4}
+
+# ============================================================================
+# SCANNER CONFIGURATION (shared by tiered_scanner and scanner_replay)
+# ============================================================================
+
+TIER1_MIN_EPISODES = 6  # Daily monitoring
+TIER2_MIN_EPISODES = 4  # Weekly monitoring
+
+# How to handle the watchlist if present
+# Options:
+#   "override"       → only rank/scan tickers from watchlist.txt
+#   "union_tier1"    → always scan watchlist + Tier 1, fill the rest of the budget by priority (recommended)
+#   "union_selected" → always scan the watchlist, fill the rest of the budget by priority
+WATCHLIST_MODE = "union_tier1"
+WATCHLIST_FILE = Path(__file__).resolve().parent / "watchlist.txt"
+
+
+def find_latest_run():
+    run_dirs = [
+        d for d in glob.glob("runs/*/")
+        if os.path.basename(os.path.normpath(d)) != "weekly_reviews"
+    ]
+    if not run_dirs:
+        raise FileNotFoundError("No valid run directories found inside /runs/")
+    return max(run_dirs, key=os.path.getmtime)
+
+
+def load_watchlist(path=WATCHLIST_FILE):
+    """
+    Tickers from watchlist.txt (one per line, no commas), or None if the
+    file doesn't exist.
+    """
+    path = Path(path)
+    if not path.exists():
+        return None
+    return [line.strip().upper() for line in path.read_text().splitlines() if line.strip()]
+
+
+def watchlist_scope(intervals_df, tiers, watchlist, mode=WATCHLIST_MODE):
+    """
+    (candidates, pinned) for a scan: the interval rows to rank and the
+    tickers scanned regardless of priority, per WATCHLIST_MODE.
+    """
+    if not watchlist:
+        return intervals_df, set()
+    if mode == "union_tier1":
+        return intervals_df, set(watchlist) | set(tiers.get("tier1", []))
+    if mode == "union_selected":
+        return intervals_df, set(watchlist)
+    return intervals_df[intervals_df['ticker'].isin(watchlist)], set(watchlist)
+
+
+# ============================================================================
+# RANKING
+# ============================================================================
+
+SCHEDULE_COLUMNS = [
+    'rank', 'ticker', 'tier', 'priority', 'selected', 'pinned', 'status',
+    'days_since_last', 'avg_gap_days', 'coefficient_variation', 'num_episodes',
+    'recent_score', 'frequency', 'timing', 'regularity', 'recency',
+]
+
+
+def status_bands(days_since_last, avg_gap):
+    """Vectorized status, same thresholds as tiered_scanner.check_ticker."""
+    ratio = days_since_last / avg_gap
+    status = np.select(
+        [ratio > 1.2, ratio > 0.8, ratio < 0.5],
+        ['OVERDUE', 'DUE', 'TOO_SOON'],
+        'NORMAL',
+    )
+    return np.where(pd.isna(days_since_last), 'NEW', status)
+
+
+def rank_tickers(intervals_df, last_pump_dates, tiers, as_of, recent_scores=None,
+                 extra_tickers=()):
+    """
+    Priority of every ticker in intervals_df (plus extra_tickers), highest first.
+
+    last_pump_dates maps ticker -> last pump Timestamp (or None), tiers maps
+    tier name -> tickers, recent_scores maps ticker -> best recent pump_score.
+    """
+    as_of = pd.Timestamp(as_of).normalize()
+    tickers = list(dict.fromkeys(list(intervals_df['ticker']) + list(extra_tickers)))
+    stats = (intervals_df.drop_duplicates('ticker').set_index('ticker')
+             .reindex(tickers)[['num_episodes', 'avg_gap_days', 'coefficient_variation']])
+
+    df = pd.DataFrame({'ticker': tickers})
+    df['num_episodes'] = stats['num_episodes'].fillna(0).to_numpy()
+    df['avg_gap_days'] = stats['avg_gap_days'].fillna(DEFAULT_AVG_GAP).clip(lower=1).to_numpy()
+    df['coefficient_variation'] = stats['coefficient_variation'].fillna(1.0).clip(lower=0).to_numpy()
+
+    tier_of = {t: name for name, members in tiers.items() for t in members}
+    df['tier'] = df['ticker'].map(tier_of).fillna('watchlist')
+
+    last = pd.to_datetime(df['ticker'].map(last_pump_dates or {}))
+    df['days_since_last'] = (as_of - last).dt.days
+    df['status'] = status_bands(df['days_since_last'].to_numpy(dtype=float),
+                                df['avg_gap_days'].to_numpy())
+
+    recent = df['ticker'].map(recent_scores or {}).astype(float)
+    df['recent_score'] = recent
+
+    df['frequency'] = 30.0 / df['avg_gap_days']
+    df['timing'] = df['status'].map(TIMING_WEIGHTS)
+    df['regularity'] = 1.0 / (1.0 + df['coefficient_variation'])
+    df['recency'] = 1.0 + recent.fillna(0) / 100.0
+    df['priority'] = df['frequency'] * df['timing'] * df['regularity'] * df['recency']
+
+    df = df.sort_values(['priority', 'ticker'], ascending=[False, True], kind='stable')
+    df['rank'] = np.arange(1, len(df) + 1)
+    return df.reset_index(drop=True)
+
+
+def select(ranking, budget=DEFAULT_BUDGET, pinned=()):
+    """
+    Mark which tickers get scanned: pinned first, then by rank, until the
+    budget is spent. Pins past the budget are left unselected (see
+    pins_over_budget). Returns the ranking with selected/pinned columns.
+    """
+    ranking = ranking.copy()
+    pinned = set(pinned)
+    ranking['pinned'] = ranking['ticker'].isin(pinned)
+    pinned_rank = ranking['pinned'].cumsum()
+    selected_pins = ranking['pinned'] & (pinned_rank <= budget)
+    remaining = max(budget - int(selected_pins.sum()), 0)
+    unpinned_rank = (~ranking['pinned']).cumsum()
+    ranking['selected'] = selected_pins | (~ranking['pinned'] & (unpinned_rank <= remaining))
+    return ranking[SCHEDULE_COLUMNS]
+
+
+def pins_over_budget(schedule):
+    """Pinned tickers select() had to leave out because the pins alone exceed the budget."""
+    return list(schedule.loc[schedule['pinned'] & ~schedule['selected'], 'ticker'])
+
+
+def recent_scores(alerts_df, as_of, days=RECENT_SCORE_DAYS):
+    """ticker -> best pump_score alerted within `days` of as_of."""
+    if alerts_df is None or len(alerts_df) == 0:
+        return {}
+    as_of = pd.Timestamp(as_of).normalize()
+    recent = alerts_df[alerts_df['alert_date'] >= as_of - pd.Timedelta(days=days)]
+    return recent.groupby('ticker')['pump_score'].max().to_dict()
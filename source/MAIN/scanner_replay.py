@@ -0,0 +1,323 @@
+import pandas as pd
+import numpy as np
+from datetime import datetime
+import os
+import time
+
+import alert_store
+import bar_cache
+import episode_stats
+import fetch_planner
+import outcome_tracking
+import pump_scoring
+import run_metrics
+import scan_scheduler
+import ticker_profiles
+import trading_calendar
+
+# ============================================================================
+# HISTORICAL SCANNER REPLAY
+# ============================================================================
+#
+# Re-runs the daily scan for every session in [REPLAY_START, REPLAY_END] from
+# the run's bar cache, and writes what alerts_history.csv would have looked
+# like. Each ticker's full bar history is scored once
+# (pump_scoring.calculate_pump_score). The only work done per day is the
+# scheduler ranking and some array slicing:
+#
+#   schedule   scan_scheduler ranking with point-in-time tiers, interval
+#              stats and last pump dates, and the recency boost from alerts
+#              replayed in earlier days
+#   scan       per selected ticker, the bars since its last replayed scan
+#              that sit inside the 60-bar download window (same catch-up rule
+#              as check_ticker); first scan = latest bar only
+#   dedup      first alert per ticker/alert_date wins, as in alert_store
+#   outcomes   outcome_tracking.evaluate_outcomes + classify_outcome as of
+#              REPLAY_AS_OF, like an alert_tracker run on that day
+#
+# Tiers and interval stats are rebuilt (episode_stats.ticker_intervals,
+# ticker_profiles.assign_tiers) from the pump episodes known before each
+# day, rather than taken from today's profiles, which would let later
+# episodes pick the tickers an earlier day scans. A pump signal is only
+# classified once its 20-day returns exist, so a pump counts from
+# CLASSIFY_LAG_BARS sessions after its signal date and an episode from that
+# long after its end. Episode boundaries themselves are as pump_detector
+# drew them with the full history. Missing bars are fetched into the cache
+# once, in batched range requests (fetch_planner).
+
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+LATEST_RUN = scan_scheduler.find_latest_run()
+
+MASTER_PATH    = os.path.join(LATEST_RUN, "data", "signals_csv", "MASTER_TRUTH_WITH_EPISODES.csv")
+EPISODES_PATH  = os.path.join(LATEST_RUN, "data", "signals_csv", "PUMP_EPISODES.csv")
+ALERTS_DIR     = os.path.join(LATEST_RUN, "data", "alerts")
+REPLAY_DIR     = os.path.join(ALERTS_DIR, "replay")
+BARS_DIR       = bar_cache.cache_dir_for(LATEST_RUN)
+
+PUMP_THRESHOLD = pump_scoring.PUMP_THRESHOLD
+SCAN_BUDGET = int(os.environ.get("SCAN_BUDGET", scan_scheduler.DEFAULT_BUDGET))
+CLASSIFY_LAG_BARS = 20     # pump_detector classifies a signal from its 20-day returns
+MIN_INTERVAL_EPISODES = 3  # As in pump_analyzer's ticker_intervals.csv
+
+# Replay range (YYYY-MM-DD). Defaults to the year up to the last completed session.
+TODAY = pd.Timestamp(datetime.now()).normalize()
+REPLAY_END = pd.Timestamp(os.environ.get("REPLAY_END")
+                          or trading_calendar.session_at(trading_calendar.session_index(TODAY) - 1))
+REPLAY_START = pd.Timestamp(os.environ.get("REPLAY_START") or REPLAY_END - pd.DateOffset(years=1))
+# Outcomes are evaluated as an alert_tracker run on this day would see them
+REPLAY_AS_OF = min(outcome_tracking.final_maturity(REPLAY_END), TODAY)
+
+
+# ============================================================================
+# INPUTS
+# ============================================================================
+
+def pump_history(master_path):
+    """
+    (signal_date, ticker, known_date) of every confirmed/likely pump, in the
+    order they become known (CLASSIFY_LAG_BARS sessions after the signal).
+    """
+    master = pd.read_csv(master_path, usecols=['ticker', 'signal_date', 'classification'])
+    pumps = master[master['classification'].isin(ticker_profiles.PUMP_CLASSES)]
+    pumps = pumps.assign(signal_date=pd.to_datetime(pumps['signal_date'], errors='coerce'))
+    pumps = pumps.dropna(subset=['signal_date'])
+    pumps = pumps.assign(known_date=trading_calendar.offset(pumps['signal_date'], CLASSIFY_LAG_BARS))
+    return pumps.sort_values(['known_date', 'signal_date'], kind='stable', ignore_index=True)
+
+
+def episode_history(episodes_path):
+    """Pump episodes in the order they become known (CLASSIFY_LAG_BARS sessions after they end)."""
+    episodes = pd.read_csv(episodes_path)
+    for c in ['start_date', 'end_date']:
+        episodes[c] = pd.to_datetime(episodes[c], errors='coerce')
+    episodes = episodes.dropna(subset=['start_date', 'end_date'])
+    episodes = episodes.assign(known_date=trading_calendar.offset(episodes['end_date'], CLASSIFY_LAG_BARS))
+    return episodes.sort_values(['known_date', 'ticker'], kind='stable', ignore_index=True)
+
+
+def intervals_as_of(episodes):
+    """(intervals frame, tier name -> tickers) from the given episodes, as pump_analyzer / ticker_profiles build them."""
+    intervals_df = episode_stats.ticker_intervals(episodes, min_episodes=MIN_INTERVAL_EPISODES)
+    tier = ticker_profiles.assign_tiers(intervals_df, scan_scheduler.TIER1_MIN_EPISODES,
+                                        scan_scheduler.TIER2_MIN_EPISODES)
+    tiers = {name: list(intervals_df['ticker'][tier == name]) for name in ['tier1', 'tier2', 'tier3']}
+    return intervals_df, tiers
+
+
+def load_replay_bars(tickers, start, end):
+    """
+    ticker -> cached bars from a full scan window before start through the
+    last outcome horizon after end, fetching whatever the cache is missing.
+    """
+    first = trading_calendar.offset(start, -pump_scoring.SCAN_WINDOW_BARS)
+    last = REPLAY_AS_OF
+    needed = {t: [(first, last)] for t in tickers}
+    plan = fetch_planner.plan_fetches(needed, BARS_DIR)
+    if plan:
+        print(f"Fetching {len(plan)} missing ranges into {BARS_DIR}...")
+        stats = fetch_planner.execute_plan(plan, BARS_DIR, TODAY)
+        print(f"  ✓ {stats['requests']} requests, {stats['bars']} bars transferred")
+
+    bars = {}
+    for ticker in tickers:
+        df = bar_cache.load_bars(BARS_DIR, ticker, first, last)
+        if not df.empty:
+            bars[ticker] = df
+    return bars
+
+
+def score_bars(bars):
+    """
+    One scoring pass per ticker over its whole history.
+    Returns ticker -> (bar dates, scored frame, alert mask array).
+    """
+    scored = {}
+    for ticker, df in bars.items():
+        with run_metrics.for_ticker(ticker):
+            df = pump_scoring.calculate_pump_score(df)
+            hits = pump_scoring.alert_mask(df, PUMP_THRESHOLD).to_numpy()
+        scored[ticker] = (df.index.values, df, hits)
+    return scored
+
+
+# ============================================================================
+# REPLAY
+# ============================================================================
+
+def replay_scans(days, episodes, scored, pumps, watchlist):
+    """
+    Replay the daily scan for each session in days.
+    Returns (alerts frame in alerts_history schema, per-day scan log).
+    """
+    pump_known = pumps['known_date'].to_numpy(dtype='datetime64[ns]')
+    pump_dates = pumps['signal_date'].to_numpy()
+    pump_tickers = pumps['ticker'].to_numpy()
+    next_pump = 0
+    episode_known = episodes['known_date'].to_numpy(dtype='datetime64[ns]')
+    known_episodes = -1  # Episodes behind the current intervals (-1 = not built yet)
+
+    last_pump = {}    # ticker -> last pump signal strictly before the scan day
+    last_pos = {}     # ticker -> position of the newest bar already scanned
+    hits = []         # (scan_day, ticker, tier, bar position, last pump, avg gap)
+    recent = pd.DataFrame(columns=['ticker', 'alert_date', 'pump_score'])
+    log = []
+
+    for day in days:
+        day64 = np.datetime64(day, 'ns')
+        while next_pump < len(pump_dates) and pump_known[next_pump] < day64:
+            ticker = pump_tickers[next_pump]
+            last_pump[ticker] = max(pd.Timestamp(pump_dates[next_pump]), last_pump.get(ticker, pd.Timestamp.min))
+            next_pump += 1
+        # Intervals and tiers only move when another episode becomes known
+        n_known = int(np.searchsorted(episode_known, day64, side='left'))
+        if n_known != known_episodes:
+            known_episodes = n_known
+            intervals_df, tiers = intervals_as_of(episodes.iloc[:n_known])
+            candidates, pinned = scan_scheduler.watchlist_scope(intervals_df, tiers, watchlist)
+
+        ranking = scan_scheduler.rank_tickers(
+            candidates, last_pump, tiers, day,
+            recent_scores=scan_scheduler.recent_scores(recent, day),
+            extra_tickers=sorted(pinned),
+        )
+        schedule = scan_scheduler.select(ranking, SCAN_BUDGET, pinned)
+        selected = schedule[schedule['selected']]
+
+        no_data = 0
+        day_hits = []
+        for ticker, tier, avg_gap in zip(selected['ticker'], selected['tier'], selected['avg_gap_days']):
+            if ticker not in scored:
+                no_data += 1
+                continue
+            dates, _, mask = scored[ticker]
+            end = int(np.searchsorted(dates, day64, side='right'))
+            window_start = max(end - pump_scoring.SCAN_WINDOW_BARS, 0)
+            if end - window_start < pump_scoring.MIN_BARS:
+                no_data += 1
+                continue
+            if ticker in last_pos:
+                lo = max(last_pos[ticker] + 1, window_start + pump_scoring.WARMUP_BARS)
+            else:
+                lo = end - 1
+            last_pos[ticker] = end - 1
+            for pos in lo + np.flatnonzero(mask[lo:end]):
+                day_hits.append((day, ticker, tier, int(pos), last_pump.get(ticker), avg_gap))
+
+        if day_hits:
+            hits.extend(day_hits)
+            new = pd.DataFrame({
+                'ticker': [h[1] for h in day_hits],
+                'alert_date': [pd.Timestamp(scored[h[1]][0][h[3]]) for h in day_hits],
+                'pump_score': [scored[h[1]][1]['pump_score'].iat[h[3]] for h in day_hits],
+            })
+            keep = recent['alert_date'] >= day - pd.Timedelta(days=scan_scheduler.RECENT_SCORE_DAYS)
+            recent = pd.concat([recent[keep], new], ignore_index=True)
+        log.append({'scan_date': day, 'tier1': len(tiers['tier1']), 'tier2': len(tiers['tier2']),
+                    'selected': len(selected),
+                    'pins_over_budget': len(scan_scheduler.pins_over_budget(schedule)),
+                    'no_data': no_data, 'alerts': len(day_hits)})
+
+    return build_alerts(hits, scored), pd.DataFrame(log)
+
+
+def build_alerts(hits, scored):
+    """Raw (day, ticker, tier, pos, last pump, avg gap) hits -> alerts_history rows."""
+    if not hits:
+        return pd.DataFrame(columns=alert_store.ALERT_COLUMNS)
+
+    hit_df = pd.DataFrame(hits, columns=['scan_date', 'ticker', 'tier', 'pos', 'last_pump', 'avg_gap'])
+    parts = []
+    for ticker, group in hit_df.groupby('ticker', sort=False):
+        rows = scored[ticker][1].iloc[group['pos'].to_numpy()]
+        parts.append(rows.assign(alert_date=rows.index).set_axis(group.index))
+    bars = pd.concat(parts).loc[hit_df.index]
+
+    alerts = pd.DataFrame({
+        'ticker': hit_df['ticker'],
+        'tier': hit_df['tier'],
+        'alert_date': pd.to_datetime(bars['alert_date']).to_numpy(),
+        'pump_score': bars['pump_score'].to_numpy(dtype=float),
+        'alert_price': bars['Close'].to_numpy(),
+        'volume': bars['Volume'].to_numpy(),
+        'vol_z': bars['vol_z'].to_numpy(),
+        'daily_return': bars['return'].to_numpy(),
+    })
+    last_pump = pd.to_datetime(hit_df['last_pump'])
+    alerts['days_since_last'] = (alerts['alert_date'] - last_pump).dt.days
+    alerts['status'] = scan_scheduler.status_bands(alerts['days_since_last'].to_numpy(dtype=float),
+                                                   hit_df['avg_gap'].to_numpy(dtype=float))
+    # First alert per ticker/day wins, as in alert_store
+    return alerts.drop_duplicates(alert_store.KEY_COLUMNS, keep='first').reset_index(drop=True)
+
+
+def evaluate(alerts, bars, as_of):
+    """Tracker outcome columns for every replayed alert, as of as_of."""
+    visible = {t: df[df.index <= as_of] for t, df in bars.items()}
+    outcomes = outcome_tracking.evaluate_outcomes(alerts, visible)
+    for col in outcomes.columns:
+        alerts[col] = outcomes[col]
+    alerts['outcome'] = (alerts.apply(outcome_tracking.classify_outcome, axis=1)
+                         if len(alerts) > 0 else pd.Series(dtype=object))
+    alerts['days_since_alert'] = (as_of - alerts['alert_date']).dt.days.clip(lower=0)
+    alerts['last_updated'] = as_of.strftime('%Y-%m-%d %H:%M')
+    alerts = alerts.sort_values(alert_store.KEY_COLUMNS[::-1], ignore_index=True)
+    return alerts[alert_store.ALERT_COLUMNS]
+
+
+# ============================================================================
+# MAIN EXECUTION
+# ============================================================================
+
+if __name__ == "__main__":
+    started = time.perf_counter()
+    run_metrics.start("scanner_replay")
+    print("="*80)
+    print("SCANNER REPLAY")
+    print("="*80)
+    print(f"Using data from: {LATEST_RUN}")
+    print(f"Replaying {REPLAY_START:%Y-%m-%d} to {REPLAY_END:%Y-%m-%d} "
+          f"(budget {SCAN_BUDGET}, outcomes as of {REPLAY_AS_OF:%Y-%m-%d})")
+
+    episodes = episode_history(EPISODES_PATH)
+    watchlist = scan_scheduler.load_watchlist()
+    # Every ticker that has interval stats by the end of the range
+    final_intervals, _ = intervals_as_of(episodes[episodes['known_date'] < REPLAY_END])
+    universe = sorted(set(final_intervals['ticker']) | set(watchlist or []))
+    print(f"Tiers and intervals rebuilt per day from {len(episodes)} pump episodes, each counted "
+          f"{CLASSIFY_LAG_BARS} sessions after it ends (when its signals are classified)")
+
+    bars = load_replay_bars(universe, REPLAY_START, REPLAY_END)
+    scored = score_bars(bars)
+    print(f"Scored {len(scored)}/{len(universe)} tickers "
+          f"({sum(len(v[0]) for v in scored.values()):,} bars) in {time.perf_counter() - started:.1f}s")
+
+    days = trading_calendar.sessions_in_range(REPLAY_START, REPLAY_END)
+    with run_metrics.stage('replay'):
+        alerts, scan_log = replay_scans(days, episodes, scored, pump_history(MASTER_PATH), watchlist)
+    with run_metrics.stage('classify'):
+        alerts = evaluate(alerts, bars, REPLAY_AS_OF)
+
+    os.makedirs(REPLAY_DIR, exist_ok=True)
+    suffix = f"{REPLAY_START:%Y%m%d}_{REPLAY_END:%Y%m%d}"
+    alerts_file = os.path.join(REPLAY_DIR, f"alerts_history_{suffix}.csv")
+    log_file = os.path.join(REPLAY_DIR, f"scan_log_{suffix}.csv")
+    with run_metrics.stage('write'):
+        alerts.to_csv(alerts_file, index=False)
+        scan_log.to_csv(log_file, index=False)
+
+    print(f"\nReplayed {len(days)} sessions, {int(scan_log['selected'].sum()):,} ticker scans, "
+          f"{len(alerts)} alerts in {time.perf_counter() - started:.1f}s")
+    classified = alerts[alerts['outcome'] != 'pending']
+    if len(classified) > 0:
+        for outcome, count in classified['outcome'].value_counts().items():
+            print(f"  {outcome:20s}: {count:4d} ({count / len(classified) * 100:.1f}%)")
+        pumps = classified['outcome'].isin(ticker_profiles.PUMP_CLASSES).sum()
+        print(f"  Precision: {pumps / len(classified) * 100:.1f}% ({pumps}/{len(classified)} classified)")
+    print(f"\nAlerts saved to: {alerts_file}")
+    print(f"Scan log saved to: {log_file}")
+    run_metrics.count('alerts', len(alerts))
+    run_metrics.write(LATEST_RUN)
@@ -0,0 +1,194 @@
+from dataclasses import dataclass, asdict
+
+import numpy as np
+import pandas as pd
+
+import bar_cache
+import pump_scoring
+import trading_calendar
+
+# ============================================================================
+# SYNTHETIC MARKET
+# ============================================================================
+#
+# Daily OHLCV for any number of made-up tickers, used to measure how the
+# pipeline scales past the real watchlist (benchmark.py). Each ticker follows
+# a geometric Brownian motion with its own drift, volatility and price level.
+# Volume is lognormal with Student-t noise (heavy tails, so ordinary days
+# still throw the odd volume spike) and rises with the size of the day's move.
+#
+# A share of tickers get pump-and-dump events injected on top. Each event
+# uses a PumpProfile:
+#
+#   gap-up     the first pump day opens gap_up above the prior close
+#   run-up     run_up_return spread over run_up_days closes, intraday range widened
+#   volume     volume_spike x the ticker's base volume on the first day,
+#              decaying by volume_decay per day through the run-up and crash
+#   crash      'fast'    crash_depth of the peak given back the next day
+#              'gradual' the same depth spread evenly over crash_days
+#              'none'    no dump: a breakout the detector should not call a pump
+#
+# The injected events are returned with the bars as ground truth.
+
+DAYS = 252
+WARMUP_BARS = pump_scoring.WARMUP_BARS
+CRASH_SHAPES = ('fast', 'gradual', 'none')
+
+
+@dataclass
+class PumpProfile:
+    volume_spike: float = 8.0
+    volume_decay: float = 0.6
+    gap_up: float = 0.10
+    run_up_days: int = 2
+    run_up_return: float = 0.40
+    crash: str = 'fast'
+    crash_days: int = 5
+    crash_depth: float = 0.35
+
+
+PROFILES = {
+    'fast_dump': PumpProfile(),
+    'slow_bleed': PumpProfile(volume_spike=5.0, run_up_days=3, run_up_return=0.30,
+                              crash='gradual', crash_days=8, crash_depth=0.40),
+    'blow_off': PumpProfile(volume_spike=15.0, volume_decay=0.4, gap_up=0.25, run_up_days=1,
+                            run_up_return=0.80, crash='fast', crash_depth=0.55),
+    'breakout': PumpProfile(volume_spike=4.0, gap_up=0.06, run_up_days=3, run_up_return=0.25,
+                            crash='none'),
+}
+
+EVENT_COLUMNS = ['ticker', 'profile', 'start_date', 'peak_date', 'end_date', 'crash',
+                 'volume_spike', 'gap_up', 'run_up_return', 'crash_depth']
+
+
+def ticker_names(n):
+    width = max(4, len(str(n - 1)))
+    return [f"S{i:0{width}d}" for i in range(n)]
+
+
+def session_dates(days=DAYS, end=None):
+    """The last `days` sessions up to end (default: the last session before today)."""
+    end = pd.Timestamp(end) if end is not None else pd.Timestamp.today().normalize() - pd.Timedelta(days=1)
+    hi = int(trading_calendar.session_index(end, roll='backward'))
+    return trading_calendar.session_at(np.arange(hi - days + 1, hi + 1))
+
+
+def _event_span(profile):
+    return profile.run_up_days + (0 if profile.crash == 'none' else profile.crash_days) + 1
+
+
+def _inject(r, gap, spread, vol_mult, i, s, profile):
+    """Adds one event starting at bar s to ticker i's log-return / gap / range / volume rows."""
+    if profile.crash not in CRASH_SHAPES:
+        raise ValueError(f"Unknown crash shape: {profile.crash}")
+    up = profile.run_up_days
+    run = np.log1p(profile.run_up_return) / up
+    # The opening gap is part of the first day's close-to-close move
+    gap[i, s] = np.log1p(profile.gap_up)
+    r[i, s:s + up] = run + 0.2 * r[i, s:s + up]
+    spread[i, s:s + up] *= 3.0
+
+    span = _event_span(profile) - 1
+    vol_mult[i, s:s + span] *= profile.volume_spike * profile.volume_decay ** np.arange(span)
+
+    crash_at = s + up
+    if profile.crash == 'fast':
+        r[i, crash_at] = np.log1p(-profile.crash_depth)
+        spread[i, crash_at] *= 3.0
+    elif profile.crash == 'gradual':
+        days = profile.crash_days
+        r[i, crash_at:crash_at + days] = np.log1p(-profile.crash_depth) / days + 0.2 * r[i, crash_at:crash_at + days]
+        spread[i, crash_at:crash_at + days] *= 1.5
+    return crash_at - 1
+
+
+def generate_market(n_tickers, days=DAYS, end=None, seed=0, pumped_share=0.3,
+                    events_per_ticker=2.0, profiles=PROFILES):
+    """
+    Synthetic daily bars for n_tickers over the last `days` sessions.
+    pumped_share of the tickers get a Poisson(events_per_ticker) number of
+    non-overlapping events (at least one), each with a profile drawn from
+    `profiles` (name -> PumpProfile).
+
+    Returns (bars, events): bars maps ticker -> DataFrame indexed by date
+    with bar_cache.BAR_COLUMNS; events is a DataFrame with EVENT_COLUMNS.
+    """
+    rng = np.random.default_rng(seed)
+    dates = session_dates(days, end)
+    tickers = ticker_names(n_tickers)
+    n = n_tickers
+
+    # ---------- GBM baseline ----------
+    sigma = np.exp(rng.normal(np.log(0.04), 0.4, size=n))          # daily volatility
+    mu = rng.normal(0.0, 0.001, size=n) - sigma ** 2 / 2
+    r = mu[:, None] + sigma[:, None] * rng.standard_normal((n, days))
+    gap = 0.25 * sigma[:, None] * rng.standard_normal((n, days))   # open vs prior close
+    spread = np.broadcast_to(0.6 * sigma[:, None], (n, days)).copy()
+    price0 = np.exp(rng.uniform(np.log(0.2), np.log(50.0), size=n))
+
+    # ---------- heavy-tailed volume ----------
+    base_volume = np.exp(rng.normal(np.log(2e6), 1.2, size=n))
+    vol_mult = np.exp(np.clip(0.35 * rng.standard_t(3, size=(n, days)), -3.0, 3.0))
+
+    # ---------- pump-and-dump events ----------
+    names = list(profiles)
+    events = []
+    pumped = rng.choice(n, size=int(round(n * pumped_share)), replace=False)
+    for i in np.sort(pumped):
+        count = max(1, rng.poisson(events_per_ticker))
+        # Events start after the scoring warmup and never overlap
+        free = WARMUP_BARS + 1
+        for _ in range(count):
+            name = names[rng.integers(len(names))]
+            profile = profiles[name]
+            span = _event_span(profile)
+            if free + span >= days:
+                break
+            s = int(rng.integers(free, min(days - span, free + days // count) + 1))
+            peak = _inject(r, gap, spread, vol_mult, i, s, profile)
+            end_bar = s + span - 1
+            events.append({
+                'ticker': tickers[i], 'profile': name,
+                'start_date': dates[s], 'peak_date': dates[peak], 'end_date': dates[end_bar],
+                **{k: v for k, v in asdict(profile).items() if k in EVENT_COLUMNS},
+            })
+            free = end_bar + 1
+
+    # ---------- OHLCV ----------
+    close = price0[:, None] * np.exp(np.cumsum(r, axis=1))
+    prev_close = np.concatenate([price0[:, None], close[:, :-1]], axis=1)
+    open_ = prev_close * np.exp(gap)
+    body_hi = np.maximum(open_, close)
+    body_lo = np.minimum(open_, close)
+    high = body_hi * np.exp(spread * np.abs(rng.standard_normal((n, days))) / 2)
+    low = body_lo * np.exp(-spread * np.abs(rng.standard_normal((n, days))) / 2)
+    move = np.abs(np.log(close / prev_close))
+    volume = np.round(base_volume[:, None] * vol_mult * (1.0 + 5.0 * move))
+
+    ohlcv = dict(zip(bar_cache.BAR_COLUMNS, (open_, high, low, close, volume)))
+    bars = {
+        t: pd.DataFrame({c: a[i] for c, a in ohlcv.items()}, index=dates.rename('Date'))
+        for i, t in enumerate(tickers)
+    }
+    return bars, pd.DataFrame(events, columns=EVENT_COLUMNS)
+
+
+def detection_recall(events, hits, lag=0):
+    """
+    Share of events, per profile, with at least one hit between the event's
+    start and its peak (+ lag sessions). `hits` is a DataFrame of
+    (ticker, date) rows, e.g. alert bars or backtest signals.
+    Returns a DataFrame indexed by profile with events, detected, recall_pct.
+    """
+    if len(events) == 0:
+        return pd.DataFrame(columns=['events', 'detected', 'recall_pct'])
+    hit_sets = hits.groupby('ticker')['date'].agg(lambda d: set(pd.to_datetime(d)))
+    last = trading_calendar.offset(events['peak_date'], lag)
+    detected = [
+        any(events['start_date'].iat[k] <= d <= last[k] for d in hit_sets.get(t, ()))
+        for k, t in enumerate(events['ticker'])
+    ]
+    out = events.assign(detected=detected).groupby('profile').agg(
+        events=('detected', 'size'), detected=('detected', 'sum'))
+    out['recall_pct'] = out['detected'] / out['events'] * 100.0
+    return out
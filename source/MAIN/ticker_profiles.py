@@ -0,0 +1,208 @@
+import os
+import json
+from dataclasses import dataclass, asdict, fields
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+# ============================================================================
+# TICKER PROFILE REGISTRY
+# ============================================================================
+#
+# One compact record per ticker: tier, interval stats and last pump date from
+# the historical analysis, plus the scanner's rolling state (last scan, newest
+# bar seen, last alert, fetch health). Built in one vectorized pass over
+# ticker_intervals.csv and MASTER_TRUTH_WITH_EPISODES.csv, persisted to
+# <run>/data/analysis/ticker_profiles.json together with the size/mtime of
+# those inputs. As long as the inputs are unchanged, startup reads only the
+# JSON, whatever the size of MASTER_TRUTH.
+
+PROFILE_FILE = "ticker_profiles.json"
+PUMP_CLASSES = ('confirmed_pump', 'likely_pump')
+HEALTH_STATES = ('unknown', 'ok', 'no_data', 'bad_print', 'error')
+
+# Rolling scanner state carried over when the historical part is rebuilt
+_ROLLING_FIELDS = ('last_scanned_date', 'last_bar_date', 'last_alert_date', 'health', 'failures')
+
+
+@dataclass
+class TickerProfile:
+    ticker: str
+    tier: str
+    num_episodes: int
+    avg_gap_days: float
+    coefficient_variation: float
+    last_pump_date: Optional[str] = None      # 'YYYY-MM-DD'
+    last_scanned_date: Optional[str] = None   # Last scan run that checked the ticker
+    last_bar_date: Optional[str] = None       # Newest bar scored; the next scan catches up from here
+    last_alert_date: Optional[str] = None
+    health: str = 'unknown'                   # One of HEALTH_STATES
+    failures: int = 0                         # Consecutive unhealthy scans
+
+
+def profile_path(run_dir):
+    return os.path.join(run_dir, "data", "analysis", PROFILE_FILE)
+
+
+# ============================================================================
+# VECTORIZED BUILD
+# ============================================================================
+
+def assign_tiers(intervals_df, tier1_min_episodes, tier2_min_episodes):
+    """Tier name per row of intervals_df (tier1 also takes 5+ regular episodes)."""
+    num_episodes = intervals_df['num_episodes'].to_numpy(dtype=float)
+    cv = intervals_df['coefficient_variation'].to_numpy(dtype=float)
+    tier = np.select(
+        [(num_episodes >= tier1_min_episodes) | ((num_episodes >= 5) & (cv < 0.4)),
+         num_episodes >= tier2_min_episodes],
+        ['tier1', 'tier2'],
+        'tier3',
+    )
+    return pd.Series(tier, index=intervals_df.index)
+
+
+def last_pump_dates(master_df):
+    """ticker -> latest confirmed/likely pump signal_date, in one groupby."""
+    pumps = master_df[master_df['classification'].isin(PUMP_CLASSES)]
+    return pd.to_datetime(pumps['signal_date']).groupby(pumps['ticker']).max()
+
+
+def build_profiles(intervals_df, master_df, tier1_min_episodes, tier2_min_episodes):
+    """ticker -> TickerProfile for every ticker in intervals_df."""
+    df = intervals_df.drop_duplicates('ticker')
+    tiers = assign_tiers(df, tier1_min_episodes, tier2_min_episodes)
+    last_pump = df['ticker'].map(last_pump_dates(master_df)).dt.strftime('%Y-%m-%d')
+
+    profiles = {}
+    for ticker, tier, num_episodes, avg_gap, cv, last in zip(
+            df['ticker'], tiers, df['num_episodes'], df['avg_gap_days'],
+            df['coefficient_variation'], last_pump):
+        profiles[ticker] = TickerProfile(
+            ticker=ticker,
+            tier=tier,
+            num_episodes=int(num_episodes),
+            avg_gap_days=float(avg_gap),
+            coefficient_variation=float(cv),
+            last_pump_date=last if isinstance(last, str) else None,
+        )
+    return profiles
+
+
+# ============================================================================
+# REGISTRY
+# ============================================================================
+
+def _signature(paths, params):
+    sig = {'params': params}
+    for path in paths:
+        st = os.stat(path)
+        sig[os.path.basename(path)] = [st.st_size, st.st_mtime_ns]
+    return sig
+
+
+class ProfileRegistry:
+    """Dict-backed TickerProfile lookups plus the scanner's state updates."""
+
+    def __init__(self, path, profiles, signature):
+        self.path = path
+        self.profiles = profiles
+        self.signature = signature
+
+    def get(self, ticker):
+        return self.profiles.get(ticker)
+
+    def __contains__(self, ticker):
+        return ticker in self.profiles
+
+    def __len__(self):
+        return len(self.profiles)
+
+    def tiers(self):
+        """{'tier1': [...], 'tier2': [...], 'tier3': [...]}"""
+        out = {'tier1': [], 'tier2': [], 'tier3': []}
+        for p in self.profiles.values():
+            out.setdefault(p.tier, []).append(p.ticker)
+        return out
+
+    def last_pump_dates(self):
+        return {t: (pd.Timestamp(p.last_pump_date) if p.last_pump_date else None)
+                for t, p in self.profiles.items()}
+
+    def frame(self):
+        """All profiles as a DataFrame (one row per ticker)."""
+        return pd.DataFrame([asdict(p) for p in self.profiles.values()],
+                            columns=[f.name for f in fields(TickerProfile)])
+
+    def record_scan(self, ticker, scan_date, health, bar_date=None, alert_date=None):
+        """
+        Update a ticker's rolling state after a scan attempt. bar_date is the
+        newest completed bar scored (left unchanged when there is none).
+        """
+        p = self.profiles.get(ticker)
+        if p is None:
+            # Watchlist tickers without history still get rolling state
+            p = self.profiles[ticker] = TickerProfile(ticker, 'watchlist', 0, float('nan'), float('nan'))
+        p.last_scanned_date = pd.Timestamp(scan_date).strftime('%Y-%m-%d')
+        if bar_date is not None:
+            p.last_bar_date = pd.Timestamp(bar_date).strftime('%Y-%m-%d')
+        if alert_date is not None:
+            p.last_alert_date = pd.Timestamp(alert_date).strftime('%Y-%m-%d')
+        p.health = health
+        p.failures = 0 if health == 'ok' else p.failures + 1
+
+    def refresh_inputs(self, paths):
+        """Re-stamp input signatures after appends known not to change any profile."""
+        self.signature = _signature(paths, self.signature.get('params'))
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        payload = {'signature': self.signature,
+                   'profiles': [asdict(p) for p in self.profiles.values()]}
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(payload, f)
+        os.replace(tmp_path, self.path)
+
+
+def read_profiles(run_dir):
+    """Read-only view of a run's persisted profiles ({} if never built)."""
+    path = profile_path(run_dir)
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        payload = json.load(f)
+    return {p['ticker']: TickerProfile(**p) for p in payload['profiles']}
+
+
+def load_registry(run_dir, intervals_path, master_path, tier1_min_episodes, tier2_min_episodes):
+    """
+    Registry for a run. Reuses the persisted profiles when ticker_intervals.csv,
+    MASTER_TRUTH and the tier thresholds are unchanged; otherwise rebuilds the
+    historical fields and keeps each ticker's rolling scanner state.
+    """
+    path = profile_path(run_dir)
+    params = [tier1_min_episodes, tier2_min_episodes]
+    signature = _signature([intervals_path, master_path], params)
+
+    previous = {}
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            payload = json.load(f)
+        previous = {p['ticker']: TickerProfile(**p) for p in payload['profiles']}
+        if payload.get('signature') == signature:
+            return ProfileRegistry(path, previous, signature)
+
+    intervals_df = pd.read_csv(intervals_path)
+    master_df = pd.read_csv(master_path, usecols=['ticker', 'signal_date', 'classification'])
+    profiles = build_profiles(intervals_df, master_df, tier1_min_episodes, tier2_min_episodes)
+    for ticker, old in previous.items():
+        if ticker in profiles:
+            for name in _ROLLING_FIELDS:
+                setattr(profiles[ticker], name, getattr(old, name))
+        elif old.tier == 'watchlist':
+            profiles[ticker] = old
+
+    registry = ProfileRegistry(path, profiles, signature)
+    registry.save()
+    return registry
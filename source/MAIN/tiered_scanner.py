@@ -3,55 +3,52 @@ import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 import os
-import glob
-from pathlib import Path
 
-# Where this script lives (for reliable paths)
-SCRIPT_DIR = Path(__file__).resolve().parent
+import alert_store
+import episode_state
+import profiling
+import pump_scoring
+import run_metrics
+import scan_scheduler
+import ticker_profiles
+import trading_calendar
 
 
 # ============================================================================
 # CONFIGURATION
 # ============================================================================
 
-# Find the most recent run directory
-def find_latest_run():
-    run_dirs = [
-        d for d in glob.glob("runs/*/")
-        if os.path.basename(os.path.normpath(d)) != "weekly_reviews"
-    ]
-    if not run_dirs:
-        raise FileNotFoundError("No valid run directories found inside /runs/")
-    return max(run_dirs, key=os.path.getmtime)
-
-
-LATEST_RUN = find_latest_run()
+# Most recent run directory
+LATEST_RUN = scan_scheduler.find_latest_run()
 print("="*80)
 print("TIERED PUMP MONITORING SYSTEM")
 print("="*80)
 print(f"Using data from: {LATEST_RUN}")
+if __name__ == "__main__":
+    run_metrics.start("tiered_scanner")
+    profiling.start(LATEST_RUN, "tiered_scanner")  # --profile[=STAGE]
 
 # Existing inputs:
 INTERVALS_PATH = os.path.join(LATEST_RUN, "data", "analysis", "ticker_intervals.csv")
-MASTER_PATH    = os.path.join(LATEST_RUN, "data", "signals_csv", "MASTER_TRUTH_WITH_EPISODES.csv")
+SIGNALS_DIR    = os.path.join(LATEST_RUN, "data", "signals_csv")
+MASTER_PATH    = os.path.join(SIGNALS_DIR, "MASTER_TRUTH_WITH_EPISODES.csv")
 
 # Alerts directory within the run
 ALERTS_DIR = os.path.join(LATEST_RUN, "data", "alerts")
 os.makedirs(ALERTS_DIR, exist_ok=True)
 
-# File locations under the run
-ALERTS_HISTORY_FILE = os.path.join(ALERTS_DIR, "alerts_history.csv")  # master log of all alerts
+TIER1_MIN_EPISODES = scan_scheduler.TIER1_MIN_EPISODES  # Daily monitoring
+TIER2_MIN_EPISODES = scan_scheduler.TIER2_MIN_EPISODES  # Weekly monitoring
+PUMP_THRESHOLD = pump_scoring.PUMP_THRESHOLD
 
-TIER1_MIN_EPISODES = 6  # Daily monitoring
-TIER2_MIN_EPISODES = 4  # Weekly monitoring
-PUMP_THRESHOLD = 50
+# Bars after this session are still forming (today's, when the scan runs before the close)
+LAST_CLOSED_SESSION = trading_calendar.last_completed_session()
 
-# How to handle your watchlist if present
-# Options:
-#   "override"       → only use tickers from watchlist.txt
-#   "union_tier1"    → combine watchlist + Tier 1 tickers (recommended)
-#   "union_selected" → combine watchlist + whichever tier is active that day
-WATCHLIST_MODE = "union_tier1"   # <-- your current goal
+# Daily yfinance request budget; tickers are scanned in priority order until it is spent
+SCAN_BUDGET = int(os.environ.get("SCAN_BUDGET", scan_scheduler.DEFAULT_BUDGET))
+
+# How to handle your watchlist if present (options in scan_scheduler)
+WATCHLIST_MODE = scan_scheduler.WATCHLIST_MODE
 
 # ------------------------------------------------------------------
 # OPTIONAL: Override tickers with watchlist.txt
@@ -60,17 +57,16 @@ WATCHLIST_MODE = "union_tier1"   # <-- your current goal
 #        PRPL
 #        AZI
 # ------------------------------------------------------------------
-def load_watchlist(file_name="watchlist.txt"):
+def load_watchlist():
     """
     Load tickers from watchlist.txt located next to this script (one per line).
     Returns None if file not found.
     """
-    file_path = SCRIPT_DIR / file_name
-    if not file_path.exists():
+    tickers = scan_scheduler.load_watchlist()
+    if tickers is None:
         print("watchlist.txt not found — using tickers from tier assignment instead.")
         return None
-    tickers = [line.strip().upper() for line in file_path.read_text().splitlines() if line.strip()]
-    print(f"Loaded {len(tickers)} tickers from {file_path}")
+    print(f"Loaded {len(tickers)} tickers from {scan_scheduler.WATCHLIST_FILE}")
     return tickers
 
 WATCHLIST_OVERRIDE = load_watchlist()
@@ -85,30 +81,20 @@ if not os.path.exists(INTERVALS_PATH):
 if not os.path.exists(MASTER_PATH):
     raise FileNotFoundError(f"Master truth file not found: {MASTER_PATH}")
 
-intervals_df = pd.read_csv(INTERVALS_PATH)
-master_df = pd.read_csv(MASTER_PATH)
-master_df['signal_date'] = pd.to_datetime(master_df['signal_date'])
+# One profile per ticker (tier, interval stats, last pump, scanner state).
+# Rebuilt from ticker_intervals.csv / MASTER_TRUTH only when they change.
+profiles = ticker_profiles.load_registry(
+    LATEST_RUN, INTERVALS_PATH, MASTER_PATH, TIER1_MIN_EPISODES, TIER2_MIN_EPISODES
+)
+intervals_df = profiles.frame()
+last_pump_dates = profiles.last_pump_dates()
 
 # ============================================================================
 # TIER ASSIGNMENT
 # ============================================================================
 
-def assign_tiers(intervals_df):
-    tiers = {'tier1': [], 'tier2': [], 'tier3': []}
-    for _, row in intervals_df.iterrows():
-        ticker = row['ticker']
-        num_episodes = row['num_episodes']
-        cv = row['coefficient_variation']
-
-        if num_episodes >= TIER1_MIN_EPISODES or (num_episodes >= 5 and cv < 0.4):
-            tiers['tier1'].append(ticker)
-        elif num_episodes >= TIER2_MIN_EPISODES:
-            tiers['tier2'].append(ticker)
-        else:
-            tiers['tier3'].append(ticker)
-    return tiers
-
-tiers = assign_tiers(intervals_df)
+# Assigned once per profile build (ticker_profiles.assign_tiers, vectorized)
+tiers = profiles.tiers()
 
 print("\nTier Assignment (from historical intervals):")
 print(f"  Tier 1 (Daily):   {len(tiers['tier1'])} tickers")
@@ -117,115 +103,88 @@ print(f"  Tier 3 (Ignore):  {len(tiers['tier3'])} tickers")
 
 print("\nTier 1 (Daily Monitoring):")
 for ticker in sorted(tiers['tier1']):
-    row = intervals_df[intervals_df['ticker'] == ticker].iloc[0]
-    print(f"  {ticker:6s}: {row['num_episodes']:2.0f} episodes, "
-          f"{row['avg_gap_days']:5.1f}d avg, CV={row['coefficient_variation']:.2f}")
+    p = profiles.get(ticker)
+    print(f"  {ticker:6s}: {p.num_episodes:2.0f} episodes, "
+          f"{p.avg_gap_days:5.1f}d avg, CV={p.coefficient_variation:.2f}")
     
 print("\nTier 2 (Weekly Monitoring):")
 for ticker in sorted(tiers['tier2']):
-    row = intervals_df[intervals_df['ticker'] == ticker].iloc[0]
-    print(f"  {ticker:6s}: {row['num_episodes']:2.0f} episodes, "
-          f"{row['avg_gap_days']:5.1f}d avg, CV={row['coefficient_variation']:.2f}")
-
-# ============================================================================
-# LAST PUMP TRACKING
-# ============================================================================
-
-def get_last_pump_date(ticker, master_df):
-    ticker_pumps = master_df[
-        (master_df['ticker'] == ticker) &
-        (master_df['classification'].isin(['confirmed_pump', 'likely_pump']))
-    ]
-    return ticker_pumps['signal_date'].max() if len(ticker_pumps) > 0 else None
-
-last_pump_dates = {t: get_last_pump_date(t, master_df) for t in intervals_df['ticker']}
-
-# ============================================================================
-# SCORING
-# ============================================================================
-
-def calculate_pump_score(ticker_data):
-    df = ticker_data.copy()
-    df = df.replace([np.inf, -np.inf], np.nan)
-    df = df.ffill().bfill()
-    df['vol_z'] = (df['Volume'] - df['Volume'].rolling(20).mean()) / \
-                  (df['Volume'].rolling(20).std() + 1e-9)
-    df['vol_ratio'] = df['Volume'] / (df['Volume'].rolling(20).mean() + 1e-9)
-    df['vol_trend'] = df['Volume'].rolling(5).mean() / \
-                      (df['Volume'].rolling(20).mean() + 1e-9)
-    df['return'] = df['Close'].pct_change()
-    df['price_z'] = (df['return'] - df['return'].rolling(20).mean()) / \
-                    (df['return'].rolling(20).std() + 1e-9)
-    df['gap_up'] = (df['Open'] - df['Close'].shift(1)) / (df['Close'].shift(1) + 1e-9)
-    df['volatility'] = (df['High'] - df['Low']) / (df['Close'] + 1e-9)
-
-    df['pump_score'] = 0
-    df.loc[df['vol_z'] > 2, 'pump_score'] += 20
-    df.loc[df['vol_z'] > 3, 'pump_score'] += 10
-    df.loc[df['vol_ratio'] > 3, 'pump_score'] += 15
-    df.loc[df['return'] > 0.1, 'pump_score'] += 20
-    df.loc[df['return'] > 0.2, 'pump_score'] += 10
-    df.loc[df['price_z'] > 2, 'pump_score'] += 15
-    df.loc[df['gap_up'] > 0.05, 'pump_score'] += 10
-    df.loc[df['volatility'] > 0.1, 'pump_score'] += 10
-
-    synergy = (df['vol_trend'] > 1.2) & (df['return'] > 0.1)
-    df.loc[synergy, 'pump_score'] += 10
-    synergy2 = (df['price_z'] > 2.5) & (df['vol_ratio'] > 2)
-    df.loc[synergy2, 'pump_score'] += 10
-
-    return df
+    p = profiles.get(ticker)
+    print(f"  {ticker:6s}: {p.num_episodes:2.0f} episodes, "
+          f"{p.avg_gap_days:5.1f}d avg, CV={p.coefficient_variation:.2f}")
 
 # ============================================================================
 # MONITORING
 # ============================================================================
 
-def check_ticker(ticker, tier, last_pump_date, avg_gap):
+def check_ticker(ticker, tier, last_pump_date, avg_gap, last_bar_date=None):
+    """
+    Score the last 60 days once and return an alert for every new bar that
+    crossed PUMP_THRESHOLD. New bars are those after last_bar_date (the last
+    completed bar a previous run scored), so days missed by a skipped run are
+    caught up from the same download and a bar first seen intraday is scored
+    again once final; on a ticker's first scan only the latest bar counts.
+    """
+    scan_date = datetime.now()
     try:
-        df = yf.download(ticker, period="60d", interval="1d", progress=False, auto_adjust=True)
+        run_metrics.count('api_calls')
+        with run_metrics.stage('download'):
+            df = yf.download(ticker, period="60d", interval="1d", progress=False, auto_adjust=True)
+        run_metrics.count('bytes_fetched', run_metrics.frame_bytes(df))
         if isinstance(df.columns, pd.MultiIndex):
             df.columns = df.columns.droplevel(1)
-        if df.empty or len(df) < 25:
-            return None
+        if df.empty or len(df) < pump_scoring.MIN_BARS:
+            profiles.record_scan(ticker, scan_date, 'no_data')
+            return []
 
-        df = calculate_pump_score(df)
+        df = pump_scoring.calculate_pump_score(df)
         latest = df.iloc[-1]
+
+        # Bars before the 20-day rolling warm-up can't be scored
+        scored = df.iloc[pump_scoring.WARMUP_BARS:]
+        if last_bar_date is None:
+            new_bars = df.iloc[-1:]
+        else:
+            new_bars = scored[scored.index > pd.Timestamp(last_bar_date)]
+        if len(new_bars) > 1:
+            print(f"(catching up {len(new_bars)} bars since {pd.Timestamp(last_bar_date):%Y-%m-%d})", end=" ")
+
         # Sanity filter for bad prints / extreme discontinuities
-        if pd.notna(latest['return']) and abs(latest['return']) > 5.0:  # > 500% in a day
-            print(f"SKIP (extreme daily return {latest['return']*100:.0f}%)")
-            return None
-        
-        if latest['Volume'] <= 0 or pd.isna(latest['Volume']):
-            print("(missing/zero volume, skipping)")
-            return None
-        latest_date = df.index[-1]
-
-        days_since_last = None
-        status = "NEW"
-        if last_pump_date is not None:
-            days_since_last = (latest_date - last_pump_date).days
-            if days_since_last > avg_gap * 1.2:
-                status = "OVERDUE"
-            elif days_since_last > avg_gap * 0.8:
-                status = "DUE"
-            elif days_since_last < avg_gap * 0.5:
-                status = "TOO_SOON"
-            else:
-                status = "NORMAL"
-
-        if latest['pump_score'] > PUMP_THRESHOLD:
-            return {
+        bad_print, no_volume = pump_scoring.sanity_masks(new_bars)
+        if len(new_bars) and bad_print.iloc[-1]:
+            print(f"SKIP (extreme daily return {latest['return']*100:.0f}%)", end=" ")
+        elif len(new_bars) and no_volume.iloc[-1]:
+            print("(missing/zero volume, skipping)", end=" ")
+
+        hits = new_bars[pump_scoring.alert_mask(new_bars, PUMP_THRESHOLD)]
+        health = 'bad_print' if len(new_bars) and bad_print.iloc[-1] else \
+                 'no_data' if len(new_bars) and no_volume.iloc[-1] else 'ok'
+        # last_bar_date only advances over completed sessions, so an intraday bar
+        # is scored again (as its final bar) on the next run
+        completed = df.index[df.index.normalize() <= LAST_CLOSED_SESSION]
+        profiles.record_scan(ticker, scan_date, health, completed[-1] if len(completed) else None,
+                             alert_date=hits.index[-1] if len(hits) else None)
+
+        days_since_last = [None] * len(hits)
+        status = ["NEW"] * len(hits)
+        if last_pump_date is not None and len(hits):
+            days_since_last = [int(d) for d in (hits.index - last_pump_date).days]
+            status = list(scan_scheduler.status_bands(np.array(days_since_last, dtype=float), avg_gap))
+
+        alerts = []
+        for (alert_date, bar), since, bar_status in zip(hits.iterrows(), days_since_last, status):
+            alerts.append({
                 'ticker': ticker,
                 'tier': tier,
-                'alert_date': latest_date,
-                'pump_score': latest['pump_score'],
-                'alert_price': latest['Close'],
+                'alert_date': alert_date,
+                'pump_score': bar['pump_score'],
+                'alert_price': bar['Close'],
                 # scanner-specific metadata
-                'volume': latest['Volume'],
-                'vol_z': latest['vol_z'],
-                'daily_return': latest['return'],
-                'days_since_last': days_since_last,
-                'status': status,
+                'volume': bar['Volume'],
+                'vol_z': bar['vol_z'],
+                'daily_return': bar['return'],
+                'days_since_last': since,
+                'status': bar_status,
                 # fields expected by alert_tracker
                 'return_1d': None,
                 'return_5d': None,
@@ -235,61 +194,81 @@ def check_ticker(ticker, tier, last_pump_date, avg_gap):
                 'days_since_alert': 0,
                 'last_updated': None,
                 'outcome': 'pending'
-            }
-
-        return None
+            })
+        return alerts
     except Exception as e:
         print(f"  Error checking {ticker}: {e}")
-        return None
+        run_metrics.count('api_errors')
+        profiles.record_scan(ticker, scan_date, 'error')
+        return []
 
 # ============================================================================
 # SCAN EXECUTION
 # ============================================================================
 
-def run_scan(tiers_to_check):
+def build_schedule(today):
+    """Rank every known ticker and mark the ones that fit in today's SCAN_BUDGET"""
+    candidates, pinned = scan_scheduler.watchlist_scope(intervals_df, tiers, WATCHLIST_OVERRIDE, WATCHLIST_MODE)
+
+    # Only the recency window is read, so startup doesn't grow with the alert history
+    window_start = pd.Timestamp(today).normalize() - pd.Timedelta(days=scan_scheduler.RECENT_SCORE_DAYS)
+    conn = alert_store.connect(ALERTS_DIR)
+    try:
+        recent = scan_scheduler.recent_scores(alert_store.alerts_since(conn, window_start), today)
+    finally:
+        conn.close()
+
+    ranking = scan_scheduler.rank_tickers(candidates, last_pump_dates, tiers, today,
+                                          recent_scores=recent, extra_tickers=sorted(pinned))
+    schedule = scan_scheduler.select(ranking, SCAN_BUDGET, pinned)
+
+    out_file = os.path.join(ALERTS_DIR, f"scan_schedule_{today:%Y%m%d}.csv")
+    with run_metrics.stage('write'):
+        schedule.to_csv(out_file, index=False)
+
+    selected = schedule[schedule['selected']]
+    print(f"\nScan budget: {SCAN_BUDGET} requests, {len(schedule)} ranked tickers, "
+          f"{len(selected)} selected ({int(selected['pinned'].sum())} pinned)")
+    dropped = scan_scheduler.pins_over_budget(schedule)
+    if dropped:
+        print(f"⚠ WARNING: {int(schedule['pinned'].sum())} pinned tickers exceed SCAN_BUDGET={SCAN_BUDGET}; "
+              f"skipping the {len(dropped)} lowest-priority: {', '.join(dropped)}")
+    print(f"{'Rank':>4s}  {'Ticker':6s}  {'Tier':9s}  {'Priority':>8s}  {'Status':8s}  {'Since':>5s}  {'Gap':>5s}")
+    for _, row in selected.head(20).iterrows():
+        since = f"{row['days_since_last']:.0f}" if pd.notna(row['days_since_last']) else "-"
+        print(f"{row['rank']:4d}  {row['ticker']:6s}  {row['tier']:9s}  {row['priority']:8.3f}  "
+              f"{row['status']:8s}  {since:>5s}  {row['avg_gap_days']:5.1f}"
+              + ("  (pinned)" if row['pinned'] else ""))
+    if len(selected) > 20:
+        print(f"  ... {len(selected) - 20} more")
+    print(f"Ranking saved to: {out_file}")
+    return selected
+
+
+def run_scan(schedule):
     print("\n" + "="*80)
-    print(f"RUNNING SCAN: {', '.join(tiers_to_check).upper()}")
+    print(f"RUNNING SCAN: {len(schedule)} TICKERS BY PRIORITY")
     print(f"Time: {datetime.now():%Y-%m-%d %H:%M:%S}")
     print("="*80)
 
     alerts = []
-    for tier_name in tiers_to_check:
-        if WATCHLIST_OVERRIDE:
-            if WATCHLIST_MODE == "override":
-                base = set(WATCHLIST_OVERRIDE)
-                msg = f"via watchlist OVERRIDE ({len(base)} tickers)"
-            elif WATCHLIST_MODE == "union_tier1":
-                base = set(WATCHLIST_OVERRIDE) | set(tiers.get("tier1", []))
-                msg = f"watchlist ∪ TIER1 ({len(base)} tickers)"
-            elif WATCHLIST_MODE == "union_selected":
-                base = set(WATCHLIST_OVERRIDE) | set(tiers.get(tier_name, []))
-                msg = f"watchlist ∪ {tier_name.upper()} ({len(base)} tickers)"
-            else:
-                base = set(WATCHLIST_OVERRIDE)
-                msg = f"via watchlist (unknown mode -> override) ({len(base)} tickers)"
-            tickers_to_check = sorted(base)
-            print(f"\nChecking {tier_name.upper()} {msg}: {', '.join(tickers_to_check[:20])}" +
-                (" ..." if len(tickers_to_check) > 20 else ""))
+    for _, row in schedule.iterrows():
+        ticker = row['ticker']
+        last_pump = last_pump_dates.get(ticker, None)
+
+        profile = profiles.get(ticker)
+        last_bar = profile.last_bar_date if profile is not None else None
+
+        print(f"  Checking {ticker:6s}...", end=" ")
+        with run_metrics.for_ticker(ticker):
+            found = check_ticker(ticker, row['tier'], last_pump, row['avg_gap_days'], last_bar)
+        if found:
+            alerts.extend(found)
+            print(", ".join(f"PUMP DETECTED (score={a['pump_score']:.0f}, {a['status']}"
+                            + (f", {a['alert_date']:%Y-%m-%d})" if len(found) > 1 else ")")
+                            for a in found))
         else:
-            tickers_to_check = sorted(set(tiers.get(tier_name, [])))
-            print(f"\nChecking {tier_name.upper()} ({len(tickers_to_check)} tickers): " +
-                ", ".join(tickers_to_check[:20]) + (" ..." if len(tickers_to_check) > 20 else ""))
-
-
-
-        for ticker in tickers_to_check:
-            # Use historical avg_gap and last_pump if available; otherwise fall back to defaults
-            ticker_row = intervals_df[intervals_df['ticker'] == ticker]
-            avg_gap = ticker_row['avg_gap_days'].values[0] if len(ticker_row) > 0 else 30
-            last_pump = last_pump_dates.get(ticker, None)
-
-            print(f"  Checking {ticker:6s}...", end=" ")
-            alert = check_ticker(ticker, tier_name, last_pump, avg_gap)
-            if alert:
-                alerts.append(alert)
-                print(f"PUMP DETECTED (score={alert['pump_score']:.0f}, {alert['status']})")
-            else:
-                print("OK")
+            print("OK")
     return alerts
 
 # ============================================================================
@@ -297,32 +276,41 @@ def run_scan(tiers_to_check):
 # ============================================================================
 
 def log_alerts_to_history(alerts):
-    """Append new alerts to master history file"""
+    """Insert new alerts into the run's alert store (first alert per ticker/day wins)"""
     if len(alerts) == 0:
         return
 
-    new_alerts_df = pd.DataFrame(alerts)
-
-    if os.path.exists(ALERTS_HISTORY_FILE):
-        history_df = pd.read_csv(ALERTS_HISTORY_FILE)
-        history_df['alert_date'] = pd.to_datetime(history_df['alert_date'])
-
-        new_alerts_df['alert_date'] = pd.to_datetime(new_alerts_df['alert_date'])
-        for _, new_alert in new_alerts_df.iterrows():
-            ticker = new_alert['ticker']
-            date   = new_alert['alert_date']
-
-            duplicate = history_df[
-                (history_df['ticker'] == ticker) &
-                (history_df['alert_date'].dt.date == date.date())
-            ]
-            if len(duplicate) == 0:
-                history_df = pd.concat([history_df, pd.DataFrame([new_alert])], ignore_index=True)
-    else:
-        history_df = new_alerts_df
+    conn = alert_store.connect(ALERTS_DIR)
+    try:
+        with run_metrics.stage('write'):
+            # alerts_history.csv is left to alert_tracker; rewriting it here
+            # would make every scan O(history)
+            inserted = alert_store.upsert_alerts(conn, alerts)
+    finally:
+        conn.close()
+    print(f"\nAlerts logged to {alert_store.store_path(ALERTS_DIR)} "
+          f"({inserted} new, {len(alerts) - inserted} already logged)")
+
+def update_episodes(alerts):
+    """Extend (or open) each alerted ticker's pump episode in the run's episode tables"""
+    if len(alerts) == 0:
+        return
 
-    history_df.to_csv(ALERTS_HISTORY_FILE, index=False)
-    print(f"\nAlerts logged to {ALERTS_HISTORY_FILE}")
+    # The tracker also updates the state (reclassify), so hold the lock from load to save
+    with episode_state.state_lock(SIGNALS_DIR):
+        state = episode_state.load_state(SIGNALS_DIR)
+        signals = episode_state.signals_from_alerts(alerts)
+        signals['episode_key'] = episode_state.add_signals(state, signals)
+        # Already-applied alerts (re-runs on the same day) come back without a key
+        signals = signals.dropna(subset=['episode_key'])
+        if len(signals) == 0:
+            return
+
+        with run_metrics.stage('write'):
+            episode_state.append_master(SIGNALS_DIR, signals)
+            episode_state.write_episodes(SIGNALS_DIR, state)
+            episode_state.save_state(SIGNALS_DIR, state)
+    print(f"Episodes updated: {', '.join(signals['episode_key'])}")
 
 def generate_alert_report(alerts):
     if len(alerts) == 0:
@@ -349,7 +337,8 @@ def generate_alert_report(alerts):
     # Save today's alerts to the run-scoped alerts folder
     alerts_df = pd.DataFrame(alerts)
     out_file = os.path.join(ALERTS_DIR, f"pump_alerts_{datetime.now():%Y%m%d}.csv")
-    alerts_df.to_csv(out_file, index=False)
+    with run_metrics.stage('write'):
+        alerts_df.to_csv(out_file, index=False)
     print(f"\nToday's alerts saved to: {out_file}")
 
 # ============================================================================
@@ -357,21 +346,22 @@ def generate_alert_report(alerts):
 # ============================================================================
 
 if __name__ == "__main__":
-    today = datetime.now()
-    day_of_week = today.strftime('%A')
-    print(f"\nToday is {day_of_week}")
-
-    if day_of_week in ['Monday', 'Wednesday', 'Friday']:
-        tiers_to_check = ['tier1', 'tier2']
-        print("Checking Tier 1 (Daily) and Tier 2 (Weekly)")
-    else:
-        tiers_to_check = ['tier1']
-        print("Checking Tier 1 (Daily) only")
-
-    alerts = run_scan(tiers_to_check)
+    today = pd.Timestamp(datetime.now()).normalize()
+    print(f"\nToday is {today:%A}")
+
+    schedule = build_schedule(today)
+    alerts = run_scan(schedule)
     generate_alert_report(alerts)
     log_alerts_to_history(alerts)
+    update_episodes(alerts)
+
+    # Appended scanner alerts are 'pending', so they can't move any last pump date
+    profiles.refresh_inputs([INTERVALS_PATH, MASTER_PATH])
+    profiles.save()
 
     print("\n" + "="*80)
     print("SCAN COMPLETE")
     print("="*80)
+    run_metrics.count('alerts', len(alerts))
+    run_metrics.write(LATEST_RUN)
+    profiling.finish()
@@ -0,0 +1,205 @@
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+# ============================================================================
+# NYSE TRADING CALENDAR
+# ============================================================================
+#
+# Every regular session from FIRST_YEAR to LAST_YEAR is precomputed once into a
+# sorted datetime64[D] array. A second array, indexed by calendar-day number,
+# holds the position of the first session on/after each day, so converting a
+# date to a session index (and back) is a plain array lookup. All horizons in
+# the pipeline ("5 days after the alert", "days to bottom") are counted in
+# these sessions rather than calendar days.
+
+FIRST_YEAR = 1990
+LAST_YEAR = 2040
+
+MARKET_TZ = "America/New_York"
+CLOSE_HOUR = 16           # Regular close, exchange time
+HALF_DAY_CLOSE_HOUR = 13
+
+# Unscheduled full-day closures since FIRST_YEAR
+SPECIAL_CLOSURES = [
+    date(1994, 4, 27),   # President Nixon funeral
+    date(2001, 9, 11), date(2001, 9, 12), date(2001, 9, 13), date(2001, 9, 14),  # 9/11
+    date(2004, 6, 11),   # President Reagan funeral
+    date(2007, 1, 2),    # President Ford funeral
+    date(2012, 10, 29), date(2012, 10, 30),  # Hurricane Sandy
+    date(2018, 12, 5),   # President G.H.W. Bush funeral
+    date(2025, 1, 9),    # President Carter funeral
+]
+
+
+def _easter(year):
+    """Gregorian Easter Sunday (anonymous algorithm)."""
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+
+def _nth_weekday(year, month, weekday, n):
+    """n-th (1-based) weekday of a month; n=-1 for the last one."""
+    if n > 0:
+        first = date(year, month, 1)
+        return first + timedelta(days=(weekday - first.weekday()) % 7 + 7 * (n - 1))
+    last = date(year + month // 12, month % 12 + 1, 1) - timedelta(days=1)
+    return last - timedelta(days=(last.weekday() - weekday) % 7)
+
+
+def _observed(d):
+    """Saturday holidays move to Friday, Sunday holidays to Monday."""
+    if d.weekday() == 5:
+        return d - timedelta(days=1)
+    if d.weekday() == 6:
+        return d + timedelta(days=1)
+    return d
+
+
+def _holidays(year):
+    days = []
+    new_year = date(year, 1, 1)
+    if new_year.weekday() != 5:  # NYSE does not observe a Saturday New Year on Dec 31
+        days.append(_observed(new_year))
+    if year >= 1998:
+        days.append(_nth_weekday(year, 1, 0, 3))   # Martin Luther King Jr. Day
+    days.append(_nth_weekday(year, 2, 0, 3))       # Washington's Birthday
+    days.append(_easter(year) - timedelta(days=2))  # Good Friday
+    days.append(_nth_weekday(year, 5, 0, -1))      # Memorial Day
+    if year >= 2022:
+        days.append(_observed(date(year, 6, 19)))  # Juneteenth
+    days.append(_observed(date(year, 7, 4)))       # Independence Day
+    days.append(_nth_weekday(year, 9, 0, 1))       # Labor Day
+    days.append(_nth_weekday(year, 11, 3, 4))      # Thanksgiving
+    days.append(_observed(date(year, 12, 25)))     # Christmas
+    return days
+
+
+def _half_days(year):
+    """1 pm closes: July 3rd, the day after Thanksgiving, Christmas Eve (when they are sessions)."""
+    days = [_nth_weekday(year, 11, 3, 4) + timedelta(days=1)]
+    july3 = date(year, 7, 3)
+    if july3.weekday() < 4:
+        days.append(july3)
+    christmas_eve = date(year, 12, 24)
+    if christmas_eve.weekday() < 4:
+        days.append(christmas_eve)
+    return days
+
+
+def _build():
+    closed = set(SPECIAL_CLOSURES)
+    half = set()
+    for year in range(FIRST_YEAR, LAST_YEAR + 1):
+        closed.update(_holidays(year))
+        half.update(_half_days(year))
+
+    all_days = np.arange(np.datetime64(f"{FIRST_YEAR}-01-01"),
+                         np.datetime64(f"{LAST_YEAR + 1}-01-01"), dtype='datetime64[D]')
+    weekday = (all_days.astype('int64') + 3) % 7  # 1970-01-01 was a Thursday
+    closed_arr = np.array(sorted(closed), dtype='datetime64[D]')
+    is_session = (weekday < 5) & ~np.isin(all_days, closed_arr)
+
+    sessions = all_days[is_session]
+    # roll_forward[k] = index of the first session on/after calendar day k
+    roll_forward = (np.cumsum(is_session) - is_session).astype('int64')
+    half_arr = np.array(sorted(half), dtype='datetime64[D]')
+    half_days = half_arr[is_session[(half_arr - all_days[0]).astype('int64')]]
+    return all_days[0], sessions, is_session, roll_forward, half_days
+
+
+EPOCH, SESSIONS, _IS_SESSION, _ROLL_FORWARD, HALF_DAYS = _build()
+_HALF_DAY_SET = set(HALF_DAYS.tolist())
+
+
+# ============================================================================
+# LOOKUPS
+# ============================================================================
+
+def _day_numbers(dates):
+    """Calendar-day offsets from EPOCH (scalar for a single date, array otherwise)."""
+    if isinstance(dates, (str, date, np.datetime64)):
+        days = np.datetime64(pd.Timestamp(dates).date(), 'D')
+    else:
+        days = pd.to_datetime(np.asarray(dates)).values.astype('datetime64[D]')
+    k = (days - EPOCH).astype('int64')
+    if np.any((k < 0) | (k >= len(_IS_SESSION))):
+        raise ValueError(f"Date outside trading calendar range {FIRST_YEAR}-{LAST_YEAR}")
+    return k
+
+
+def is_session(dates):
+    """True where the date is a regular NYSE session."""
+    return _IS_SESSION[_day_numbers(dates)]
+
+
+def is_half_day(d):
+    """True for scheduled 1 pm closes."""
+    return pd.Timestamp(d).date() in _HALF_DAY_SET
+
+
+def session_index(dates, roll='forward'):
+    """
+    Position of a date in SESSIONS. Non-session dates roll to the next
+    session ('forward') or the previous one ('backward').
+    """
+    k = _day_numbers(dates)
+    idx = _ROLL_FORWARD[k]
+    if roll == 'backward':
+        idx = idx - (~_IS_SESSION[k]).astype('int64')
+    return idx
+
+
+def session_at(index):
+    """Session date(s) for index position(s), as Timestamps."""
+    values = SESSIONS[np.asarray(index)]
+    if np.ndim(values) == 0:
+        return pd.Timestamp(values)
+    return pd.DatetimeIndex(values)
+
+
+def offset(dates, n):
+    """The session n sessions after each date (date rolled forward first)."""
+    return session_at(np.asarray(session_index(dates)) + n)
+
+
+def trading_days_between(start, end):
+    """Sessions from start to end (end - start in session-index terms)."""
+    return np.asarray(session_index(end)) - np.asarray(session_index(start))
+
+
+def sessions_in_range(start, end):
+    """All sessions in [start, end] inclusive, as a DatetimeIndex."""
+    lo = session_index(start, roll='forward')
+    hi = session_index(end, roll='backward')
+    return pd.DatetimeIndex(SESSIONS[lo:hi + 1])
+
+
+def next_session(d):
+    """First session strictly after d."""
+    return session_at(session_index(d, roll='backward') + 1)
+
+
+def last_completed_session(now=None):
+    """
+    Latest session whose regular close has passed as of now (default: the
+    current time). A naive now is taken as exchange time.
+    """
+    now = pd.Timestamp.now(tz=MARKET_TZ) if now is None else pd.Timestamp(now)
+    if now.tzinfo is not None:
+        now = now.tz_convert(MARKET_TZ).tz_localize(None)
+    today = now.normalize()
+    close_hour = HALF_DAY_CLOSE_HOUR if is_half_day(today) else CLOSE_HOUR
+    if is_session(today) and now.hour >= close_hour:
+        return today
+    return session_at(session_index(today, roll='backward') - int(is_session(today)))